@@ -1,12 +1,17 @@
-from flask import Flask, render_template, request, jsonify
+from flask import Flask, Response, render_template, request, jsonify
 import os
 import sys
 import shutil
 import json
 import csv
+import queue
+import signal
 import subprocess
+import threading
+import time
 from datetime import datetime
 from typing import List
+from urllib.parse import quote
 
 # Configuración simple sin imports externos problemáticos
 BASE_DIR = os.path.abspath(os.path.dirname(__file__))
@@ -15,6 +20,19 @@ EXCLUSIONES_FILE = os.path.join(BASE_DIR, "exclusiones.txt")
 TERMINOS_FILE = os.path.join(BASE_DIR, "terminos_interes.txt")
 EJECUCIONES_DIR = os.path.join(BASE_DIR, "ejecuciones")
 DOCUMENTS_DIR = os.path.join(BASE_DIR, "autoconsumo_documents")
+BLOB_STORE_DIR = os.path.join(BASE_DIR, "blob_store")
+SEARCH_INDEX_FILE = os.path.join(BASE_DIR, "search_index.sqlite3")
+
+# Módulos compartidos del proyecto Scrapy (sin dependencias de Scrapy)
+sys.path.insert(0, os.path.join(BASE_DIR, 'autoconsumo_scraper_scrapy'))
+from autoconsumo_scraper_scrapy.blobstore import BlobStore  # noqa: E402
+from autoconsumo_scraper_scrapy.pagestore import PageStore  # noqa: E402
+from autoconsumo_scraper_scrapy.searchindex import SearchIndex  # noqa: E402
+from autoconsumo_scraper_scrapy.statuschannel import (  # noqa: E402
+    CONTROL_NAME, STATUS_NAME, clear_control, read_control, read_json, write_control, write_json_atomic,
+)
+from autoconsumo_scraper_scrapy.jobqueue import JobQueue  # noqa: E402
+from autoconsumo_scraper_scrapy.warmworker import launch_warm  # noqa: E402
 
 # Crear directorios si no existen
 os.makedirs(EJECUCIONES_DIR, exist_ok=True)
@@ -23,24 +41,35 @@ os.makedirs(DOCUMENTS_DIR, exist_ok=True)
 app = Flask(__name__)
 
 # ---- Global State ----
-SCRAPER_PROCESS = None
+# Ejecución lanzada o reanudada por última vez (su carpeta tiene el status.json)
+CURRENT_EXECUTION = None
+# Procesos de scraping simultáneos; el resto de ejecuciones espera en la cola
+MAX_CONCURRENT_JOBS = int(os.environ.get('SCRAPER_MAX_JOBS', '2'))
+# Socket del proceso en caliente (`python run_scraper.py --serve`); vacío = proceso nuevo por ejecución
+WARM_WORKER_SOCKET = os.path.join(BASE_DIR, os.environ['SCRAPER_WARM_WORKER']) \
+    if os.environ.get('SCRAPER_WARM_WORKER') else None
 
 # ---- Helpers ----
 def timestamp_dir():
     return datetime.now().strftime("%Y-%m-%d_%H-%M-%S")
 
+def new_execution_dir():
+    """Crea la carpeta de una ejecución nueva; con la cola pueden crearse varias en el mismo segundo."""
+    base_name = timestamp_dir()
+    exec_name = base_name
+    suffix = 2
+    while True:
+        try:
+            os.makedirs(os.path.join(EJECUCIONES_DIR, exec_name))
+            return exec_name
+        except FileExistsError:
+            exec_name = f"{base_name}_{suffix}"
+            suffix += 1
+
 def copy_if_exists(src, dst_dir):
     if os.path.isfile(src):
         shutil.copy2(src, os.path.join(dst_dir, os.path.basename(src)))
 
-def normalize_text(text: str) -> str:
-    import unicodedata
-    text_norm = unicodedata.normalize('NFD', text)
-    stripped = ''.join(
-        c for c in text_norm if unicodedata.category(c) != 'Mn'
-    )
-    return stripped.lower()
-
 def extract_start_urls(csv_path: str) -> List[str]:
     """Lee fuentes.csv y devuelve las URLs válidas."""
     urls = []
@@ -53,6 +82,35 @@ def extract_start_urls(csv_path: str) -> List[str]:
                     urls.append(candidate)
     return urls
 
+def launch_scraper(config_file, resume=False):
+    """Lanza run_scraper.py en un proceso aparte (en su propio grupo en Windows
+    para poder enviarle CTRL_BREAK al pausar). Con SCRAPER_WARM_WORKER la
+    ejecución se pide al proceso en caliente, que ya tiene Scrapy importado."""
+    if WARM_WORKER_SOCKET and os.name != 'nt':
+        try:
+            return launch_warm(WARM_WORKER_SOCKET, config_file, resume=resume)
+        except OSError as exc:
+            print(f"{exc}; se lanza run_scraper.py en un proceso nuevo")
+    script_path = os.path.join(BASE_DIR, 'run_scraper.py')
+    args = [sys.executable, script_path, config_file]
+    if resume:
+        args.append('--resume')
+    creationflags = 0
+    if os.name == 'nt':
+        creationflags = subprocess.CREATE_NO_WINDOW | subprocess.CREATE_NEW_PROCESS_GROUP
+    return subprocess.Popen(args, cwd=BASE_DIR, creationflags=creationflags)
+
+def request_graceful_stop(process):
+    """Pide a Scrapy una parada ordenada: persiste la cola en JOBDIR antes de salir."""
+    if os.name == 'nt':
+        process.send_signal(signal.CTRL_BREAK_EVENT)
+    else:
+        process.send_signal(signal.SIGINT)
+
+def is_resumable_execution(execution_path):
+    return os.path.isdir(os.path.join(execution_path, 'jobdir')) and \
+        os.path.exists(os.path.join(execution_path, 'scraper_config.json'))
+
 def list_execution_dirs():
     """Devuelve la lista de ejecuciones ordenada por fecha descendente."""
     if not os.path.exists(EJECUCIONES_DIR):
@@ -64,6 +122,14 @@ def list_execution_dirs():
             executions.append(entry)
     return sorted(executions, reverse=True)
 
+def current_execution_dir():
+    """Carpeta de la ejecución en curso (o de la última, si no se ha lanzado ninguna)."""
+    execution_path = resolve_execution_dir(CURRENT_EXECUTION)
+    if execution_path:
+        return execution_path
+    available_execs = list_execution_dirs()
+    return os.path.join(EJECUCIONES_DIR, available_execs[0]) if available_execs else None
+
 def resolve_execution_dir(execution_id: str):
     """Valida y devuelve la ruta absoluta de una ejecución concreta."""
     if not execution_id:
@@ -78,6 +144,93 @@ def resolve_execution_dir(execution_id: str):
         return execution_path
     return None
 
+# ---- Cola de ejecuciones ----
+
+def start_job(job):
+    """Arranca un trabajo de la cola: pasa su estado a 'running' y lanza run_scraper.py."""
+    status_path = os.path.join(EJECUCIONES_DIR, job.execution, STATUS_NAME)
+    status = read_json(status_path)
+    status.update({
+        'status': 'running',
+        'message': f'Reanudando ejecución {job.execution}' if job.resume else f'Ejecución {job.execution} en progreso',
+        'started_at': datetime.now().isoformat(timespec='seconds'),
+    })
+    write_json_atomic(status_path, status)
+    try:
+        return launch_scraper(job.config_file, resume=job.resume)
+    except Exception as exc:
+        status.update({'status': 'error', 'message': f'Error al iniciar el scraping: {exc}'})
+        write_json_atomic(status_path, status)
+        raise
+
+JOB_QUEUE = JobQueue(start_job, max_workers=MAX_CONCURRENT_JOBS)
+
+def parse_priority(value):
+    try:
+        return int(value or 0)
+    except (TypeError, ValueError):
+        raise ValueError('La prioridad debe ser un número entero')
+
+def enqueue_execution(execution_id, config_file, status_payload, resume=False, priority=0):
+    """Deja la ejecución en la cola con estado 'queued'; arranca ya si hay un hueco libre."""
+    global CURRENT_EXECUTION
+    execution_path = os.path.join(EJECUCIONES_DIR, execution_id)
+    clear_control(execution_path)
+    write_json_atomic(os.path.join(execution_path, STATUS_NAME), dict(
+        status_payload,
+        status='queued',
+        message='En cola',
+        execution=execution_id,
+        priority=priority,
+        resume=resume,
+        queued_at=datetime.now().isoformat(timespec='seconds'),
+    ))
+    job = JOB_QUEUE.submit(execution_id, config_file, resume=resume, priority=priority)
+    CURRENT_EXECUTION = execution_id
+    return job
+
+def cancel_job(execution_id):
+    """
+    Cancela un trabajo. Si aún espera en la cola se retira sin lanzarlo (una
+    reanudación vuelve a quedar pausada); si está en marcha se avisa en
+    control.json y se termina el proceso, y run_scraper.py deja el estado
+    definitivo. Devuelve None si la ejecución no está en la cola.
+    """
+    execution_path = resolve_execution_dir(execution_id)
+    job = JOB_QUEUE.dequeue(execution_id)
+    if job is not None:
+        status_path = os.path.join(execution_path, STATUS_NAME)
+        status = read_json(status_path)
+        if job.resume:
+            status.update({'status': 'paused', 'message': 'Ejecución pausada', 'resumable': True})
+        else:
+            status.update({'status': 'idle', 'message': 'Cancelado antes de empezar',
+                           'finished_at': datetime.now().isoformat(timespec='seconds')})
+        write_json_atomic(status_path, status)
+        return job
+    job = JOB_QUEUE.get(execution_id)
+    if job is None or job.process is None:
+        return None
+    try:
+        write_control(execution_path, 'cancel', requested_at=datetime.now().isoformat(timespec='seconds'))
+    except OSError as e:
+        print(f"Error updating control file: {e}")
+    job.process.terminate()
+    return job
+
+def recover_queued_jobs():
+    """Vuelve a encolar, en su orden, las ejecuciones que esperaban al cerrar la aplicación."""
+    for execution_id in reversed(list_execution_dirs()):
+        execution_path = os.path.join(EJECUCIONES_DIR, execution_id)
+        status = read_json(os.path.join(execution_path, STATUS_NAME))
+        if status.get('status') != 'queued':
+            continue
+        try:
+            JOB_QUEUE.submit(execution_id, os.path.join(execution_path, 'scraper_config.json'),
+                             resume=bool(status.get('resume')), priority=parse_priority(status.get('priority')))
+        except ValueError as exc:
+            print(f"No se pudo recuperar {execution_id} en la cola: {exc}")
+
 # ---- Rutas ----
 
 @app.route('/')
@@ -94,7 +247,12 @@ def list_executions():
             label = dt.strftime("%Y-%m-%d %H:%M:%S")
         except ValueError:
             pass
-        executions.append({'id': exec_name, 'label': label})
+        executions.append({
+            'id': exec_name,
+            'label': label,
+            'resumable': is_resumable_execution(os.path.join(EJECUCIONES_DIR, exec_name)),
+            'warc': os.path.isdir(os.path.join(EJECUCIONES_DIR, exec_name, 'warc'))
+        })
     return jsonify({'executions': executions})
 
 @app.route('/api/files/<filename>', methods=['GET'])
@@ -151,20 +309,23 @@ def save_file(filename):
         return jsonify({'error': str(e)}), 500
 
 @app.route('/api/scrape', methods=['POST'])
+@app.route('/api/jobs', methods=['POST'])
 def start_scrape():
-    global SCRAPER_PROCESS
-
-    # Verificar si ya hay un proceso corriendo
-    if SCRAPER_PROCESS and SCRAPER_PROCESS.poll() is None:
-        return jsonify({'error': 'Un proceso de scraping ya está en ejecución.'}), 409
-
-    # 1. Leer configuración del usuario
-    user_config = request.json or {}
+    # 1. Leer configuración del usuario (la prioridad es de la cola, no del scraper)
+    user_config = dict(request.json or {})
+    try:
+        priority = parse_priority(user_config.pop('priority', 0))
+    except ValueError as exc:
+        return jsonify({'error': str(exc)}), 400
+    warc_replay = user_config.get('warc_replay')
+    if warc_replay:
+        replay_path = resolve_execution_dir(warc_replay)
+        if not replay_path or not os.path.isdir(os.path.join(replay_path, 'warc')):
+            return jsonify({'error': f'La ejecución {warc_replay} no tiene grabación WARC'}), 400
 
     # 2. Crear directorios de ejecución
-    exec_name = timestamp_dir()
+    exec_name = new_execution_dir()
     current_execution_dir = os.path.join(EJECUCIONES_DIR, exec_name)
-    os.makedirs(current_execution_dir)
 
     current_documents_dir = os.path.join(current_execution_dir, "autoconsumo_documents")
     os.makedirs(current_documents_dir)
@@ -203,118 +364,393 @@ def start_scrape():
             'fuentes_file': local_fuentes,
             'terminos_file': local_terminos if os.path.exists(local_terminos) else None,
             'exclusiones_file': local_exclusiones if os.path.exists(local_exclusiones) else None,
-            'status_file': os.path.join(BASE_DIR, 'status.json'),
             'user_config': user_config
         }, f, indent=2)
 
-    # 5. Inicializar estado de la ejecución
-    status_path = os.path.join(BASE_DIR, 'status.json')
+    # 5. Encolar la ejecución; al arrancar, su estado lo escribe sólo run_scraper.py
     status_payload = {
-        'status': 'running',
         'current': 0,
         'total': total_urls,
         'current_index': 0,
         'current_url': None,
         'current_description': None,
-        'message': f'Ejecución {exec_name} en progreso',
-        'execution': exec_name,
-        'started_at': datetime.now().isoformat(timespec='seconds')
     }
     try:
-        with open(status_path, 'w', encoding='utf-8') as status_file:
-            json.dump(status_payload, status_file, ensure_ascii=False)
-    except Exception as exc:
-        shutil.rmtree(current_execution_dir, ignore_errors=True)
-        return jsonify({'error': f'No se pudo inicializar el estado: {exc}'}), 500
-
-    # 5. Ejecutar Scrapy en proceso separado
-    script_path = os.path.join(BASE_DIR, 'run_scraper.py')
-
-    try:
-        SCRAPER_PROCESS = subprocess.Popen(
-            [sys.executable, script_path, config_file],
-            cwd=BASE_DIR,
-            creationflags=subprocess.CREATE_NO_WINDOW if os.name == 'nt' else 0
-        )
-        return jsonify({'message': f'Scraping iniciado en la carpeta de ejecución: {exec_name}'})
+        job = enqueue_execution(exec_name, config_file, status_payload, priority=priority)
     except Exception as e:
         shutil.rmtree(current_execution_dir, ignore_errors=True)
-        try:
-            with open(status_path, 'w', encoding='utf-8') as status_file:
-                json.dump({
-                    'status': 'error',
-                    'current': 0,
-                    'total': total_urls,
-                    'current_index': 0,
-                    'current_url': None,
-                    'current_description': None,
-                    'message': f'Error al iniciar el scraping: {e}',
-                    'execution': exec_name,
-                    'finished_at': datetime.now().isoformat(timespec='seconds')
-                }, status_file, ensure_ascii=False)
-        except Exception:
-            pass
         return jsonify({'error': f'Error al iniciar el scraping: {e}'}), 500
+    if job.state == 'error':
+        return jsonify({'error': job.error, 'execution': exec_name}), 500
+    if job.state == 'queued':
+        position = JOB_QUEUE.position(exec_name)
+        return jsonify({'message': f'Ejecución {exec_name} en cola (posición {position})',
+                        'execution': exec_name, 'state': job.state, 'position': position}), 202
+    return jsonify({'message': f'Scraping iniciado en la carpeta de ejecución: {exec_name}',
+                    'execution': exec_name, 'state': job.state})
+
+def requested_execution():
+    """Ejecución indicada en el cuerpo de la petición o, si no, la actual."""
+    return (request.get_json(silent=True) or {}).get('execution') or CURRENT_EXECUTION
 
 @app.route('/api/scrape/cancel', methods=['POST'])
 def cancel_scrape():
-    global SCRAPER_PROCESS
-    if SCRAPER_PROCESS and SCRAPER_PROCESS.poll() is None:
-        SCRAPER_PROCESS.terminate()
-
-        # Actualizar el archivo de estado a idle
-        status_path = os.path.join(BASE_DIR, 'status.json')
-        if os.path.exists(status_path):
-            try:
-                with open(status_path, 'r', encoding='utf-8') as f:
-                    status = json.load(f)
-                status['status'] = 'idle'
-                status['message'] = 'Cancelado por el usuario'
-                status['current_url'] = None
-                status['current_description'] = None
-                status['current_index'] = status.get('current', 0)
-                with open(status_path, 'w', encoding='utf-8') as f:
-                    json.dump(status, f, ensure_ascii=False)
-            except Exception as e:
-                print(f"Error updating status file: {e}")
-
-        return jsonify({'message': 'Scraping cancelado correctamente'})
+    execution_id = requested_execution()
+    if execution_id and cancel_job(execution_id) is not None:
+        return jsonify({'message': 'Scraping cancelado correctamente', 'execution': execution_id})
     return jsonify({'error': 'No hay scraping activo'}), 404
 
-@app.route('/api/scrape_status', methods=['GET'])
-def scrape_status():
-    status_path = os.path.join(BASE_DIR, 'status.json')
-    if not os.path.exists(status_path):
-        return jsonify({
+@app.route('/api/scrape/pause', methods=['POST'])
+def pause_scrape():
+    execution_id = requested_execution()
+    job = JOB_QUEUE.get(execution_id) if execution_id else None
+    if job is None:
+        return jsonify({'error': 'No hay scraping activo'}), 404
+    if job.process is None:
+        return jsonify({'error': 'La ejecución aún está en la cola; cancélala para retirarla'}), 409
+    try:
+        write_control(resolve_execution_dir(execution_id), 'pause',
+                      requested_at=datetime.now().isoformat(timespec='seconds'))
+        request_graceful_stop(job.process)
+    except Exception as e:
+        return jsonify({'error': f'No se pudo pausar el scraping: {e}'}), 500
+    return jsonify({'message': 'Pausa solicitada', 'execution': execution_id})
+
+@app.route('/api/scrape/resume', methods=['POST'])
+def resume_scrape():
+    payload = request.json or {}
+    execution_id = payload.get('execution')
+    if not execution_id:
+        resumable = [name for name in list_execution_dirs()
+                     if is_resumable_execution(os.path.join(EJECUCIONES_DIR, name))
+                     and not JOB_QUEUE.is_active(name)]
+        execution_id = resumable[0] if resumable else None
+    execution_path = resolve_execution_dir(execution_id)
+    if not execution_path:
+        return jsonify({'error': 'Ejecución no encontrada'}), 404
+    if JOB_QUEUE.is_active(execution_id):
+        return jsonify({'error': 'La ejecución ya está en marcha o en la cola.'}), 409
+    if not is_resumable_execution(execution_path):
+        return jsonify({'error': 'La ejecución no se puede reanudar'}), 400
+    try:
+        priority = parse_priority(payload.get('priority', 0))
+    except ValueError as exc:
+        return jsonify({'error': str(exc)}), 400
+
+    config_file = os.path.join(execution_path, 'scraper_config.json')
+    try:
+        with open(config_file, 'r', encoding='utf-8') as f:
+            total_urls = len(extract_start_urls(json.load(f)['fuentes_file']))
+    except Exception as exc:
+        return jsonify({'error': f'Configuración de la ejecución no válida: {exc}'}), 500
+
+    try:
+        job = enqueue_execution(execution_id, config_file, {
+            'current': 0,
+            'total': total_urls,
+            'current_index': 0,
+            'current_url': None,
+            'current_description': None,
+            'resumable': True,
+        }, resume=True, priority=priority)
+    except Exception as e:
+        return jsonify({'error': f'Error al reanudar el scraping: {e}'}), 500
+    if job.state == 'error':
+        return jsonify({'error': job.error, 'execution': execution_id}), 500
+    if job.state == 'queued':
+        return jsonify({'message': f'Reanudación de {execution_id} en cola (posición {JOB_QUEUE.position(execution_id)})',
+                        'execution': execution_id, 'state': job.state}), 202
+    return jsonify({'message': f'Reanudando ejecución: {execution_id}', 'execution': execution_id, 'state': job.state})
+
+def read_scrape_status(execution_id=None):
+    """
+    Estado de una ejecución (por defecto, la actual): su status.json (lo
+    escribe run_scraper.py) combinado con las peticiones pendientes de
+    control.json y con la cola, y corregido si el proceso del scraper ya no
+    vive. Incluye el resumen de la cola en `jobs`. No modifica ningún fichero.
+    """
+    execution_path = resolve_execution_dir(execution_id) if execution_id else current_execution_dir()
+    status = read_json(os.path.join(execution_path, STATUS_NAME)) if execution_path else {}
+    if not status:
+        return {
             'status': 'idle',
             'current': 0,
             'total': 0,
             'current_index': 0,
             'current_url': None,
-            'current_description': None
-        })
+            'current_description': None,
+            'jobs': JOB_QUEUE.counts()
+        }
+    status['jobs'] = JOB_QUEUE.counts()
+    execution_name = os.path.basename(execution_path)
+
+    if status.get('status') == 'queued':
+        position = JOB_QUEUE.position(execution_name)
+        if position is not None:
+            status['position'] = position
+            status['message'] = f'En cola (posición {position})'
+            return status
+        if JOB_QUEUE.is_running(execution_name):
+            # Recién lanzada: start_job aún no ha escrito el estado
+            status['status'] = 'running'
+            return status
+        # Quedó en la cola de una instancia anterior de la aplicación
+        status['status'] = 'paused' if status.get('resume') else 'idle'
+        status['message'] = 'La ejecución estaba en la cola al cerrar la aplicación'
+        return status
 
+    # Comprobar si el proceso sigue vivo
+    is_crawling = JOB_QUEUE.is_running(execution_name)
+
+    control_request = read_control(execution_path).get('request') if status.get('status') == 'running' else None
+    if control_request == 'pause':
+        if is_crawling:
+            status['status'] = 'pausing'
+            status['message'] = 'Pausando: esperando peticiones en curso...'
+        else:
+            status['status'] = 'paused'
+            status['message'] = 'Ejecución pausada'
+    elif control_request == 'cancel':
+        status['status'] = 'idle'
+        status['message'] = 'Cancelado por el usuario'
+        status['current_url'] = None
+        status['current_description'] = None
+        status['current_index'] = status.get('current', 0)
+    elif status.get('status') == 'running' and not is_crawling:
+        status['status'] = 'idle'
+        # Si el proceso terminó de forma abrupta, su JOBDIR permite reanudarlo
+        status['resumable'] = is_resumable_execution(execution_path)
+        status['current_url'] = None
+        status['current_description'] = None
+        status['current_index'] = status.get('current', 0)
+    return status
+
+@app.route('/api/scrape_status', methods=['GET'])
+def scrape_status():
+    execution_id = request.args.get('execution')
+    if execution_id and not resolve_execution_dir(execution_id):
+        return jsonify({'error': 'Ejecución no encontrada'}), 404
     try:
-        with open(status_path, 'r', encoding='utf-8') as f:
-            status = json.load(f)
-
-        # Comprobar si el proceso sigue vivo
-        is_crawling = False
-        if SCRAPER_PROCESS:
-            is_crawling = SCRAPER_PROCESS.poll() is None
-
-        if status.get('status') == 'running' and not is_crawling:
-            status['status'] = 'idle'
-            status['current_url'] = None
-            status['current_description'] = None
-            status['current_index'] = status.get('current', 0)
-            with open(status_path, 'w', encoding='utf-8') as f:
-                json.dump(status, f, ensure_ascii=False)
-
-        return jsonify(status)
+        return jsonify(read_scrape_status(execution_id))
     except Exception as e:
         return jsonify({'status': 'error', 'message': str(e)}), 500
 
+@app.route('/api/jobs', methods=['GET'])
+def list_jobs():
+    """Trabajos en marcha, en cola (en orden de arranque) y terminados recientemente."""
+    return jsonify(dict(JOB_QUEUE.counts(), jobs=JOB_QUEUE.jobs()))
+
+@app.route('/api/jobs/<execution_id>', methods=['GET'])
+def get_job(execution_id):
+    if not resolve_execution_dir(execution_id):
+        return jsonify({'error': 'Ejecución no encontrada'}), 404
+    job = JOB_QUEUE.get(execution_id)
+    return jsonify({
+        'job': job.to_dict() if job else None,
+        'position': JOB_QUEUE.position(execution_id),
+        'status': read_scrape_status(execution_id),
+    })
+
+@app.route('/api/jobs/<execution_id>', methods=['PATCH'])
+def update_job(execution_id):
+    """Cambia la prioridad de un trabajo que aún espera en la cola."""
+    execution_path = resolve_execution_dir(execution_id)
+    if not execution_path:
+        return jsonify({'error': 'Ejecución no encontrada'}), 404
+    try:
+        priority = parse_priority((request.json or {}).get('priority'))
+    except ValueError as exc:
+        return jsonify({'error': str(exc)}), 400
+    job = JOB_QUEUE.set_priority(execution_id, priority)
+    if job is None:
+        if JOB_QUEUE.is_active(execution_id):
+            return jsonify({'error': 'La ejecución ya ha empezado'}), 409
+        return jsonify({'error': 'La ejecución no está en la cola'}), 404
+    status_path = os.path.join(execution_path, STATUS_NAME)
+    status = read_json(status_path)
+    if status.get('status') == 'queued':
+        status['priority'] = priority
+        write_json_atomic(status_path, status)
+    return jsonify({'execution': execution_id, 'priority': priority, 'position': JOB_QUEUE.position(execution_id)})
+
+@app.route('/api/jobs/<execution_id>', methods=['DELETE'])
+def delete_job(execution_id):
+    """Cancela un trabajo: lo retira de la cola o detiene su proceso."""
+    if not resolve_execution_dir(execution_id):
+        return jsonify({'error': 'Ejecución no encontrada'}), 404
+    job = cancel_job(execution_id)
+    if job is None:
+        return jsonify({'error': 'La ejecución no está en marcha ni en la cola'}), 404
+    return jsonify({'message': 'Scraping cancelado correctamente', 'execution': execution_id,
+                    'state': 'cancelled' if job.process is None else 'cancelling'})
+
+def resolve_documents_dir(execution_id):
+    """Carpeta de documentos de la ejecución indicada (o de la última)."""
+    if execution_id:
+        execution_path = resolve_execution_dir(execution_id)
+    else:
+        available_execs = list_execution_dirs()
+        execution_path = os.path.join(EJECUCIONES_DIR, available_execs[0]) if available_execs else None
+    if not execution_path:
+        return None
+    return os.path.join(execution_path, 'autoconsumo_documents')
+
+@app.route('/api/pages', methods=['GET'])
+def list_pages():
+    """Páginas guardadas (.txt/.html) de una ejecución, en segmentos o en ficheros."""
+    documents_dir = resolve_documents_dir(request.args.get('execution'))
+    if not documents_dir or not os.path.isdir(documents_dir):
+        return jsonify({'error': 'Ejecución no encontrada'}), 404
+    store = PageStore.open(documents_dir)
+    if store is not None:
+        pages = [
+            {'name': entry['name'], 'url': entry['url'], 'kind': entry['kind'], 'size': entry['size']}
+            for entry in store.entries()
+        ]
+    else:
+        pages = [
+            {'name': name, 'url': None, 'kind': os.path.splitext(name)[1][1:],
+             'size': os.path.getsize(os.path.join(documents_dir, name))}
+            for name in sorted(os.listdir(documents_dir))
+            if name.endswith(('.txt', '.html'))
+        ]
+    return jsonify({'pages': pages})
+
+@app.route('/api/pages/<name>', methods=['GET'])
+def get_page(name):
+    """Contenido de una página guardada, como texto plano (el HTML no se ejecuta)."""
+    documents_dir = resolve_documents_dir(request.args.get('execution'))
+    if not documents_dir or os.path.basename(name) != name:
+        return jsonify({'error': 'Página no encontrada'}), 404
+    store = PageStore.open(documents_dir)
+    try:
+        if store is not None:
+            if name not in store:
+                return jsonify({'error': 'Página no encontrada'}), 404
+            content = store.read(name)
+        else:
+            with open(os.path.join(documents_dir, name), 'rb') as f:
+                content = f.read()
+    except OSError:
+        return jsonify({'error': 'Página no encontrada'}), 404
+    response = Response(content, mimetype='text/plain')
+    response.charset = 'utf-8'
+    response.headers['X-Content-Type-Options'] = 'nosniff'
+    return response
+
+@app.route('/api/search', methods=['GET'])
+def search_pages():
+    """Búsqueda de texto completo en las páginas guardadas de todas las ejecuciones."""
+    query = (request.args.get('q') or '').strip()
+    if not query:
+        return jsonify({'error': 'Falta el parámetro q'}), 400
+    try:
+        page = max(1, int(request.args.get('page', 1)))
+        per_page = min(100, max(1, int(request.args.get('per_page', 20))))
+    except ValueError:
+        return jsonify({'error': 'page y per_page deben ser números'}), 400
+    execution_id = request.args.get('execution') or None
+
+    started = time.perf_counter()
+    index = SearchIndex.open_existing(SEARCH_INDEX_FILE)
+    if index is None:
+        total, results = 0, []
+    else:
+        try:
+            total, results = index.search(query, page=page, per_page=per_page, execution=execution_id)
+        finally:
+            index.close()
+    for result in results:
+        result['link'] = f"/api/pages/{quote(result['name'])}?execution={quote(result['execution'])}"
+    return jsonify({
+        'query': query,
+        'total': total,
+        'page': page,
+        'per_page': per_page,
+        'results': results,
+        'elapsed_ms': round((time.perf_counter() - started) * 1000, 2),
+    })
+
+# Reanálisis en segundo plano (reanalyze.py): uno por ejecución, con un tiempo máximo
+REANALYZE_TIMEOUT = 3600
+REANALYSES = {}
+REANALYSES_LOCK = threading.Lock()
+
+def run_reanalysis(execution_path):
+    """Ejecuta reanalyze.py y deja el resultado (o el error) en REANALYSES."""
+    execution_name = os.path.basename(execution_path)
+    # En un proceso aparte: el pool de procesos no debe heredar los hilos de Flask
+    args = [sys.executable, os.path.join(BASE_DIR, 'reanalyze.py'), execution_path,
+            '--terminos', TERMINOS_FILE, '--exclusiones', EXCLUSIONES_FILE, '--json']
+    try:
+        result = subprocess.run(args, cwd=BASE_DIR, capture_output=True, text=True, timeout=REANALYZE_TIMEOUT)
+        if result.returncode != 0:
+            outcome = {'state': 'error', 'error': f'Error en el reanálisis: {result.stderr.strip()[-500:]}'}
+        else:
+            summary = json.loads(result.stdout.strip().splitlines()[-1])
+            with open(os.path.join(summary['output_dir'], 'procesados.md'), 'r', encoding='utf-8') as f:
+                content = f.read()
+            outcome = dict(summary, state='finished', content=f'# Ejecución: {execution_name}\n\n{content}')
+    except subprocess.TimeoutExpired:
+        outcome = {'state': 'error', 'error': f'El reanálisis superó {REANALYZE_TIMEOUT} s y se ha detenido'}
+    except Exception as e:
+        outcome = {'state': 'error', 'error': f'Error en el reanálisis: {e}'}
+    with REANALYSES_LOCK:
+        REANALYSES[execution_name] = dict(REANALYSES.get(execution_name, {}), **outcome,
+                                          finished_at=datetime.now().isoformat(timespec='seconds'))
+
+def reanalysis_execution_path(execution_id):
+    if execution_id:
+        return resolve_execution_dir(execution_id)
+    available_execs = list_execution_dirs()
+    return os.path.join(EJECUCIONES_DIR, available_execs[0]) if available_execs else None
+
+@app.route('/api/reanalyze', methods=['POST'])
+def reanalyze_execution():
+    """
+    Reanaliza en segundo plano las páginas guardadas de una ejecución con los
+    términos y exclusiones actuales. Responde 202 al instante; el resultado se
+    consulta con GET /api/reanalyze?execution=...
+    """
+    execution_path = reanalysis_execution_path((request.get_json(silent=True) or {}).get('execution'))
+    if not execution_path:
+        return jsonify({'error': 'Ejecución no encontrada'}), 404
+    execution_name = os.path.basename(execution_path)
+    with REANALYSES_LOCK:
+        current = REANALYSES.get(execution_name)
+        if current is None or current['state'] != 'running':
+            current = REANALYSES[execution_name] = {
+                'execution': execution_name,
+                'state': 'running',
+                'started_at': datetime.now().isoformat(timespec='seconds'),
+            }
+            threading.Thread(target=run_reanalysis, args=(execution_path,),
+                             name=f'reanalyze-{execution_name}', daemon=True).start()
+        return jsonify(current), 202
+
+@app.route('/api/reanalyze', methods=['GET'])
+def reanalysis_status():
+    """Estado del último reanálisis de una ejecución: running, finished (con el resumen) o error."""
+    execution_path = reanalysis_execution_path(request.args.get('execution'))
+    if not execution_path:
+        return jsonify({'error': 'Ejecución no encontrada'}), 404
+    execution_name = os.path.basename(execution_path)
+    with REANALYSES_LOCK:
+        return jsonify(REANALYSES.get(execution_name) or {'execution': execution_name, 'state': 'idle'})
+
+@app.route('/api/storage/gc', methods=['POST'])
+def collect_storage_garbage():
+    """Elimina del almacén de documentos los ficheros que ya no usa ninguna ejecución."""
+    if JOB_QUEUE.counts()['running']:
+        return jsonify({'error': 'Hay un proceso de scraping en ejecución.'}), 409
+    if not os.path.isdir(BLOB_STORE_DIR):
+        return jsonify({'removed': 0, 'freed_bytes': 0})
+    try:
+        removed, freed = BlobStore(BLOB_STORE_DIR).collect_garbage(EJECUCIONES_DIR)
+        return jsonify({'removed': removed, 'freed_bytes': freed})
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
 @app.route('/api/procesados', methods=['GET'])
 def get_procesados():
     execution_id = request.args.get('execution')
@@ -330,26 +766,79 @@ def get_procesados():
         else:
             selected_exec = available_execs[0]
 
-        selected_exec_path = os.path.join(EJECUCIONES_DIR, selected_exec)
-        filepath = os.path.join(selected_exec_path, 'procesados.md')
+        return jsonify({'content': read_procesados(selected_exec)})
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
 
-        if not os.path.exists(filepath):
-            return jsonify({'content': f'# Ejecución: {selected_exec}\n\n*Procesando...*'})
+def read_procesados(execution_id):
+    """procesados.md de la ejecución con su cabecera (o el aviso de que aún no existe)."""
+    filepath = os.path.join(EJECUCIONES_DIR, execution_id, 'procesados.md')
+    if not os.path.exists(filepath):
+        return f'# Ejecución: {execution_id}\n\n*Procesando...*'
+    with open(filepath, 'r', encoding='utf-8') as f:
+        content = f.read()
+    return f'# Ejecución: {execution_id}\n\n{content}'
 
-        with open(filepath, 'r', encoding='utf-8') as f:
-            content = f.read()
+# Vista inicial del log: últimas LOG_TAIL_LINES líneas, leídas desde el final
+LOG_TAIL_LINES = 500
+LOG_TAIL_BLOCK = 64 * 1024
+# Si el cliente se ha quedado más atrás, se le envía otra vez la cola
+LOG_MAX_INCREMENT = 1024 * 1024
 
-        content_with_header = f'# Ejecución: {selected_exec}\n\n{content}'
-        return jsonify({'content': content_with_header})
-    except Exception as e:
-        return jsonify({'error': str(e)}), 500
+def read_log_tail(path, max_lines=LOG_TAIL_LINES, end=None):
+    """`(contenido, offset final)` con las últimas `max_lines` líneas completas (hasta `end`)."""
+    with open(path, 'rb') as f:
+        if end is None:
+            f.seek(0, os.SEEK_END)
+            end = f.tell()
+        position = end
+        data = b''
+        while position > 0 and data.count(b'\n') <= max_lines:
+            step = min(LOG_TAIL_BLOCK, position)
+            position -= step
+            f.seek(position)
+            data = f.read(step) + data
+    # Sólo líneas completas: la última puede estar escribiéndose
+    end -= len(data) - (data.rfind(b'\n') + 1)
+    data = data[:data.rfind(b'\n') + 1]
+    lines = data.split(b'\n')[:-1]
+    truncated = position > 0 or len(lines) > max_lines
+    if position > 0:
+        # La primera línea del bloque puede estar cortada
+        lines = lines[1:]
+    lines = lines[-max_lines:]
+    content = b''.join(line + b'\n' for line in lines).decode('utf-8', errors='ignore')
+    if truncated:
+        content = f'... (mostrando últimas {len(lines)} líneas)\n\n' + content
+    return content, end
+
+def read_log_since(path, offset):
+    """`(contenido, offset final)` con las líneas completas escritas desde `offset`."""
+    with open(path, 'rb') as f:
+        f.seek(offset)
+        data = f.read(LOG_MAX_INCREMENT)
+    data = data[:data.rfind(b'\n') + 1]
+    return data.decode('utf-8', errors='ignore'), offset + len(data)
+
+def parse_log_cursor(cursor):
+    """`(ejecución, offset)` de un cursor `<ejecución>:<offset>` o `(None, None)`."""
+    execution, _, offset = (cursor or '').rpartition(':')
+    if not execution or not offset.isdigit():
+        return None, None
+    return execution, int(offset)
 
 @app.route('/api/logs', methods=['GET'])
 def get_logs():
+    """
+    Log de una ejecución. Sin `cursor` devuelve las últimas líneas; con el
+    `cursor` de la respuesta anterior, sólo lo escrito desde entonces
+    (`reset: false`, para añadir). Si el log se ha reiniciado (nueva ejecución
+    o fichero truncado) vuelve a enviar la cola con `reset: true`.
+    """
     execution_id = request.args.get('execution')
     available_execs = list_execution_dirs()
     if not available_execs:
-        return jsonify({'content': 'Aún no hay ejecuciones.'})
+        return jsonify({'content': 'Aún no hay ejecuciones.', 'cursor': None, 'reset': True})
 
     try:
         if execution_id:
@@ -365,24 +854,231 @@ def get_logs():
 
         if not os.path.exists(log_filepath):
             message = 'Log no disponible para esta ejecución.' if execution_id else 'Esperando inicio del scraper...'
-            return jsonify({'content': message})
-
-        # Leer solo las últimas 500 líneas para evitar bloqueos
-        max_lines = 500
-        with open(log_filepath, 'r', encoding='utf-8', errors='ignore') as f:
-            lines = f.readlines()
+            return jsonify({'content': message, 'cursor': None, 'reset': True})
 
-        # Si hay más líneas que el máximo, tomar solo las últimas
-        if len(lines) > max_lines:
-            content = f'... (mostrando últimas {max_lines} líneas de {len(lines)} totales)\n\n'
-            content += ''.join(lines[-max_lines:])
+        cursor_exec, offset = parse_log_cursor(request.args.get('cursor'))
+        size = os.path.getsize(log_filepath)
+        if cursor_exec == selected_exec and offset is not None and offset <= size and size - offset <= LOG_MAX_INCREMENT:
+            content, end = read_log_since(log_filepath, offset)
+            reset = False
         else:
-            content = ''.join(lines)
+            content, end = read_log_tail(log_filepath)
+            reset = True
 
-        return jsonify({'content': content})
+        return jsonify({'content': content, 'cursor': f'{selected_exec}:{end}', 'reset': reset})
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+# ---- Eventos en directo (Server-Sent Events) ----
+
+# Frecuencia con la que el vigilante comprueba (con stat) los ficheros de la ejecución
+LIVE_POLL_INTERVAL = 0.5
+# Comentario SSE periódico para detectar clientes desconectados
+LIVE_KEEPALIVE = 15.0
+
+def file_signature(path):
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return stat.st_mtime_ns, stat.st_size
+
+def live_execution():
+    """
+    Ejecución que sigue /api/events sin `?execution=`: el trabajo en marcha
+    que arrancó más tarde; si no hay ninguno, la última lanzada (aunque siga
+    en la cola) o la más reciente de ejecuciones/.
+    """
+    execution = JOB_QUEUE.latest_running()
+    if execution is None and resolve_execution_dir(CURRENT_EXECUTION):
+        execution = CURRENT_EXECUTION
+    if execution is None:
+        available_execs = list_execution_dirs()
+        execution = available_execs[0] if available_execs else None
+    return execution
+
+class LiveFeed:
+    """
+    Vigilante único de una ejecución para todos los clientes de /api/events
+    (la de `execution` o, si es None, la que indica `live_execution`); estado,
+    log y resumen salen siempre de la misma carpeta. Un hilo compara cada LIVE_POLL_INTERVAL segundos el tamaño y
+    la fecha de status.json y control.json, activity.log, procesados.md y la
+    carpeta de ejecuciones, y sólo lee un fichero cuando ha cambiado; cada cambio se
+    reparte a las colas de los suscriptores. El trabajo depende de los
+    eventos, no del número de pestañas abiertas.
+    """
+
+    def __init__(self, execution=None):
+        self._lock = threading.Lock()
+        self._subscribers = set()
+        self._thread = None
+        self._signatures = {}
+        self.fixed_execution = execution
+        self.execution = None
+        self.status = None
+        self.log_path = None
+        self.log_offset = 0
+        self.procesados = None
+
+    def subscribe(self):
+        """Cola de eventos del nuevo cliente, empezando por el estado completo."""
+        events = queue.Queue()
+        with self._lock:
+            self._poll()
+            if self.status is not None:
+                events.put(('status', self.status))
+            if self.execution is None:
+                events.put(('log', {'content': 'Aún no hay ejecuciones.', 'cursor': None, 'reset': True}))
+            elif self.log_path is not None:
+                content, end = read_log_tail(self.log_path, end=self.log_offset)
+                events.put(('log', {'content': content, 'cursor': f'{self.execution}:{end}', 'reset': True}))
+            if self.procesados is not None:
+                events.put(('procesados', {'content': self.procesados}))
+            self._subscribers.add(events)
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name='live-feed', daemon=True)
+                self._thread.start()
+        return events
+
+    def unsubscribe(self, events):
+        with self._lock:
+            self._subscribers.discard(events)
+
+    def _run(self):
+        while True:
+            time.sleep(LIVE_POLL_INTERVAL)
+            with self._lock:
+                if not self._subscribers:
+                    # Sin clientes se deja de vigilar; el próximo lo relanza
+                    self._thread = None
+                    self._signatures = {}
+                    self.execution = None
+                    self.status = None
+                    return
+                try:
+                    self._poll()
+                except Exception as exc:
+                    print(f"Error vigilando la ejecución: {exc}", file=sys.stderr)
+
+    def _publish(self, event, data):
+        for events in self._subscribers:
+            events.put((event, data))
+
+    def _changed(self, key, path):
+        signature = file_signature(path)
+        if self._signatures.get(key) == signature:
+            return False
+        self._signatures[key] = signature
+        return True
+
+    def _poll(self):
+        execution = self.fixed_execution or live_execution()
+        if execution != self.execution:
+            if self.execution is not None:
+                self._publish('executions', {'current': execution})
+            self.execution = execution
+            self.log_path = None
+            self.log_offset = 0
+            self.procesados = None
+            for key in ('status', 'control', 'log', 'procesados'):
+                self._signatures.pop(key, None)
+
+        # Estado: status.json, control.json, el proceso del scraper (al terminar se
+        # corrige el estado) o la cola de ejecuciones
+        execution_path = os.path.join(EJECUCIONES_DIR, self.execution) if self.execution else None
+        process_alive = JOB_QUEUE.is_running(self.execution) if self.execution else False
+        jobs = JOB_QUEUE.counts()
+        status_dir = execution_path or EJECUCIONES_DIR
+        status_changed = self._changed('status', os.path.join(status_dir, STATUS_NAME))
+        control_changed = self._changed('control', os.path.join(status_dir, CONTROL_NAME))
+        if status_changed or control_changed or self._signatures.get('process') != (process_alive, jobs):
+            self._signatures['process'] = (process_alive, jobs)
+            status = read_scrape_status(self.execution)
+            if self.status is None:
+                self.status = status
+            else:
+                delta = {key: value for key, value in status.items() if self.status.get(key) != value}
+                delta.update({key: None for key in self.status if key not in status})
+                self.status = status
+                if delta:
+                    self._publish('status', delta)
+        if self.execution is None:
+            return
+
+        # Log: sólo las líneas nuevas; si se ha truncado, la cola otra vez
+        activity_log_path = os.path.join(execution_path, 'activity.log')
+        log_path = activity_log_path if os.path.exists(activity_log_path) else os.path.join(execution_path, 'scraper.log')
+        if self._changed('log', log_path) and os.path.exists(log_path):
+            size = os.path.getsize(log_path)
+            if log_path == self.log_path and self.log_offset <= size and size - self.log_offset <= LOG_MAX_INCREMENT:
+                content, end = read_log_since(log_path, self.log_offset)
+                reset = False
+            else:
+                content, end = read_log_tail(log_path)
+                reset = True
+            self.log_path = log_path
+            self.log_offset = end
+            if content or reset:
+                self._publish('log', {'content': content, 'cursor': f'{self.execution}:{end}', 'reset': reset})
+
+        # Resumen: procesados.md completo cuando cambia
+        if self._changed('procesados', os.path.join(execution_path, 'procesados.md')) or self.procesados is None:
+            procesados = read_procesados(self.execution)
+            if procesados != self.procesados:
+                self.procesados = procesados
+                self._publish('procesados', {'content': procesados})
+
+# Vigilante de la ejecución en marcha y, bajo demanda, uno por ejecución pedida
+LIVE_FEED = LiveFeed()
+LIVE_FEEDS = {}
+LIVE_FEEDS_LOCK = threading.Lock()
+
+def live_feed(execution_id=None):
+    if not execution_id:
+        return LIVE_FEED
+    with LIVE_FEEDS_LOCK:
+        feed = LIVE_FEEDS.get(execution_id)
+        if feed is None:
+            feed = LIVE_FEEDS[execution_id] = LiveFeed(execution_id)
+        return feed
+
+def format_event(event, data):
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+@app.route('/api/events', methods=['GET'])
+def live_events():
+    """
+    Flujo SSE de la ejecución actual: `status` (sólo los campos que cambian),
+    `log` (líneas nuevas, mismo formato que /api/logs), `procesados` (resumen
+    actualizado) y `executions` (ha empezado otra ejecución). El primer
+    mensaje de cada tipo lleva el estado completo. Con `?execution=` sigue
+    esa ejecución en lugar de la que está en marcha.
+    """
+    execution_id = request.args.get('execution')
+    if execution_id and not resolve_execution_dir(execution_id):
+        return jsonify({'error': 'Ejecución no encontrada'}), 404
+    feed = live_feed(execution_id)
+    events = feed.subscribe()
+
+    def stream():
+        try:
+            # Reintento del navegador si se corta la conexión
+            yield 'retry: 3000\n\n'
+            while True:
+                try:
+                    event, data = events.get(timeout=LIVE_KEEPALIVE)
+                except queue.Empty:
+                    yield ': ping\n\n'
+                    continue
+                yield format_event(event, data)
+        finally:
+            feed.unsubscribe(events)
+
+    return Response(stream(), mimetype='text/event-stream', headers={
+        'Cache-Control': 'no-cache',
+        'X-Accel-Buffering': 'no',
+    })
+
 if __name__ == '__main__':
     print("=" * 60)
     print("AUTOCONSUMO WEB SCRAPER")
@@ -390,7 +1086,12 @@ if __name__ == '__main__':
     print(f"Directorio base: {BASE_DIR}")
     print(f"Puerto: 5001")
     print(f"URL: http://localhost:5001")
+    print(f"Ejecuciones simultáneas: {MAX_CONCURRENT_JOBS}")
+    if WARM_WORKER_SOCKET:
+        print(f"Proceso en caliente: {WARM_WORKER_SOCKET}")
     print("=" * 60)
     print("\nPresiona Ctrl+C para detener el servidor\n")
 
+    recover_queued_jobs()
+
     app.run(debug=False, port=5001, threaded=True)
@@ -1,8 +1,32 @@
+"""
+Registro de actividad (`activity.log`) de una ejecución.
+
+`write_activity` no escribe en el disco: añade la línea a la cola del
+`ActivityLogWriter` de ese fichero y un hilo en segundo plano la vuelca cuando
+se acumulan FLUSH_LINES líneas o pasan FLUSH_INTERVAL segundos desde la
+primera pendiente. Así el spider y los pipelines no abren ni cierran el
+fichero en el hilo del reactor por cada evento.
+
+Los búferes se vacían al cerrar el spider (`flush_activity`), al salir del
+proceso (atexit) y al recibir SIGTERM (`install_signal_flush`).
+"""
+
+import atexit
+import logging
+import os
+import signal
 import threading
 from datetime import datetime
 from typing import Optional
 
-_lock = threading.Lock()
+logger = logging.getLogger(__name__)
+
+# Volcado por tamaño o por tiempo: la interfaz lee activity.log cada segundo
+FLUSH_LINES = 200
+FLUSH_INTERVAL = 0.5
+
+_writers = {}
+_writers_lock = threading.Lock()
 
 def format_line(source: str, level: str, message: str, url_index: Optional[int] = None) -> str:
     timestamp = datetime.now().strftime("%H:%M:%S")
@@ -15,10 +39,132 @@ def format_line(source: str, level: str, message: str, url_index: Optional[int]
     parts.append(message)
     return " · ".join(parts) + "\n"
 
+
+class ActivityLogWriter:
+    """Cola de líneas de un activity.log volcada por un hilo en segundo plano."""
+
+    def __init__(self, path: str, flush_lines: int = FLUSH_LINES, flush_interval: float = FLUSH_INTERVAL):
+        self.path = path
+        self.flush_lines = flush_lines
+        self.flush_interval = flush_interval
+        self._pending = []
+        self._condition = threading.Condition()
+        # Serializa los volcados del hilo y los explícitos para no desordenar líneas
+        self._write_lock = threading.Lock()
+        self._file = None
+        self._closed = False
+        self._thread = threading.Thread(target=self._run, name='activity-log', daemon=True)
+        self._thread.start()
+
+    def write(self, line: str) -> None:
+        with self._condition:
+            if not self._closed:
+                self._pending.append(line)
+                # La primera línea arranca el plazo; FLUSH_LINES fuerzan el volcado
+                if len(self._pending) == 1 or len(self._pending) >= self.flush_lines:
+                    self._condition.notify()
+                return
+        # Escritor ya cerrado (salida del proceso): escritura directa
+        with self._write_lock:
+            with open(self.path, 'a', encoding='utf-8') as log_file:
+                log_file.write(line)
+
+    def _run(self) -> None:
+        while True:
+            with self._condition:
+                while not self._closed and not self._pending:
+                    self._condition.wait()
+                if self._closed:
+                    return
+                if len(self._pending) < self.flush_lines:
+                    self._condition.wait(self.flush_interval)
+            self.flush()
+
+    def flush(self) -> None:
+        with self._write_lock:
+            with self._condition:
+                lines, self._pending = self._pending, []
+            if not lines:
+                return
+            try:
+                if self._file is None:
+                    self._file = open(self.path, 'a', encoding='utf-8')
+                self._file.write(''.join(lines))
+                self._file.flush()
+            except OSError as exc:
+                logger.warning("No se pudo escribir en %s: %s", self.path, exc)
+                self._close_file()
+
+    def close(self) -> None:
+        self.flush()
+        with self._condition:
+            self._closed = True
+            self._condition.notify()
+        self._thread.join(timeout=5)
+        # Líneas añadidas mientras se cerraba
+        self.flush()
+        with self._write_lock:
+            self._close_file()
+
+    def _close_file(self) -> None:
+        if self._file is not None:
+            try:
+                self._file.close()
+            except OSError:
+                pass
+            self._file = None
+
+
+def get_writer(activity_log_path: str) -> ActivityLogWriter:
+    with _writers_lock:
+        writer = _writers.get(activity_log_path)
+        if writer is None:
+            writer = _writers[activity_log_path] = ActivityLogWriter(activity_log_path)
+        return writer
+
 def write_activity(activity_log_path: str, source: str, level: str, message: str, url_index: Optional[int] = None) -> None:
     if not activity_log_path:
         return
     line = format_line(source, level, message, url_index=url_index)
-    with _lock:
-        with open(activity_log_path, 'a', encoding='utf-8') as log_file:
-            log_file.write(line)
+    get_writer(activity_log_path).write(line)
+
+def flush_activity(activity_log_path: Optional[str] = None) -> None:
+    """Vuelca ya las líneas pendientes de un fichero (o de todos)."""
+    with _writers_lock:
+        if activity_log_path:
+            writers = [_writers[activity_log_path]] if activity_log_path in _writers else []
+        else:
+            writers = list(_writers.values())
+    for writer in writers:
+        writer.flush()
+
+def close_activity() -> None:
+    with _writers_lock:
+        writers = list(_writers.values())
+        _writers.clear()
+    for writer in writers:
+        writer.close()
+
+def install_signal_flush() -> None:
+    """
+    Vuelca los búferes antes de que SIGTERM (o SIGBREAK en Windows) termine el
+    proceso. Durante el rastreo Scrapy sustituye estos manejadores por su
+    parada ordenada, que pasa por el cierre del spider.
+    """
+    for name in ('SIGTERM', 'SIGBREAK'):
+        signum = getattr(signal, name, None)
+        if signum is None:
+            continue
+        previous = signal.getsignal(signum)
+
+        def handler(received, frame, previous=previous):
+            flush_activity()
+            if callable(previous):
+                previous(received, frame)
+            elif previous != signal.SIG_IGN:
+                signal.signal(received, signal.SIG_DFL)
+                os.kill(os.getpid(), received)
+
+        signal.signal(signum, handler)
+
+atexit.register(close_activity)
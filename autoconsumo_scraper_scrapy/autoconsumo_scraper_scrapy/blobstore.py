@@ -0,0 +1,121 @@
+"""
+Almacén de documentos direccionado por contenido, compartido entre ejecuciones.
+
+Cada fichero descargado se guarda una sola vez en `<almacén>/ab/cdef...`
+(SHA-256 del contenido) y la carpeta de documentos de la ejecución recibe un
+enlace duro a ese blob (o una copia si el sistema de ficheros no admite
+enlaces). Cada ejecución anota en `blobs.jsonl` qué blobs usa; el recolector
+elimina los blobs que ya no aparecen en ningún manifiesto ni tienen enlaces.
+
+Sin dependencias de Scrapy (lo usa también app.py).
+"""
+
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+import time
+from pathlib import Path
+
+MANIFEST_NAME = 'blobs.jsonl'
+
+# Blobs recién escritos cuyo manifiesto puede no estar aún en disco
+GC_GRACE_SECONDS = 3600
+
+
+class BlobStore:
+
+    def __init__(self, root):
+        self.root = Path(root)
+        self.root.mkdir(parents=True, exist_ok=True)
+
+    def blob_path(self, digest):
+        return self.root / digest[:2] / digest[2:]
+
+    def put(self, data):
+        """Guarda `data` si no existe ya; devuelve `(sha256, creado)`."""
+        digest = hashlib.sha256(data).hexdigest()
+        path = self.blob_path(digest)
+        if path.exists():
+            return digest, False
+        path.parent.mkdir(exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=path.parent, prefix='.tmp-')
+        try:
+            with os.fdopen(fd, 'wb') as tmp:
+                tmp.write(data)
+            os.replace(tmp_path, path)
+        except BaseException:
+            try:
+                os.remove(tmp_path)
+            except OSError:
+                pass
+            raise
+        return digest, True
+
+    def link(self, digest, destination):
+        """Enlaza el blob en `destination`; devuelve True si fue un enlace duro."""
+        destination = Path(destination)
+        if destination.exists():
+            destination.unlink()
+        try:
+            os.link(self.blob_path(digest), destination)
+            return True
+        except OSError:
+            # Otro volumen o sistema de ficheros sin enlaces duros
+            shutil.copyfile(self.blob_path(digest), destination)
+            return False
+
+    def iter_blobs(self):
+        for prefix in self.root.iterdir():
+            if not prefix.is_dir() or len(prefix.name) != 2:
+                continue
+            for blob in prefix.iterdir():
+                if not blob.name.startswith('.tmp-'):
+                    yield prefix.name + blob.name, blob
+
+    def collect_garbage(self, executions_dir, grace_seconds=GC_GRACE_SECONDS):
+        """
+        Elimina los blobs que ningún manifiesto de `executions_dir` referencia
+        y que no tienen otros enlaces duros. Devuelve `(eliminados, bytes liberados)`.
+        """
+        referenced = referenced_digests(executions_dir)
+        cutoff = time.time() - grace_seconds
+        removed = freed = 0
+        for digest, blob in self.iter_blobs():
+            if digest in referenced:
+                continue
+            try:
+                stat = blob.stat()
+                if stat.st_nlink > 1 or stat.st_mtime > cutoff:
+                    continue
+                blob.unlink()
+            except OSError:
+                continue
+            removed += 1
+            freed += stat.st_size
+        return removed, freed
+
+
+def append_manifest(manifest_path, path, digest, size):
+    with open(manifest_path, 'a', encoding='utf-8') as manifest:
+        manifest.write(json.dumps({'path': path, 'sha256': digest, 'size': size}) + '\n')
+
+
+def referenced_digests(executions_dir):
+    """Blobs que aparecen en el manifiesto de alguna ejecución."""
+    referenced = set()
+    executions_dir = Path(executions_dir)
+    if not executions_dir.is_dir():
+        return referenced
+    for manifest in executions_dir.glob(f'*/{MANIFEST_NAME}'):
+        try:
+            with open(manifest, 'r', encoding='utf-8') as handle:
+                for line in handle:
+                    try:
+                        referenced.add(json.loads(line)['sha256'])
+                    except (ValueError, KeyError):
+                        continue
+        except OSError:
+            continue
+    return referenced
@@ -0,0 +1,132 @@
+"""
+Descarte de peticiones pendientes cuando se agota un presupuesto de rastreo.
+
+El spider decide qué peticiones sobran (`GenericSpider.should_drop`); este
+middleware las descarta con `IgnoreRequest` justo antes de descargarlas, de
+modo que las que ya estaban en la cola no llegan a la red y la ejecución
+termina de forma natural cuando la cola se vacía (las descargas de ficheros
+en curso se completan).
+
+También registra los bytes recibidos por cada petición
+(`GenericSpider.record_transfer`) para los presupuestos por fuente, que se
+leen de las columnas adicionales de `fuentes.csv` en formato `clave=valor`::
+
+    Portal IDAE;https://www.idae.es/;profundidad=2;paginas=200;bytes=500MB;tiempo=30m;estrategia=stop
+"""
+
+import re
+
+from scrapy.exceptions import IgnoreRequest
+
+from autoconsumo_scraper_scrapy.textnorm import normalize_term
+
+CRAWL_STRATEGIES = ('continue', 'stop', 'best-first')
+
+# Alias aceptados en fuentes.csv (ya normalizados: minúsculas y sin tildes)
+SOURCE_LIMIT_KEYS = {
+    'profundidad': 'max_depth',
+    'depth': 'max_depth',
+    'max_depth': 'max_depth',
+    'paginas': 'max_pages',
+    'pages': 'max_pages',
+    'max_pages': 'max_pages',
+    'bytes': 'max_bytes',
+    'tamano': 'max_bytes',
+    'max_bytes': 'max_bytes',
+    'tiempo': 'max_seconds',
+    'time': 'max_seconds',
+    'max_time': 'max_seconds',
+    'estrategia': 'crawl_strategy',
+    'strategy': 'crawl_strategy',
+    'crawl_strategy': 'crawl_strategy',
+}
+
+_SIZE_UNITS = {'': 1, 'b': 1, 'k': 1024, 'kb': 1024, 'm': 1024 ** 2, 'mb': 1024 ** 2,
+               'g': 1024 ** 3, 'gb': 1024 ** 3}
+_DURATION_UNITS = {'': 1, 's': 1, 'seg': 1, 'm': 60, 'min': 60, 'h': 3600}
+_QUANTITY = re.compile(r'^(\d+(?:[.,]\d+)?)\s*([a-z]*)$')
+
+
+def _parse_quantity(text, units):
+    match = _QUANTITY.match(text.strip().lower())
+    if not match or match.group(2) not in units:
+        raise ValueError(text)
+    return float(match.group(1).replace(',', '.')) * units[match.group(2)]
+
+
+def parse_size(text):
+    """'500MB', '1.5g' o '2048' (bytes) -> bytes."""
+    return int(_parse_quantity(text, _SIZE_UNITS))
+
+
+def format_size(num_bytes):
+    for unit, factor in (('GB', 1024 ** 3), ('MB', 1024 ** 2), ('KB', 1024)):
+        if num_bytes >= factor:
+            return f"{num_bytes / factor:.1f} {unit}"
+    return f"{num_bytes} B"
+
+
+def parse_duration(text):
+    """'30m', '1h', '90s' o '90' (segundos) -> segundos."""
+    return _parse_quantity(text, _DURATION_UNITS)
+
+
+def parse_source_limits(extra):
+    """
+    Extrae los límites de una fuente de sus columnas adicionales.
+
+    Devuelve `(limits, invalid)`: los límites reconocidos y las columnas
+    `clave=valor` que no se pudieron interpretar. Las columnas sin `=` son
+    notas y se ignoran.
+    """
+    limits = {}
+    invalid = []
+    for column in extra or ():
+        key, sep, value = column.partition('=')
+        if not sep:
+            continue
+        name = SOURCE_LIMIT_KEYS.get(normalize_term(key).replace(' ', '_'))
+        value = value.strip()
+        try:
+            if name is None:
+                raise ValueError(key)
+            if name in ('max_depth', 'max_pages'):
+                limits[name] = int(value)
+            elif name == 'max_bytes':
+                limits[name] = parse_size(value)
+            elif name == 'max_seconds':
+                limits[name] = parse_duration(value)
+            else:
+                if value.lower() not in CRAWL_STRATEGIES:
+                    raise ValueError(value)
+                limits[name] = value.lower()
+        except ValueError:
+            invalid.append(column)
+    return limits, invalid
+
+
+class CrawlBudgetMiddleware:
+
+    def __init__(self, stats=None):
+        self.stats = stats
+
+    @classmethod
+    def from_crawler(cls, crawler):
+        return cls(crawler.stats)
+
+    def process_request(self, request, spider):
+        should_drop = getattr(spider, 'should_drop', None)
+        if not callable(should_drop):
+            return None
+        reason = should_drop(request)
+        if reason:
+            if self.stats is not None:
+                self.stats.inc_value(f'budget/dropped/{reason}')
+            raise IgnoreRequest(f"Presupuesto agotado ({reason}): {request.url}")
+        return None
+
+    def process_response(self, request, response, spider):
+        record_transfer = getattr(spider, 'record_transfer', None)
+        if callable(record_transfer):
+            record_transfer(request, len(response.body))
+        return response
@@ -0,0 +1,177 @@
+"""
+Canonicalización de URLs para detectar duplicados.
+
+La huella por defecto de Scrapy (`canonicalize_url`) ya ordena los parámetros y
+descarta el fragmento, pero trata como páginas distintas las variantes con
+identificador de sesión, parámetros de seguimiento o `index.html`. Aquí se
+calcula una clave canónica por dominio y `CanonicalRequestFingerprinter` la
+usa como huella, de modo que el dupefilter (y la caché HTTP) ven esas
+variantes como una sola URL. La URL que se descarga no se modifica.
+
+Reglas (`URL_CANONICALIZATION` en settings.py)::
+
+    {
+        'default': {'deny_params': [...], 'collapse_index': True},
+        'domains': {
+            'www.boe.es': {'allow_params': ['id'], 'fold_case': True},
+        },
+    }
+
+- `allow_params`: si se indica, sólo se conservan esos parámetros.
+- `deny_params`: parámetros que se eliminan (`utm_*` admite prefijo).
+- `token_params`: parámetros que se eliminan sólo si su valor parece un
+  identificador de sesión (`sid=9f86d081884c7d65...`, no `sid=12`).
+- `fold_case`: ruta en minúsculas (servidores que no distinguen mayúsculas).
+- `collapse_index`: `/dir/index.html` equivale a `/dir/`.
+- `strip_trailing_slash`: `/dir/` equivale a `/dir`.
+
+Las reglas de un dominio se combinan con `default` y se aplican también a sus
+subdominios.
+"""
+
+import hashlib
+import re
+from posixpath import basename, dirname
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+from weakref import WeakKeyDictionary
+
+from w3lib.url import canonicalize_url
+
+DEFAULT_DENY_PARAMS = (
+    'jsessionid', 'phpsessid', 'aspsessionid', 'sessionid', 'session_id',
+    'cfid', 'cftoken', 'fbclid', 'gclid', 'msclkid', '_ga', 'utm_*',
+)
+
+# Nombres genéricos que muchos sitios usan también para contenido (id de sitio o sección)
+DEFAULT_TOKEN_PARAMS = ('sid',)
+
+# Valor con aspecto de token de sesión: 16 o más caracteres alfanuméricos con letras y cifras
+_SESSION_TOKEN = re.compile(r'^(?=[^0-9]*[0-9])(?=[^a-zA-Z]*[a-zA-Z])[A-Za-z0-9_-]{16,}$')
+
+INDEX_PAGES = frozenset({
+    'index.html', 'index.htm', 'index.shtml', 'index.php', 'index.asp', 'index.aspx',
+    'default.htm', 'default.html', 'default.asp', 'default.aspx',
+})
+
+DEFAULT_PORTS = {'http': 80, 'https': 443}
+
+DEFAULT_RULES = {
+    'allow_params': None,
+    'deny_params': DEFAULT_DENY_PARAMS,
+    'token_params': DEFAULT_TOKEN_PARAMS,
+    'fold_case': False,
+    'collapse_index': True,
+    'strip_trailing_slash': False,
+}
+
+
+class CanonicalRules:
+    __slots__ = ('allow_params', 'deny_params', 'deny_prefixes', 'token_params', 'fold_case',
+                 'collapse_index', 'strip_trailing_slash')
+
+    def __init__(self, allow_params=None, deny_params=(), token_params=(), fold_case=False,
+                 collapse_index=True, strip_trailing_slash=False):
+        self.allow_params = (
+            frozenset(param.lower() for param in allow_params) if allow_params is not None else None
+        )
+        deny = [param.lower() for param in deny_params or ()]
+        self.deny_params = frozenset(param for param in deny if not param.endswith('*'))
+        self.deny_prefixes = tuple(param[:-1] for param in deny if param.endswith('*'))
+        self.token_params = frozenset(param.lower() for param in token_params or ())
+        self.fold_case = bool(fold_case)
+        self.collapse_index = bool(collapse_index)
+        self.strip_trailing_slash = bool(strip_trailing_slash)
+
+    def keeps_param(self, name, value=''):
+        lowered = name.lower()
+        if self.allow_params is not None:
+            return lowered in self.allow_params
+        if lowered in self.deny_params:
+            return False
+        if lowered in self.token_params and _SESSION_TOKEN.match(value):
+            return False
+        return not (self.deny_prefixes and lowered.startswith(self.deny_prefixes))
+
+
+class UrlCanonicalizer:
+
+    def __init__(self, config=None):
+        config = config or {}
+        self.default_options = dict(DEFAULT_RULES, **(config.get('default') or {}))
+        self.default_rules = CanonicalRules(**self.default_options)
+        self.domain_rules = {
+            domain.lower().lstrip('.'): CanonicalRules(**dict(self.default_options, **(options or {})))
+            for domain, options in (config.get('domains') or {}).items()
+        }
+
+    def rules_for(self, host):
+        if self.domain_rules:
+            candidate = host
+            while candidate:
+                rules = self.domain_rules.get(candidate)
+                if rules is not None:
+                    return rules
+                _, _, candidate = candidate.partition('.')
+        return self.default_rules
+
+    def key(self, url):
+        """Clave canónica de `url`: dos URLs con la misma clave son la misma página."""
+        parts = urlsplit(url)
+        scheme = parts.scheme.lower()
+        host = (parts.hostname or '').lower()
+        rules = self.rules_for(host)
+
+        netloc = host
+        try:
+            port = parts.port
+        except ValueError:
+            port = None
+        if port and port != DEFAULT_PORTS.get(scheme):
+            netloc = f"{host}:{port}"
+
+        # Parámetros de ruta tipo ";jsessionid=..."
+        path = parts.path.split(';', 1)[0] or '/'
+        if rules.fold_case:
+            path = path.lower()
+        if rules.collapse_index and basename(path).lower() in INDEX_PAGES:
+            path = dirname(path).rstrip('/') + '/'
+        if rules.strip_trailing_slash and len(path) > 1:
+            path = path.rstrip('/') or '/'
+
+        query = ''
+        if parts.query:
+            pairs = [
+                (name, value)
+                for name, value in parse_qsl(parts.query, keep_blank_values=True)
+                if rules.keeps_param(name, value)
+            ]
+            query = urlencode(pairs)
+
+        # canonicalize_url ordena los parámetros, normaliza el escapado y quita el fragmento
+        return canonicalize_url(urlunsplit((scheme, netloc, path, query, '')))
+
+
+class CanonicalRequestFingerprinter:
+    """REQUEST_FINGERPRINTER_CLASS basado en `UrlCanonicalizer.key`."""
+
+    def __init__(self, crawler=None):
+        config = crawler.settings.getdict('URL_CANONICALIZATION') if crawler else {}
+        self.canonicalizer = UrlCanonicalizer(config)
+        self._cache = WeakKeyDictionary()
+
+    @classmethod
+    def from_crawler(cls, crawler):
+        return cls(crawler)
+
+    def fingerprint(self, request):
+        cached = self._cache.get(request)
+        if cached is None:
+            digest = hashlib.sha1()
+            digest.update(request.method.encode('ascii'))
+            digest.update(b' ')
+            digest.update(self.canonicalizer.key(request.url).encode('utf-8'))
+            digest.update(b' ')
+            digest.update(request.body or b'')
+            cached = digest.digest()
+            self._cache[request] = cached
+        return cached
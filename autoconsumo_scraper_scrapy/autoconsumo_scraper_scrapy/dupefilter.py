@@ -0,0 +1,184 @@
+"""
+Dupefilter con memoria acotada.
+
+`RFPDupeFilter` guarda todas las huellas en un `set` en memoria (y, con JOBDIR,
+las vuelve a cargar completas al reanudar). `BoundedDupeFilter` mantiene el
+`set` hasta `SEEN_SET_MEMORY_LIMIT` huellas y a partir de ahí las traslada a
+un almacén de tamaño fijo en RAM:
+
+- `bloom` (por defecto): filtro de Bloom de `SEEN_SET_BLOOM_CAPACITY`
+  elementos y tasa de falsos positivos `SEEN_SET_BLOOM_ERROR_RATE`. Un falso
+  positivo hace que se omita una página nueva; nunca se repite una visitada.
+- `disk`: tabla SQLite exacta (en JOBDIR si existe o en un directorio
+  temporal).
+
+El fichero `requests.seen` de JOBDIR se sigue escribiendo igual, así que la
+reanudación (resume.py) no cambia.
+"""
+
+import logging
+import math
+import os
+import shutil
+import sqlite3
+import tempfile
+
+from scrapy.dupefilters import RFPDupeFilter
+from scrapy.utils.job import job_dir
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MEMORY_LIMIT = 200_000
+DEFAULT_BLOOM_CAPACITY = 10_000_000
+DEFAULT_BLOOM_ERROR_RATE = 0.001
+
+
+class BloomFilter:
+    """Filtro de Bloom sobre huellas SHA1 (se usan sus bytes como hashes)."""
+
+    def __init__(self, capacity, error_rate):
+        capacity = max(1, int(capacity))
+        self.size = max(8, int(-capacity * math.log(error_rate) / (math.log(2) ** 2)))
+        self.hashes = max(1, round(self.size / capacity * math.log(2)))
+        self.bits = bytearray((self.size + 7) // 8)
+        self.capacity = capacity
+        self.count = 0
+
+    def _positions(self, fingerprint):
+        h1 = int.from_bytes(fingerprint[:8], 'little')
+        h2 = int.from_bytes(fingerprint[8:16], 'little') | 1
+        size = self.size
+        return [(h1 + i * h2) % size for i in range(self.hashes)]
+
+    def add(self, fingerprint):
+        """Añade la huella; devuelve True si (probablemente) ya estaba."""
+        bits = self.bits
+        present = True
+        for position in self._positions(fingerprint):
+            byte, mask = position >> 3, 1 << (position & 7)
+            if not bits[byte] & mask:
+                present = False
+                bits[byte] |= mask
+        if not present:
+            self.count += 1
+        return present
+
+    def close(self):
+        pass
+
+
+class SqliteSeenStore:
+    """Conjunto exacto de huellas en una tabla SQLite."""
+
+    def __init__(self, directory=None):
+        self._tmp_dir = None
+        if directory is None:
+            directory = self._tmp_dir = tempfile.mkdtemp(prefix='seen_')
+        self.path = os.path.join(directory, 'requests.seen.sqlite')
+        self.conn = sqlite3.connect(self.path, isolation_level=None)
+        self.conn.execute('PRAGMA journal_mode=OFF')
+        self.conn.execute('PRAGMA synchronous=OFF')
+        self.conn.execute('DROP TABLE IF EXISTS seen')
+        self.conn.execute('CREATE TABLE seen (fp BLOB PRIMARY KEY) WITHOUT ROWID')
+        self.count = 0
+
+    def add(self, fingerprint):
+        cursor = self.conn.execute('INSERT OR IGNORE INTO seen (fp) VALUES (?)', (fingerprint,))
+        if cursor.rowcount:
+            self.count += 1
+            return False
+        return True
+
+    def close(self):
+        self.conn.close()
+        if self._tmp_dir:
+            shutil.rmtree(self._tmp_dir, ignore_errors=True)
+        else:
+            try:
+                os.remove(self.path)
+            except OSError:
+                pass
+
+
+class BoundedDupeFilter(RFPDupeFilter):
+
+    def __init__(self, path=None, debug=False, *, fingerprinter=None,
+                 memory_limit=DEFAULT_MEMORY_LIMIT, overflow='bloom',
+                 bloom_capacity=DEFAULT_BLOOM_CAPACITY, bloom_error_rate=DEFAULT_BLOOM_ERROR_RATE):
+        self.memory_limit = max(0, int(memory_limit))
+        self.overflow_kind = overflow
+        self.bloom_capacity = bloom_capacity
+        self.bloom_error_rate = bloom_error_rate
+        self.job_path = path
+        self.overflow = None
+        self._bloom_warned = False
+        # El padre carga requests.seen en self.fingerprints; se hace aquí por
+        # bloques para respetar el límite de memoria
+        super().__init__(None, debug, fingerprinter=fingerprinter)
+        if path:
+            self.file = open(os.path.join(path, 'requests.seen'), 'a+', encoding='utf-8')
+            self.file.seek(0)
+            for line in self.file:
+                line = line.rstrip()
+                if line:
+                    self._add(bytes.fromhex(line))
+
+    @classmethod
+    def _from_settings(cls, settings, *, fingerprinter=None):
+        return cls(
+            job_dir(settings),
+            settings.getbool('DUPEFILTER_DEBUG'),
+            fingerprinter=fingerprinter,
+            memory_limit=settings.getint('SEEN_SET_MEMORY_LIMIT', DEFAULT_MEMORY_LIMIT),
+            overflow=settings.get('SEEN_SET_OVERFLOW', 'bloom'),
+            bloom_capacity=settings.getint('SEEN_SET_BLOOM_CAPACITY', DEFAULT_BLOOM_CAPACITY),
+            bloom_error_rate=settings.getfloat('SEEN_SET_BLOOM_ERROR_RATE', DEFAULT_BLOOM_ERROR_RATE),
+        )
+
+    def _spill(self):
+        if self.overflow_kind == 'disk':
+            self.overflow = SqliteSeenStore(self.job_path)
+            self.overflow.conn.execute('BEGIN')
+        else:
+            self.overflow = BloomFilter(self.bloom_capacity, self.bloom_error_rate)
+        for fingerprint in self.fingerprints:
+            self.overflow.add(fingerprint)
+        if self.overflow_kind == 'disk':
+            self.overflow.conn.execute('COMMIT')
+        logger.info(
+            "Más de %d URLs vistas: se pasa a almacén '%s'",
+            self.memory_limit, self.overflow_kind,
+        )
+        self.fingerprints = set()
+
+    def _add(self, fingerprint):
+        """Registra la huella; devuelve True si ya se había visto."""
+        if self.overflow is not None:
+            seen = self.overflow.add(fingerprint)
+            if (not self._bloom_warned and isinstance(self.overflow, BloomFilter)
+                    and self.overflow.count > self.overflow.capacity):
+                self._bloom_warned = True
+                logger.warning(
+                    "El filtro de Bloom supera su capacidad (%d); aumentan los falsos positivos",
+                    self.overflow.capacity,
+                )
+            return seen
+        if fingerprint in self.fingerprints:
+            return True
+        self.fingerprints.add(fingerprint)
+        if len(self.fingerprints) > self.memory_limit:
+            self._spill()
+        return False
+
+    def request_seen(self, request):
+        fingerprint = self.fingerprinter.fingerprint(request)
+        if self._add(fingerprint):
+            return True
+        if self.file:
+            self.file.write(fingerprint.hex() + '\n')
+        return False
+
+    def close(self, reason):
+        super().close(reason)
+        if self.overflow is not None:
+            self.overflow.close()
@@ -0,0 +1,127 @@
+"""
+Extracción de texto visible y enlaces en un único recorrido del árbol lxml.
+
+Sustituye a `response.css('body *::text')` + `response.css('a::attr(href)')`:
+se recorre el `<body>` una sola vez, se ignora el contenido no visible
+(`<script>`, `<style>`, `hidden`, `display:none`...) y, si se pasa un
+TermScanner, el recorrido se detiene en cuanto aparece una exclusión.
+"""
+
+from typing import List, Optional, Tuple
+
+from autoconsumo_scraper_scrapy.matcher import MatchResult, TermScanner
+
+# Elementos cuyo contenido nunca se muestra como texto (sus enlaces sí se recogen)
+SKIPPED_TAGS = frozenset({
+    'script', 'style', 'noscript', 'template', 'head', 'title', 'meta', 'link',
+    'iframe', 'object', 'embed', 'svg', 'canvas', 'select', 'option',
+})
+
+
+class PageContent:
+    __slots__ = ('chunks', 'links', 'matches', 'exclusion')
+
+    def __init__(self, chunks: List[str], links: List[Tuple[str, str]],
+                 matches: Optional[MatchResult], exclusion: Optional[str]):
+        self.chunks = chunks
+        # [(href, texto del enlace)] en orden de aparición
+        self.links = links
+        self.matches = matches
+        self.exclusion = exclusion
+
+    @property
+    def text(self) -> str:
+        return ' '.join(self.chunks)
+
+    @property
+    def hrefs(self) -> List[str]:
+        return [href for href, _ in self.links]
+
+
+def _is_hidden(element) -> bool:
+    if element.get('hidden') is not None or element.get('aria-hidden') == 'true':
+        return True
+    style = element.get('style')
+    if style and 'display' in style:
+        compact = style.replace(' ', '').lower()
+        return 'display:none' in compact
+    return False
+
+
+def extract_page(response, scanner: Optional[TermScanner] = None) -> PageContent:
+    """
+    Recorre el documento de `response` y devuelve el texto visible por nodos,
+    los enlaces `<a href>` con su texto y, si hay `scanner`, el resultado del
+    análisis de términos. Si aparece una exclusión el recorrido se interrumpe
+    y `exclusion` contiene el término original.
+
+    Los enlaces dentro de elementos ocultos (menús desplegables) o de
+    SKIPPED_TAGS (`<noscript>`, `<svg>`...) se conservan, como con
+    `a::attr(href)`; sólo su texto se descarta.
+    """
+    root = response.selector.root
+    body = root if getattr(root, 'tag', None) == 'body' else next(root.iter('body'), root)
+
+    chunks: List[str] = []
+    links: List[Tuple[str, str]] = []
+    open_anchors: List[Tuple[Optional[str], int]] = []
+    hidden_depth = 0
+    exclusion = None
+    feed = scanner.feed if scanner is not None else None
+
+    text = body.text
+    if text and not text.isspace():
+        chunks.append(text)
+        if feed is not None:
+            exclusion = feed(text)
+
+    # Pila de (elemento, iterador de hijos, estaba_oculto)
+    stack = [(body, iter(body), False)]
+    while stack and exclusion is None:
+        parent, children, parent_hidden = stack[-1]
+        element = next(children, None)
+        if element is None:
+            # Cierre de `parent`: se resuelve el enlace y se emite su cola
+            stack.pop()
+            if not stack:
+                break
+            if parent_hidden:
+                hidden_depth -= 1
+            if parent.tag == 'a' and open_anchors:
+                href, start = open_anchors.pop()
+                if href is not None:
+                    links.append((href, ' '.join(chunks[start:]).strip()))
+            text = parent.tail
+        else:
+            tag = element.tag
+            if isinstance(tag, str) and tag not in SKIPPED_TAGS:
+                hidden = _is_hidden(element)
+                if hidden:
+                    hidden_depth += 1
+                if tag == 'a':
+                    open_anchors.append((element.get('href'), len(chunks)))
+                stack.append((element, iter(element), hidden))
+                text = element.text
+            else:
+                if isinstance(tag, str):
+                    # Elemento no visible: sin texto, pero con sus enlaces
+                    for anchor in element.iter('a'):
+                        href = anchor.get('href')
+                        if href is not None:
+                            links.append((href, ''))
+                # Comentarios y elementos no visibles: sólo cuenta la cola
+                text = element.tail
+
+        if hidden_depth == 0 and text and not text.isspace():
+            chunks.append(text)
+            if feed is not None:
+                exclusion = feed(text)
+
+    if exclusion is not None:
+        return PageContent(chunks, links, None, exclusion)
+
+    matches = None
+    if scanner is not None:
+        matches = scanner.finish()
+        exclusion = matches.first_exclusion
+    return PageContent(chunks, links, matches, exclusion)
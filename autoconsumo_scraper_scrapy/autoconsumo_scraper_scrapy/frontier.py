@@ -0,0 +1,60 @@
+"""
+Prioridad de enlaces para el modo de rastreo `best-first`.
+
+Cada enlace recibe una puntuación a partir de los términos de `keywords_map`
+que aparecen en su texto de anclaje, en la ruta de su URL y en la página que lo
+contiene (más una parte de la puntuación heredada de esa página). El scheduler
+de Scrapy atiende primero las peticiones con mayor `priority`, así que las
+ramas prometedoras se exploran antes que la navegación o los avisos legales.
+"""
+
+import re
+from urllib.parse import unquote, urlparse
+
+from autoconsumo_scraper_scrapy.matcher import TermMatcher
+from autoconsumo_scraper_scrapy.textnorm import normalize_term
+
+ANCHOR_WEIGHT = 3.0
+URL_WEIGHT = 2.0
+PAGE_WEIGHT = 1.0
+# Fracción de la puntuación del enlace padre que heredan sus hijos
+INHERITED_WEIGHT = 0.5
+# Términos distintos de la página que cuentan como máximo
+MAX_PAGE_TERMS = 5
+
+# Escala para convertir la puntuación en la prioridad entera de Scrapy.
+# Las prioridades se mantienen en un rango pequeño porque con JOBDIR cada valor
+# distinto es una cola en disco.
+PRIORITY_SCALE = 10
+MAX_PRIORITY = 200
+
+_URL_SEPARATORS = re.compile(r'[/\-_.+%=&?]+')
+
+
+class LinkScorer:
+
+    def __init__(self, term_matcher: TermMatcher):
+        self.term_matcher = term_matcher
+
+    def _hits(self, text: str) -> int:
+        if not text:
+            return 0
+        return len(self.term_matcher.scan(normalize_term(text)).keywords)
+
+    def url_text(self, url: str) -> str:
+        parsed = urlparse(url)
+        return _URL_SEPARATORS.sub(' ', unquote(f"{parsed.path} {parsed.query}")).strip()
+
+    def page_score(self, page_keywords, inherited: float = 0.0) -> float:
+        """Puntuación de una página: sus términos y parte de la del enlace que llevó a ella."""
+        return PAGE_WEIGHT * min(len(page_keywords or ()), MAX_PAGE_TERMS) + INHERITED_WEIGHT * inherited
+
+    def link_score(self, anchor_text: str, url: str, page_score: float) -> float:
+        return (ANCHOR_WEIGHT * self._hits(anchor_text)
+                + URL_WEIGHT * self._hits(self.url_text(url))
+                + page_score)
+
+    @staticmethod
+    def priority(score: float, depth: int) -> int:
+        """Prioridad de Scrapy: mayor puntuación primero; a igualdad, menor profundidad."""
+        return max(-MAX_PRIORITY, min(MAX_PRIORITY, int(round(score * PRIORITY_SCALE)) - depth))
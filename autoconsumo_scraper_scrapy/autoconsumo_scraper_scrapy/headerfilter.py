@@ -0,0 +1,60 @@
+"""
+Filtrado por cabeceras: decide si merece la pena descargar el cuerpo de una
+respuesta en cuanto llegan las cabeceras (señal `headers_received`).
+
+La decisión la toma el spider (`evaluate_headers`), que conoce el rango de
+fechas y las reglas de `recognized_exts`/`content_type_map`. Si devuelve un
+motivo, la transferencia se corta con `StopDownload(fail=False)`: la respuesta
+llega igualmente, sin cuerpo, a `GenericSpider.parse` o a
+`FilteredFilesPipeline`, que la descartan con su lógica habitual. El motivo
+queda en `request.meta['header_rejection']`.
+
+Stats:
+- `headerfilter/aborted` y `headerfilter/aborted/<motivo>`
+- `headerfilter/bytes_saved`: suma de `Content-Length` de las descargas cortadas
+- `headerfilter/unknown_length`: descargas cortadas sin `Content-Length`
+"""
+
+from scrapy import signals
+from scrapy.exceptions import StopDownload
+
+# Motivos de corte
+REJECT_DATE = 'date'
+REJECT_CONTENT_TYPE = 'content_type'
+# Página que resulta ser un fichero: FilteredFilesPipeline lo descargará
+DIRECT_FILE = 'direct_file'
+
+
+class HeaderFilterMiddleware:
+
+    def __init__(self, stats=None):
+        self.stats = stats
+
+    @classmethod
+    def from_crawler(cls, crawler):
+        middleware = cls(crawler.stats)
+        crawler.signals.connect(middleware.headers_received, signal=signals.headers_received)
+        return middleware
+
+    def headers_received(self, headers, body_length, request, spider):
+        evaluate = getattr(spider, 'evaluate_headers', None)
+        if not callable(evaluate):
+            return
+        reason = evaluate(headers, request)
+        if reason is None:
+            return
+        request.meta['header_rejection'] = reason
+        if self.stats is not None:
+            self.stats.inc_value('headerfilter/aborted', spider=spider)
+            self.stats.inc_value(f'headerfilter/aborted/{reason}', spider=spider)
+            if isinstance(body_length, int) and body_length > 0:
+                self.stats.inc_value('headerfilter/bytes_saved', body_length, spider=spider)
+            else:
+                self.stats.inc_value('headerfilter/unknown_length', spider=spider)
+        raise StopDownload(fail=False)
+
+    def process_response(self, request, response, spider):
+        # Sin cuerpo no hay nada que descomprimir (HttpCompressionMiddleware fallaría)
+        if 'download_stopped' in response.flags and b'Content-Encoding' in response.headers:
+            del response.headers[b'Content-Encoding']
+        return response
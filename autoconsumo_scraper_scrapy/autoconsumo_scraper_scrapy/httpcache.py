@@ -0,0 +1,238 @@
+"""
+Caché HTTP en disco compartida entre ejecuciones.
+
+Las fuentes oficiales (miteco, idae, boe...) cambian poco entre ejecuciones,
+así que cada respuesta con validadores (`ETag` / `Last-Modified`) se guarda en
+un directorio común (`http_cache/` junto a `ejecuciones/`) y en la siguiente
+ejecución se pide con `If-None-Match` / `If-Modified-Since`:
+
+- 304: se sirve la copia guardada, que llega a `GenericSpider.parse` y a
+  `FilteredFilesPipeline` como una respuesta normal (con sus cabeceras
+  originales, incluida `Last-Modified` para el filtro de fechas).
+- 200: la página ha cambiado y se sustituye la copia.
+
+A diferencia de `RFC2616Policy`, no se usa la heurística de frescura basada en
+`Last-Modified` (que daría por buena durante semanas una página antigua): sólo
+se sirve sin preguntar al servidor si éste lo permite con `max-age`/`Expires`.
+
+El tamaño total se limita con `HTTPCACHE_MAX_SIZE_MB`; al superarlo se
+eliminan las entradas usadas hace más tiempo.
+"""
+
+import logging
+import os
+import pickle
+import shutil
+from pathlib import Path
+from time import time
+
+from scrapy.downloadermiddlewares.httpcache import HttpCacheMiddleware
+from scrapy.extensions.httpcache import FilesystemCacheStorage, RFC2616Policy
+from w3lib.http import headers_dict_to_raw
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MAX_SIZE_MB = 2048
+
+# Tras una limpieza el tamaño queda por debajo de esta fracción del máximo,
+# para no limpiar de nuevo con cada respuesta guardada.
+EVICTION_TARGET_RATIO = 0.9
+
+# Cabeceras que un 304 puede actualizar en la copia guardada
+REFRESHED_HEADERS = (b'Date', b'Expires', b'Cache-Control', b'ETag', b'Last-Modified')
+
+META_FILE = 'pickled_meta'
+
+
+def _max_size_bytes(settings) -> int:
+    return int(settings.getfloat('HTTPCACHE_MAX_SIZE_MB', DEFAULT_MAX_SIZE_MB) * 1024 * 1024)
+
+
+class RevalidatingCachePolicy(RFC2616Policy):
+    """RFC2616Policy sin frescura heurística y sin entradas mayores que la caché."""
+
+    def __init__(self, settings):
+        super().__init__(settings)
+        self.max_entry_bytes = _max_size_bytes(settings)
+
+    def should_cache_request(self, request):
+        return request.method == 'GET' and super().should_cache_request(request)
+
+    def should_cache_response(self, response, request):
+        # Cuerpo cortado tras las cabeceras (headerfilter): no es una copia válida
+        if 'download_stopped' in response.flags:
+            return False
+        if self.max_entry_bytes > 0 and len(response.body) > self.max_entry_bytes:
+            return False
+        return super().should_cache_response(response, request)
+
+    def _compute_freshness_lifetime(self, response, request, now):
+        cc = self._parse_cachecontrol(response)
+        if self._get_max_age(cc) is not None or b'Expires' in response.headers:
+            return super()._compute_freshness_lifetime(response, request, now)
+        if response.status in (300, 301, 308):
+            return self.MAXAGE
+        # Sin caducidad explícita: siempre se revalida
+        return 0
+
+
+class SharedCacheStorage(FilesystemCacheStorage):
+    """
+    FilesystemCacheStorage con escrituras atómicas (varias ejecuciones pueden
+    compartir el directorio) y expulsión LRU por tamaño.
+    """
+
+    def __init__(self, settings):
+        super().__init__(settings)
+        self.max_bytes = _max_size_bytes(settings)
+        # ruta de la entrada -> [último uso, bytes]
+        self._entries = {}
+        self._total_bytes = 0
+        self._stats = None
+        self._spider = None
+
+    def open_spider(self, spider):
+        super().open_spider(spider)
+        self._spider = spider
+        self._stats = getattr(spider.crawler, 'stats', None)
+        self._scan(os.path.join(self.cachedir, spider.name))
+        logger.info(
+            "Caché HTTP en %s: %d entradas, %.1f MB",
+            self.cachedir, len(self._entries), self._total_bytes / (1024 * 1024),
+            extra={'spider': spider},
+        )
+        self._evict_if_needed()
+
+    def _scan(self, spider_dir):
+        self._entries.clear()
+        self._total_bytes = 0
+        if not os.path.isdir(spider_dir):
+            return
+        for prefix in os.scandir(spider_dir):
+            if not prefix.is_dir():
+                continue
+            for entry in os.scandir(prefix.path):
+                if not entry.is_dir():
+                    continue
+                try:
+                    last_used = os.stat(os.path.join(entry.path, META_FILE)).st_mtime
+                except OSError:
+                    # Entrada a medio escribir o de otra versión: se descarta
+                    shutil.rmtree(entry.path, ignore_errors=True)
+                    continue
+                self._track(str(Path(entry.path)), last_used, self._entry_size(entry.path))
+
+    @staticmethod
+    def _entry_size(path):
+        size = 0
+        for item in os.scandir(path):
+            try:
+                size += item.stat().st_size
+            except OSError:
+                pass
+        return size
+
+    def _track(self, path, last_used, size):
+        previous = self._entries.get(path)
+        if previous is not None:
+            self._total_bytes -= previous[1]
+        self._entries[path] = [last_used, size]
+        self._total_bytes += size
+
+    def retrieve_response(self, spider, request):
+        try:
+            response = super().retrieve_response(spider, request)
+        except (OSError, EOFError, pickle.UnpicklingError):
+            # Eliminada o sustituida por otra ejecución mientras se leía
+            return None
+        if response is not None:
+            entry = self._entries.get(self._get_request_path(spider, request))
+            if entry is not None:
+                entry[0] = time()
+        return response
+
+    def store_response(self, spider, request, response):
+        rpath = self._get_request_path(spider, request)
+        os.makedirs(rpath, exist_ok=True)
+        metadata = self._metadata(request, response)
+        self._write(rpath, 'meta', repr(metadata).encode('utf-8'))
+        self._write(rpath, 'response_headers', headers_dict_to_raw(response.headers))
+        self._write(rpath, 'response_body', response.body)
+        self._write(rpath, 'request_headers', headers_dict_to_raw(request.headers))
+        self._write(rpath, 'request_body', request.body)
+        # pickled_meta el último: es lo que marca la entrada como completa
+        self._write(rpath, META_FILE, pickle.dumps(metadata, protocol=4))
+        self._track(rpath, time(), self._entry_size(rpath))
+        self._evict_if_needed()
+
+    def refresh_response(self, spider, request, cachedresponse):
+        """Reescribe cabeceras y metadatos de una entrada revalidada (sin tocar el cuerpo)."""
+        rpath = self._get_request_path(spider, request)
+        if not os.path.isdir(rpath):
+            return
+        metadata = self._metadata(request, cachedresponse)
+        try:
+            self._write(rpath, 'response_headers', headers_dict_to_raw(cachedresponse.headers))
+            self._write(rpath, META_FILE, pickle.dumps(metadata, protocol=4))
+        except OSError:
+            return
+        self._track(rpath, time(), self._entry_size(rpath))
+
+    @staticmethod
+    def _metadata(request, response):
+        return {
+            'url': request.url,
+            'method': request.method,
+            'status': response.status,
+            'response_url': response.url,
+            'timestamp': time(),
+        }
+
+    def _write(self, rpath, name, data):
+        final_path = os.path.join(rpath, name)
+        tmp_path = f"{final_path}.{os.getpid()}.tmp"
+        with self._open(tmp_path, 'wb') as f:
+            f.write(data)
+        os.replace(tmp_path, final_path)
+
+    def _evict_if_needed(self):
+        if self.max_bytes <= 0 or self._total_bytes <= self.max_bytes:
+            return
+        target = self.max_bytes * EVICTION_TARGET_RATIO
+        evicted = 0
+        freed = 0
+        for path, (_, size) in sorted(self._entries.items(), key=lambda item: item[1][0]):
+            if self._total_bytes <= target:
+                break
+            shutil.rmtree(path, ignore_errors=True)
+            del self._entries[path]
+            self._total_bytes -= size
+            evicted += 1
+            freed += size
+        if evicted:
+            if self._stats is not None:
+                self._stats.inc_value('httpcache/evicted', evicted, spider=self._spider)
+            logger.info(
+                "Caché HTTP: %d entradas eliminadas (%.1f MB liberados)",
+                evicted, freed / (1024 * 1024), extra={'spider': self._spider},
+            )
+
+
+class RevalidatingCacheMiddleware(HttpCacheMiddleware):
+    """
+    HttpCacheMiddleware que, al recibir un 304, actualiza la copia guardada con
+    las cabeceras nuevas y la deja como usada recientemente.
+    """
+
+    def process_response(self, request, response, spider):
+        cachedresponse = request.meta.get('cached_response')
+        result = super().process_response(request, response, spider)
+        if cachedresponse is not None and result is cachedresponse and response.status == 304:
+            for header in REFRESHED_HEADERS:
+                value = response.headers.get(header)
+                if value:
+                    cachedresponse.headers[header] = value
+            refresh = getattr(self.storage, 'refresh_response', None)
+            if callable(refresh):
+                refresh(spider, request, cachedresponse)
+        return result
@@ -8,3 +8,5 @@ class AutoconsumoScraperScrapyItem(scrapy.Item):
     file_urls = scrapy.Field()
     files = scrapy.Field()
     source_index = scrapy.Field()
+    root_url = scrapy.Field()
+    terms = scrapy.Field()
@@ -0,0 +1,225 @@
+"""
+Cola de ejecuciones de app.py con varios procesos de scraping a la vez.
+
+Cada trabajo es una carpeta de `ejecuciones/` (sus entradas, su
+`scraper_config.json` y su `status.json`), así que las ejecuciones
+simultáneas no comparten nada salvo los almacenes comunes (caché HTTP,
+almacén de documentos, índice de búsqueda), que ya admiten varios procesos.
+
+`JobQueue` lanza hasta `max_workers` trabajos; el resto espera ordenado por
+prioridad (mayor primero) y, a igual prioridad, por orden de llegada. Un hilo
+recoge los procesos terminados y arranca los siguientes. La forma de lanzar
+un trabajo (el proceso de run_scraper.py) la decide app.py con `launch`.
+
+Sin dependencias de Scrapy.
+"""
+
+import collections
+import itertools
+import threading
+import time
+from datetime import datetime
+
+QUEUED = 'queued'
+RUNNING = 'running'
+FINISHED = 'finished'
+CANCELLED = 'cancelled'
+FAILED = 'error'
+
+# Segundos entre comprobaciones de los procesos en marcha
+REAP_INTERVAL = 1.0
+# Trabajos terminados que se siguen listando
+FINISHED_HISTORY = 50
+
+
+def now_iso():
+    return datetime.now().isoformat(timespec='seconds')
+
+
+class Job:
+
+    def __init__(self, execution, config_file, resume=False, priority=0, sequence=0):
+        self.execution = execution
+        self.config_file = config_file
+        self.resume = resume
+        self.priority = priority
+        self.sequence = sequence
+        self.state = QUEUED
+        self.process = None
+        self.enqueued_at = now_iso()
+        self.started_at = None
+        self.finished_at = None
+        self.returncode = None
+        self.error = None
+
+    def sort_key(self):
+        return (-self.priority, self.sequence)
+
+    def to_dict(self):
+        return {
+            'execution': self.execution,
+            'state': self.state,
+            'priority': self.priority,
+            'resume': self.resume,
+            'enqueued_at': self.enqueued_at,
+            'started_at': self.started_at,
+            'finished_at': self.finished_at,
+            'returncode': self.returncode,
+            'pid': self.process.pid if self.process is not None else None,
+            'error': self.error,
+        }
+
+
+class JobQueue:
+
+    def __init__(self, launch, max_workers=1):
+        """`launch(job)` arranca el trabajo y devuelve su `subprocess.Popen`."""
+        self._launch = launch
+        self.max_workers = max(1, int(max_workers))
+        self._queued = []
+        self._running = {}
+        self._finished = collections.deque(maxlen=FINISHED_HISTORY)
+        self._sequence = itertools.count()
+        self._condition = threading.Condition()
+        self._thread = None
+
+    # ---- Consultas ----
+
+    def get(self, execution):
+        with self._condition:
+            return self._running.get(execution) or next(
+                (job for job in self._queued if job.execution == execution), None
+            )
+
+    def is_running(self, execution):
+        with self._condition:
+            job = self._running.get(execution)
+            return job is not None and job.process is not None and job.process.poll() is None
+
+    def is_active(self, execution):
+        return self.get(execution) is not None
+
+    def position(self, execution):
+        """Posición en la cola (1 = el siguiente en arrancar) o None."""
+        with self._condition:
+            for index, job in enumerate(self._queued, start=1):
+                if job.execution == execution:
+                    return index
+        return None
+
+    def jobs(self):
+        """Trabajos en marcha, en cola (en el orden en que arrancarán) y terminados recientes."""
+        with self._condition:
+            running = sorted(self._running.values(), key=lambda job: job.started_at or '')
+            listed = [dict(job.to_dict(), position=None) for job in running]
+            listed += [dict(job.to_dict(), position=index) for index, job in enumerate(self._queued, start=1)]
+            listed += [dict(job.to_dict(), position=None) for job in reversed(self._finished)]
+        return listed
+
+    def latest_running(self):
+        """Ejecución del trabajo en marcha que arrancó más tarde, o None."""
+        with self._condition:
+            running = sorted(self._running.values(), key=lambda job: job.started_at or '')
+        return running[-1].execution if running else None
+
+    def counts(self):
+        with self._condition:
+            return {'running': len(self._running), 'queued': len(self._queued), 'max_workers': self.max_workers}
+
+    # ---- Cambios ----
+
+    def submit(self, execution, config_file, resume=False, priority=0):
+        """Añade un trabajo; arranca enseguida si hay un hueco libre."""
+        with self._condition:
+            if self.get(execution) is not None:
+                raise ValueError(f'La ejecución {execution} ya está en la cola')
+            job = Job(execution, config_file, resume=resume, priority=int(priority),
+                      sequence=next(self._sequence))
+            self._queued.append(job)
+            self._queued.sort(key=Job.sort_key)
+            self._start_pending()
+            self._ensure_thread()
+            return job
+
+    def set_priority(self, execution, priority):
+        """Cambia la prioridad de un trabajo en cola; None si no está esperando."""
+        with self._condition:
+            for job in self._queued:
+                if job.execution == execution:
+                    job.priority = int(priority)
+                    self._queued.sort(key=Job.sort_key)
+                    return job
+        return None
+
+    def dequeue(self, execution):
+        """Saca de la cola un trabajo que aún no ha arrancado; None si no estaba esperando."""
+        with self._condition:
+            for job in self._queued:
+                if job.execution == execution:
+                    self._queued.remove(job)
+                    job.state = CANCELLED
+                    job.finished_at = now_iso()
+                    self._finished.append(job)
+                    return job
+        return None
+
+    def set_max_workers(self, max_workers):
+        with self._condition:
+            self.max_workers = max(1, int(max_workers))
+            self._start_pending()
+
+    # ---- Planificador ----
+
+    def _ensure_thread(self):
+        if self._thread is None or not self._thread.is_alive():
+            self._thread = threading.Thread(target=self._run, name='job-queue', daemon=True)
+            self._thread.start()
+
+    def _run(self):
+        while True:
+            with self._condition:
+                self._reap()
+                self._start_pending()
+                if not self._running and not self._queued:
+                    self._thread = None
+                    return
+                self._condition.wait(REAP_INTERVAL)
+
+    def _reap(self):
+        for execution, job in list(self._running.items()):
+            returncode = job.process.poll() if job.process is not None else -1
+            if returncode is None:
+                continue
+            del self._running[execution]
+            job.state = FINISHED if returncode == 0 else FAILED
+            job.returncode = returncode
+            job.finished_at = now_iso()
+            self._finished.append(job)
+
+    def _start_pending(self):
+        while self._queued and len(self._running) < self.max_workers:
+            job = self._queued.pop(0)
+            job.started_at = now_iso()
+            try:
+                job.process = self._launch(job)
+            except Exception as exc:
+                job.state = FAILED
+                job.error = str(exc)
+                job.finished_at = now_iso()
+                self._finished.append(job)
+                continue
+            job.state = RUNNING
+            self._running[job.execution] = job
+
+    def wait_idle(self, timeout=None):
+        """Espera a que no quede nada en marcha ni en cola (para scripts y pruebas)."""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            with self._condition:
+                self._reap()
+                self._start_pending()
+                if not self._running and not self._queued:
+                    return True
+            if deadline is not None and time.monotonic() >= deadline:
+                return False
+            time.sleep(0.1)
@@ -1,3 +1,5 @@
+import logging
+
 from scrapy import logformatter
 
 class PoliteLogFormatter(logformatter.LogFormatter):
@@ -14,12 +16,12 @@ class PoliteLogFormatter(logformatter.LogFormatter):
         # Only log basic info, NOT the item content
         if hasattr(item, 'get') and 'url' in item:
             return {
-                'level': logformatter.INFO,
+                'level': logging.INFO,
                 'msg': f"Scraped item from: {item.get('url', 'unknown')}",
                 'args': {}
             }
         return {
-            'level': logformatter.INFO,
+            'level': logging.INFO,
             'msg': "Scraped item (URL not available)",
             'args': {}
         }
@@ -30,7 +32,7 @@ class PoliteLogFormatter(logformatter.LogFormatter):
         Override to prevent logging the full item content.
         """
         return {
-            'level': logformatter.WARNING,
+            'level': logging.WARNING,
             'msg': f"Dropped item: {exception}",
             'args': {}
         }
@@ -0,0 +1,216 @@
+"""
+Buscador multi-término (Aho-Corasick) para palabras clave y exclusiones.
+
+Todos los términos normalizados se compilan en un único autómata determinista:
+el texto se recorre una sola vez y cada posición cuesta un acceso a diccionario,
+independientemente del número de términos. Para listas cortas la búsqueda de
+subcadenas de `str` (implementada en C) sigue siendo más rápida, así que por
+debajo de `AUTOMATON_MIN_TERMS` se usa esa ruta con el mismo resultado.
+"""
+
+from collections import deque
+from typing import Callable, Dict, List, Optional, Set, Tuple
+
+KEYWORD = 'keyword'
+EXCLUSION = 'exclusion'
+
+# Umbral medido con benchmarks/bench_matcher.py: con menos términos, N búsquedas
+# `in` en C son más baratas que un recorrido carácter a carácter en Python.
+AUTOMATON_MIN_TERMS = 200
+
+# Tamaño (en caracteres) de los lotes que TermScanner normaliza y analiza de
+# una vez cuando el texto llega por fragmentos.
+SCAN_BATCH_CHARS = 16 * 1024
+
+
+class MatchResult:
+    __slots__ = ('keywords', 'exclusions')
+
+    def __init__(self, keywords: Set[str], exclusions: List[str]):
+        self.keywords = keywords
+        self.exclusions = exclusions
+
+    @property
+    def has_keywords(self) -> bool:
+        return bool(self.keywords)
+
+    @property
+    def first_exclusion(self) -> Optional[str]:
+        return self.exclusions[0] if self.exclusions else None
+
+
+class TermMatcher:
+    """
+    Autómata compilado a partir de `keywords_map` y `exclusions_map`
+    (término normalizado -> término original). Se construye una vez por spider
+    y resuelve todas las coincidencias, incluidas las solapadas, en una pasada.
+    """
+
+    def __init__(self, keywords_map: Optional[Dict[str, str]] = None,
+                 exclusions_map: Optional[Dict[str, str]] = None,
+                 min_automaton_terms: int = AUTOMATON_MIN_TERMS):
+        self.keywords_map = keywords_map or {}
+        self.exclusions_map = exclusions_map or {}
+
+        # término normalizado -> [(tipo, original, orden)]
+        self._targets: Dict[str, List[Tuple[str, str, int]]] = {}
+        for order, (norm, orig) in enumerate(self.exclusions_map.items()):
+            if norm:
+                self._targets.setdefault(norm, []).append((EXCLUSION, orig, order))
+        for order, (norm, orig) in enumerate(self.keywords_map.items()):
+            if norm:
+                self._targets.setdefault(norm, []).append((KEYWORD, orig, order))
+
+        self.max_term_length = max((len(term) for term in self._targets), default=0)
+        self.has_exclusions = any(
+            kind == EXCLUSION for targets in self._targets.values() for kind, _, _ in targets
+        )
+        self.use_automaton = len(self._targets) >= min_automaton_terms
+        self._transitions: List[Dict[str, int]] = []
+        self._outputs: List[Tuple[str, ...]] = []
+        if self.use_automaton:
+            self._build_automaton()
+
+    def __bool__(self) -> bool:
+        return bool(self._targets)
+
+    def __len__(self) -> int:
+        return len(self._targets)
+
+    def _build_automaton(self) -> None:
+        goto: List[Dict[str, int]] = [{}]
+        outputs: List[Tuple[str, ...]] = [()]
+        for term in self._targets:
+            state = 0
+            for ch in term:
+                nxt = goto[state].get(ch)
+                if nxt is None:
+                    nxt = len(goto)
+                    goto[state][ch] = nxt
+                    goto.append({})
+                    outputs.append(())
+                state = nxt
+            outputs[state] = outputs[state] + (term,)
+
+        # Enlaces de fallo en anchura; cada estado hereda las transiciones de su
+        # estado de fallo, de modo que el recorrido nunca retrocede.
+        transitions = [dict(edges) for edges in goto]
+        fail = [0] * len(goto)
+        queue = deque(goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for ch, child in goto[state].items():
+                queue.append(child)
+                fallback = transitions[fail[state]].get(ch, 0)
+                fail[child] = fallback
+                outputs[child] = outputs[child] + outputs[fallback]
+            for ch, target in transitions[fail[state]].items():
+                transitions[state].setdefault(ch, target)
+
+        self._transitions = transitions
+        self._outputs = outputs
+
+    def _walk(self, text: str, state: int = 0) -> Tuple[int, Set[str]]:
+        """Avanza el autómata sobre `text` desde `state`; devuelve el estado final
+        y los términos reconocidos."""
+        transitions = self._transitions
+        outputs = self._outputs
+        matched_states = set()
+        for ch in text:
+            state = transitions[state].get(ch, 0)
+            if outputs[state]:
+                matched_states.add(state)
+        return state, {term for matched in matched_states for term in outputs[matched]}
+
+    def find_terms(self, text: str) -> Set[str]:
+        """Devuelve el conjunto de términos normalizados presentes en `text`."""
+        if not text or not self._targets:
+            return set()
+        if not self.use_automaton:
+            return {term for term in self._targets if term in text}
+        return self._walk(text)[1]
+
+    def resolve(self, terms: Set[str]) -> MatchResult:
+        """Traduce términos normalizados a palabras clave y exclusiones originales.
+
+        Las exclusiones se devuelven en el orden de `exclusions_map`, igual que
+        el recorrido término a término al que sustituye.
+        """
+        keywords: Set[str] = set()
+        exclusion_hits: List[Tuple[int, str]] = []
+        for term in terms:
+            for kind, orig, order in self._targets[term]:
+                if kind == KEYWORD:
+                    keywords.add(orig)
+                else:
+                    exclusion_hits.append((order, orig))
+        exclusion_hits.sort()
+        return MatchResult(keywords, [orig for _, orig in exclusion_hits])
+
+    def scan(self, text: str) -> MatchResult:
+        """Devuelve todas las palabras clave y exclusiones presentes en `text`."""
+        return self.resolve(self.find_terms(text))
+
+    def scanner(self, normalize: Callable[[str], str]) -> 'TermScanner':
+        return TermScanner(self, normalize)
+
+
+class TermScanner:
+    """
+    Análisis incremental de un texto que llega por fragmentos (p. ej. nodos de
+    texto del DOM). Los fragmentos se unen con un espacio, se normalizan por
+    lotes y se pasan por el matcher conservando el estado entre lotes, de modo
+    que el resultado es el mismo que analizar el texto completo; `feed` devuelve
+    la primera exclusión en cuanto aparece para poder abortar el recorrido.
+    """
+
+    def __init__(self, matcher: TermMatcher, normalize: Callable[[str], str],
+                 batch_chars: int = SCAN_BATCH_CHARS):
+        self.matcher = matcher
+        self.normalize = normalize
+        self.batch_chars = batch_chars
+        self.exclusion: Optional[str] = None
+        self._pending: List[str] = []
+        self._pending_len = 0
+        self._started = False
+        self._state = 0
+        self._tail = ''
+        self._terms: Set[str] = set()
+
+    def feed(self, text: str) -> Optional[str]:
+        self._pending.append(text)
+        self._pending_len += len(text) + 1
+        if self._pending_len >= self.batch_chars:
+            return self._flush()
+        return None
+
+    def _flush(self) -> Optional[str]:
+        if not self._pending or not self.matcher:
+            self._pending = []
+            self._pending_len = 0
+            return self.exclusion
+        batch = self.normalize(' '.join(self._pending))
+        if self._started:
+            batch = ' ' + batch
+        self._started = True
+        self._pending = []
+        self._pending_len = 0
+
+        matcher = self.matcher
+        if matcher.use_automaton:
+            self._state, found = matcher._walk(batch, self._state)
+        else:
+            # Sin estado que arrastrar: se solapa el final del lote anterior
+            window = self._tail + batch
+            found = matcher.find_terms(window)
+            keep = matcher.max_term_length - 1
+            self._tail = window[-keep:] if keep > 0 else ''
+        if found - self._terms:
+            self._terms |= found
+            if matcher.has_exclusions and self.exclusion is None:
+                self.exclusion = matcher.resolve(found).first_exclusion
+        return self.exclusion
+
+    def finish(self) -> MatchResult:
+        self._flush()
+        return self.matcher.resolve(self._terms)
@@ -0,0 +1,166 @@
+"""
+Detección de páginas casi duplicadas con SimHash.
+
+Los portales publican el mismo contenido como versión imprimible, con otro
+selector de idioma o con parámetros que la canonicalización de URLs no
+reconoce. Cada página analizada recibe una huella SimHash de 64 bits de su
+texto visible (trigramas de palabras normalizadas); si dista como mucho
+`max_distance` bits (distancia de Hamming) de una página ya vista en la
+ejecución, se considera una variante: no se guarda ni se siguen sus enlaces.
+
+La búsqueda usa el principio del palomar: con distancia máxima k, dos huellas
+cercanas coinciden exactamente en al menos uno de los k+1 bloques en que se
+divide la huella, así que sólo se comparan las que comparten algún bloque.
+"""
+
+import hashlib
+import re
+
+from autoconsumo_scraper_scrapy.textnorm import normalize_text
+
+FINGERPRINT_BITS = 64
+SHINGLE_SIZE = 3
+DEFAULT_MAX_DISTANCE = 3
+# Páginas con menos palabras (errores, avisos) no se comparan: con tan poco
+# texto las huellas coinciden por azar
+DEFAULT_MIN_WORDS = 30
+
+# Las 64 cuentas por bit se suman en un único entero, cada una en un carril de
+# LANE_BITS bits, para no recorrer los 64 bits por cada trigrama en Python
+LANE_BITS = 20
+MAX_FEATURES = (1 << LANE_BITS) - 1
+_LANE_MASK = (1 << LANE_BITS) - 1
+# byte -> sus 8 bits repartidos en 8 carriles consecutivos
+_SPREAD = [
+    sum(1 << (bit * LANE_BITS) for bit in range(8) if value >> bit & 1)
+    for value in range(256)
+]
+_BYTE_SHIFT = 8 * LANE_BITS
+
+_WORD = re.compile(r'\w+')
+
+
+def words(text):
+    return _WORD.findall(normalize_text(text))
+
+
+def simhash(tokens, shingle_size=SHINGLE_SIZE):
+    """Huella SimHash de 64 bits de una lista de palabras (0 si está vacía)."""
+    if len(tokens) >= shingle_size:
+        features = {' '.join(tokens[i:i + shingle_size]) for i in range(len(tokens) - shingle_size + 1)}
+    else:
+        features = set(tokens)
+    if not features:
+        return 0
+    total = 0
+    count = 0
+    for feature in features:
+        digest = hashlib.blake2b(feature.encode('utf-8'), digest_size=8).digest()
+        spread = 0
+        shift = 0
+        for value in digest:
+            spread |= _SPREAD[value] << shift
+            shift += _BYTE_SHIFT
+        total += spread
+        count += 1
+        if count == MAX_FEATURES:
+            break
+    # Cada bit de la huella es el voto mayoritario de ese bit en los trigramas
+    half = count // 2
+    fingerprint = 0
+    for bit in range(FINGERPRINT_BITS):
+        if (total >> (bit * LANE_BITS)) & _LANE_MASK > half:
+            fingerprint |= 1 << bit
+    return fingerprint
+
+
+def hamming_distance(a, b):
+    return (a ^ b).bit_count()
+
+
+class SimHashIndex:
+    """Huellas vistas, indexadas por bloques para buscar las cercanas."""
+
+    def __init__(self, max_distance=DEFAULT_MAX_DISTANCE):
+        self.max_distance = max(0, min(int(max_distance), FINGERPRINT_BITS // 2))
+        blocks = self.max_distance + 1
+        base, extra = divmod(FINGERPRINT_BITS, blocks)
+        self._blocks = []
+        start = 0
+        for block in range(blocks):
+            width = base + (1 if block < extra else 0)
+            self._blocks.append((start, (1 << width) - 1))
+            start += width
+        self._tables = [{} for _ in self._blocks]
+
+    def _keys(self, fingerprint):
+        for start, mask in self._blocks:
+            yield (fingerprint >> start) & mask
+
+    def find(self, fingerprint):
+        """(url, distancia) de la página vista más cercana dentro del umbral, o None."""
+        best = None
+        checked = set()
+        for table, key in zip(self._tables, self._keys(fingerprint)):
+            for candidate, url in table.get(key, ()):
+                if candidate in checked:
+                    continue
+                checked.add(candidate)
+                distance = hamming_distance(fingerprint, candidate)
+                if distance <= self.max_distance and (best is None or distance < best[1]):
+                    best = (url, distance)
+        return best
+
+    def add(self, fingerprint, url):
+        for table, key in zip(self._tables, self._keys(fingerprint)):
+            table.setdefault(key, []).append((fingerprint, url))
+
+
+class NearDuplicateDetector:
+    """
+    Estado de la detección en una ejecución. `data` (huellas y grupos) se
+    guarda en el estado del spider para que sobreviva a una reanudación.
+    """
+
+    def __init__(self, max_distance=DEFAULT_MAX_DISTANCE, min_words=DEFAULT_MIN_WORDS):
+        self.index = SimHashIndex(max_distance)
+        self.min_words = min_words
+        # fingerprints: {url: huella} · clusters: {url original: [[url, distancia], ...]}
+        self.data = {'fingerprints': {}, 'clusters': {}}
+
+    @property
+    def max_distance(self):
+        return self.index.max_distance
+
+    @property
+    def clusters(self):
+        return self.data['clusters']
+
+    def attach(self, data):
+        """Usa `data` (estado guardado) como almacén y reconstruye el índice."""
+        data.setdefault('fingerprints', {}).update(self.data['fingerprints'])
+        clusters = data.setdefault('clusters', {})
+        for url, variants in self.data['clusters'].items():
+            clusters.setdefault(url, []).extend(variants)
+        self.data = data
+        self.index = SimHashIndex(self.index.max_distance)
+        for url, fingerprint in data['fingerprints'].items():
+            self.index.add(fingerprint, url)
+
+    def check(self, url, text):
+        """
+        Registra la página y devuelve `(url original, distancia)` si es casi
+        duplicada de otra ya vista; None si es nueva o demasiado corta.
+        """
+        tokens = words(text)
+        if len(tokens) < self.min_words:
+            return None
+        fingerprint = simhash(tokens)
+        match = self.index.find(fingerprint)
+        if match is not None:
+            original, distance = match
+            self.data['clusters'].setdefault(original, []).append([url, distance])
+            return match
+        self.index.add(fingerprint, url)
+        self.data['fingerprints'][url] = fingerprint
+        return None
@@ -0,0 +1,210 @@
+"""
+Almacenamiento comprimido de las páginas guardadas (texto y HTML).
+
+Con `PAGE_STORAGE = 'segments'`, TextFilePipeline no crea un `.txt` y un
+`.html` por página: añade cada uno como un miembro gzip independiente al
+segmento abierto (`paginas/segmento-00001.gz`, se abre otro al superar
+`SEGMENT_MAX_BYTES`) y anota en `paginas/indice.jsonl` su nombre, URL,
+desplazamiento y longitud. Un segmento completo se puede leer con `zcat`; para
+una sola página basta con leer su rango y descomprimirlo. En una ejecución
+repartida entre varios procesos (sharding.py) cada uno escribe sus propios
+segmentos e índice (`segmento-NN-00001.gz`, `indice-NN.jsonl`), y `PageStore`
+lee todos los índices de la carpeta.
+
+`PageStore` es la API de lectura que usan run_scraper.py (resumen), app.py y
+las herramientas externas. Sin dependencias de Scrapy.
+
+Uso desde la línea de comandos (desde autoconsumo_scraper_scrapy/)::
+
+    python -m autoconsumo_scraper_scrapy.pagestore <carpeta de documentos> list
+    python -m autoconsumo_scraper_scrapy.pagestore <carpeta de documentos> cat <nombre>
+    python -m autoconsumo_scraper_scrapy.pagestore <carpeta de documentos> extract <destino>
+"""
+
+import argparse
+import gzip
+import json
+import os
+import sys
+
+PAGES_DIRNAME = 'paginas'
+INDEX_NAME = 'indice.jsonl'
+SEGMENT_PATTERN = 'segmento-{:05d}.gz'
+# Índices y segmentos del proceso NN de una ejecución repartida
+SHARD_INDEX_PATTERN = 'indice-{:02d}.jsonl'
+SHARD_SEGMENT_PREFIX = 'segmento-{:02d}-'
+SEGMENT_MAX_BYTES = 64 * 1024 * 1024
+COMPRESS_LEVEL = 6
+
+# Cabecera que TextFilePipeline escribe al principio de cada .txt
+URL_PREFIX = 'URL: '
+TEXT_SEPARATOR = '=' * 80
+
+
+def split_text_file(content):
+    """(url, texto) de un .txt guardado; url es None si no tiene cabecera."""
+    if not content.startswith(URL_PREFIX):
+        return None, content
+    header, _, rest = content.partition('\n')
+    url = header[len(URL_PREFIX):].strip() or None
+    separator, _, text = rest.partition('\n')
+    if separator.strip() != TEXT_SEPARATOR:
+        return url, rest
+    return url, text.lstrip('\n')
+
+
+def index_names(directory):
+    """Índices de una carpeta de segmentos: el de un solo proceso y los de cada proceso de una ejecución repartida."""
+    try:
+        names = os.listdir(directory)
+    except OSError:
+        return []
+    return sorted(name for name in names
+                  if name == INDEX_NAME or (name.startswith('indice-') and name.endswith('.jsonl')))
+
+
+class SegmentWriter:
+
+    def __init__(self, directory, max_segment_bytes=SEGMENT_MAX_BYTES, compress_level=COMPRESS_LEVEL, shard=None):
+        self.directory = directory
+        self.max_segment_bytes = max_segment_bytes
+        self.compress_level = compress_level
+        if shard is None:
+            self.segment_pattern = SEGMENT_PATTERN
+            index_name = INDEX_NAME
+        else:
+            self.segment_pattern = SHARD_SEGMENT_PREFIX.format(shard) + '{:05d}.gz'
+            index_name = SHARD_INDEX_PATTERN.format(shard)
+        os.makedirs(directory, exist_ok=True)
+        # Al reanudar se sigue escribiendo en el último segmento
+        segment_prefix = self.segment_pattern.split('{', 1)[0]
+        existing = [name for name in os.listdir(directory)
+                    if name.startswith(segment_prefix) and name[len(segment_prefix):-3].isdigit()]
+        self.segment_number = len(existing) or 1
+        self._segment = None
+        self._index = open(os.path.join(directory, index_name), 'a', encoding='utf-8')
+        self.raw_bytes = 0
+        self.stored_bytes = 0
+
+    def _segment_file(self):
+        if self._segment is not None and self._segment.tell() >= self.max_segment_bytes:
+            self._segment.close()
+            self._segment = None
+            self.segment_number += 1
+        if self._segment is None:
+            path = os.path.join(self.directory, self.segment_pattern.format(self.segment_number))
+            self._segment = open(path, 'ab')
+        return self._segment
+
+    def add(self, name, url, kind, data):
+        """Añade una página (`kind`: 'txt' o 'html') y la registra en el índice."""
+        member = gzip.compress(data, compresslevel=self.compress_level, mtime=0)
+        segment = self._segment_file()
+        offset = segment.tell()
+        segment.write(member)
+        segment.flush()
+        self._index.write(json.dumps({
+            'name': name,
+            'url': url,
+            'kind': kind,
+            'segment': os.path.basename(segment.name),
+            'offset': offset,
+            'length': len(member),
+            'size': len(data),
+        }, ensure_ascii=False) + '\n')
+        self._index.flush()
+        self.raw_bytes += len(data)
+        self.stored_bytes += len(member)
+
+    def close(self):
+        if self._segment is not None:
+            self._segment.close()
+            self._segment = None
+        self._index.close()
+
+
+class PageStore:
+    """Lectura de las páginas guardadas en segmentos de una carpeta de documentos."""
+
+    def __init__(self, directory):
+        self.directory = directory
+        self._entries = {}
+        for index_name in index_names(directory):
+            with open(os.path.join(directory, index_name), 'r', encoding='utf-8') as index:
+                for line in index:
+                    try:
+                        entry = json.loads(line)
+                    except ValueError:
+                        # Última línea a medias tras una parada brusca
+                        continue
+                    self._entries[entry['name']] = entry
+
+    @classmethod
+    def open(cls, documents_dir):
+        """PageStore de `documents_dir` o None si la ejecución no usa segmentos."""
+        directory = os.path.join(documents_dir, PAGES_DIRNAME)
+        if not index_names(directory):
+            return None
+        return cls(directory)
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __contains__(self, name):
+        return name in self._entries
+
+    def entries(self, kind=None):
+        """Entradas del índice (nombre, url, kind, size...) en orden de escritura."""
+        return [entry for entry in self._entries.values() if kind is None or entry['kind'] == kind]
+
+    def read(self, name):
+        """Contenido (bytes) de una página, leyendo sólo su rango del segmento."""
+        entry = self._entries[name]
+        with open(os.path.join(self.directory, entry['segment']), 'rb') as segment:
+            segment.seek(entry['offset'])
+            return gzip.decompress(segment.read(entry['length']))
+
+    def read_text(self, name):
+        return self.read(name).decode('utf-8')
+
+    def stored_bytes(self):
+        return sum(entry['length'] for entry in self._entries.values())
+
+    def raw_bytes(self):
+        return sum(entry['size'] for entry in self._entries.values())
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Lee las páginas guardadas en segmentos comprimidos.')
+    parser.add_argument('documents_dir', help='Carpeta de documentos de la ejecución')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    subparsers.add_parser('list', help='Lista las páginas guardadas')
+    cat_parser = subparsers.add_parser('cat', help='Escribe una página en la salida estándar')
+    cat_parser.add_argument('name')
+    extract_parser = subparsers.add_parser('extract', help='Extrae todas las páginas como ficheros')
+    extract_parser.add_argument('destination')
+    args = parser.parse_args(argv)
+
+    store = PageStore.open(args.documents_dir)
+    if store is None:
+        print(f"No hay páginas en segmentos en {args.documents_dir}", file=sys.stderr)
+        return 1
+    if args.command == 'list':
+        for entry in store.entries():
+            print(f"{entry['name']}\t{entry['size']}\t{entry['url']}")
+    elif args.command == 'cat':
+        if args.name not in store:
+            print(f"No existe la página {args.name}", file=sys.stderr)
+            return 1
+        sys.stdout.buffer.write(store.read(args.name))
+    else:
+        os.makedirs(args.destination, exist_ok=True)
+        for entry in store.entries():
+            with open(os.path.join(args.destination, entry['name']), 'wb') as output:
+                output.write(store.read(entry['name']))
+        print(f"{len(store)} páginas extraídas en {args.destination}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
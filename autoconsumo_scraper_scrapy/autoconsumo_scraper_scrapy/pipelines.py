@@ -4,9 +4,14 @@ from datetime import datetime, timezone
 from email.utils import parsedate_to_datetime
 from urllib.parse import urlparse
 
-from scrapy.pipelines.files import FilesPipeline
+from scrapy.pipelines.files import FilesPipeline, FSFilesStore
+from twisted.internet import task
 
 from autoconsumo_scraper_scrapy.activity_log import write_activity
+from autoconsumo_scraper_scrapy.blobstore import BlobStore, append_manifest
+from autoconsumo_scraper_scrapy.pagestore import PAGES_DIRNAME, SEGMENT_MAX_BYTES, SegmentWriter
+from autoconsumo_scraper_scrapy.headerfilter import REJECT_CONTENT_TYPE
+from autoconsumo_scraper_scrapy.searchindex import COMMIT_INTERVAL, CRAWL_BUSY_TIMEOUT, SearchIndex
 
 SAFE_CHARS = set("abcdefghijklmnopqrstuvwxyzABCDEFGHIJKLMNOPQRSTUVWXYZ0123456789-_")
 
@@ -19,6 +24,54 @@ def sanitize_component(value: str) -> str:
 class TextFilePipeline:
     def __init__(self):
         self.file_counter = {}
+        # Con PAGE_STORAGE = 'segments' las páginas van a segmentos comprimidos (pagestore.py)
+        self.segment_writer = None
+        # Índice de búsqueda común a todas las ejecuciones (searchindex.py)
+        self.search_index = None
+        self.search_execution = None
+        self._search_commit_loop = None
+        self._search_busy = False
+
+    def open_spider(self, spider):
+        storage_path = spider.settings.get('TEXT_FILES_STORE')
+        if storage_path and spider.settings.get('PAGE_STORAGE') == 'segments':
+            self.segment_writer = SegmentWriter(
+                os.path.join(storage_path, PAGES_DIRNAME),
+                max_segment_bytes=spider.settings.getint('PAGE_SEGMENT_MAX_BYTES', SEGMENT_MAX_BYTES),
+                shard=spider.settings.get('SHARD_ID'),
+            )
+        search_index_file = spider.settings.get('SEARCH_INDEX_FILE')
+        if search_index_file:
+            # Espera corta por el bloqueo: se escribe desde el hilo del reactor
+            self.search_index = SearchIndex(search_index_file, timeout=CRAWL_BUSY_TIMEOUT)
+            self.search_execution = spider.settings.get('SEARCH_EXECUTION_ID') or 'sin-ejecucion'
+            # Lo pendiente se escribe aunque no lleguen más páginas
+            self._search_commit_loop = task.LoopingCall(self._commit_search_index, spider)
+            self._search_commit_loop.start(COMMIT_INTERVAL, now=False)
+
+    def close_spider(self, spider):
+        if self.segment_writer is not None:
+            self.segment_writer.close()
+            spider.crawler.stats.set_value('pagestore/raw_bytes', self.segment_writer.raw_bytes)
+            spider.crawler.stats.set_value('pagestore/stored_bytes', self.segment_writer.stored_bytes)
+            self.segment_writer = None
+        if self.search_index is not None:
+            if self._search_commit_loop is not None and self._search_commit_loop.running:
+                self._search_commit_loop.stop()
+            self.search_index.close()
+            if self.search_index.dropped:
+                spider.crawler.stats.set_value('searchindex/dropped', self.search_index.dropped)
+                spider.logger.warning(
+                    f"Índice de búsqueda bloqueado: {self.search_index.dropped} páginas sin indexar "
+                    "(se añaden con 'python -m autoconsumo_scraper_scrapy.searchindex <índice> reindex <ejecuciones>')"
+                )
+            self.search_index = None
+
+    def _commit_search_index(self, spider):
+        committed = self.search_index.commit()
+        if not committed and not self._search_busy:
+            spider.logger.warning("Índice de búsqueda bloqueado por otro proceso; se reintenta en el siguiente lote")
+        self._search_busy = not committed
 
     def process_item(self, item, spider):
         storage_path = spider.settings.get('TEXT_FILES_STORE')
@@ -46,14 +99,25 @@ class TextFilePipeline:
         # Save text file if available
         if item.get('text'):
             text_filename = f"{unique_base}.txt"
-            text_filepath = os.path.join(storage_path, text_filename)
 
-            # Write text to file (NO logging the content, just the action)
-            with open(text_filepath, 'w', encoding='utf-8') as f:
-                # Write URL as first line for reference
-                f.write(f"URL: {url}\n")
-                f.write("=" * 80 + "\n\n")
-                f.write(item['text'])
+            if self.segment_writer is not None:
+                content = f"URL: {url}\n" + "=" * 80 + "\n\n" + item['text']
+                self.segment_writer.add(text_filename, url, 'txt', content.encode('utf-8'))
+            else:
+                text_filepath = os.path.join(storage_path, text_filename)
+                # Write text to file (NO logging the content, just the action)
+                with open(text_filepath, 'w', encoding='utf-8') as f:
+                    # Write URL as first line for reference
+                    f.write(f"URL: {url}\n")
+                    f.write("=" * 80 + "\n\n")
+                    f.write(item['text'])
+
+            if self.search_index is not None:
+                self.search_index.add_page(
+                    self.search_execution, text_filename, url, item['text'],
+                    source_index=item.get('source_index'), terms=item.get('terms'),
+                )
+                spider.crawler.stats.inc_value('searchindex/pages')
 
             # Log only the filename, NOT the content
             spider.logger.info(f"✓ Text saved: {text_filename}")
@@ -68,11 +132,14 @@ class TextFilePipeline:
         # Save HTML file if available
         if item.get('html'):
             html_filename = f"{unique_base}.html"
-            html_filepath = os.path.join(storage_path, html_filename)
 
-            # Write HTML to file (NO logging the content)
-            with open(html_filepath, 'w', encoding='utf-8') as f:
-                f.write(item['html'])
+            if self.segment_writer is not None:
+                self.segment_writer.add(html_filename, url, 'html', item['html'].encode('utf-8'))
+            else:
+                html_filepath = os.path.join(storage_path, html_filename)
+                # Write HTML to file (NO logging the content)
+                with open(html_filepath, 'w', encoding='utf-8') as f:
+                    f.write(item['html'])
 
             # Log only the filename, NOT the content
             spider.logger.info(f"✓ HTML saved: {html_filename}")
@@ -87,6 +154,34 @@ class TextFilePipeline:
         return item
 
 
+class BlobFilesStore(FSFilesStore):
+    """
+    FILES_STORE que guarda el contenido en el almacén compartido (blobstore.py)
+    y deja en la carpeta de la ejecución un enlace al blob.
+    """
+
+    def __init__(self, basedir, blob_store, manifest_path=None):
+        super().__init__(basedir)
+        self.blob_store = blob_store
+        self.manifest_path = manifest_path
+
+    def persist_file(self, path, buf, info, meta=None, headers=None):
+        absolute_path = self._get_filesystem_path(path)
+        self._mkdir(absolute_path.parent, info)
+        data = buf.getvalue()
+        digest, created = self.blob_store.put(data)
+        self.blob_store.link(digest, absolute_path)
+        if self.manifest_path:
+            append_manifest(self.manifest_path, path, digest, len(data))
+        stats = getattr(getattr(info.spider, 'crawler', None), 'stats', None)
+        if stats is not None:
+            if created:
+                stats.inc_value('blobstore/new')
+            else:
+                stats.inc_value('blobstore/reused')
+                stats.inc_value('blobstore/bytes_reused', len(data))
+
+
 class FilteredFilesPipeline(FilesPipeline):
     def __init__(self, store_uri=None, download_func=None, settings=None):
         super().__init__(store_uri, download_func=download_func, settings=settings)
@@ -98,6 +193,13 @@ class FilteredFilesPipeline(FilesPipeline):
         pipeline = super().from_crawler(crawler)
         pipeline.filter_start = pipeline._parse_iso_datetime(crawler.settings.get('FILTER_START_DATE'), is_end=False)
         pipeline.filter_end = pipeline._parse_iso_datetime(crawler.settings.get('FILTER_END_DATE'), is_end=True)
+        blob_store_dir = crawler.settings.get('BLOB_STORE_DIR')
+        if blob_store_dir and isinstance(pipeline.store, FSFilesStore):
+            pipeline.store = BlobFilesStore(
+                pipeline.store.basedir,
+                BlobStore(blob_store_dir),
+                crawler.settings.get('BLOB_MANIFEST_FILE'),
+            )
         return pipeline
 
     def _parse_iso_datetime(self, value, is_end=False):
@@ -144,36 +246,49 @@ class FilteredFilesPipeline(FilesPipeline):
         requests = list(super().get_media_requests(item, info))
         log_index = item.get('source_index')
         for req in requests:
+            # Permite al spider decidir con las cabeceras (headerfilter)
+            req.meta['media_request'] = True
             if log_index is not None:
                 req.meta['log_index'] = log_index
+            if item.get('root_url'):
+                # Presupuestos por fuente (budget.py)
+                req.meta['root_url'] = item['root_url']
         return requests
 
+    def _filtered_out(self, message, request, info, stat):
+        spider = info.spider
+        if spider:
+            spider.logger.info(message)
+            activity_log_path = getattr(spider, 'activity_log_path', None)
+            if activity_log_path:
+                write_activity(
+                    activity_log_path,
+                    'Download',
+                    'INFO',
+                    message,
+                    url_index=request.meta.get('log_index')
+                )
+        self.inc_stats(info.spider, stat)
+        return {
+            "url": request.url,
+            "path": None,
+            "checksum": None,
+            "status": "filtered-out"
+        }
+
     def media_downloaded(self, response, request, info, *, item=None):
+        if request.meta.get('header_rejection') == REJECT_CONTENT_TYPE:
+            content_type = (response.headers.get('Content-Type') or b'').decode('latin1').split(';')[0].strip()
+            message = f"Descarga omitida por tipo de contenido ({content_type or 'desconocido'}): {request.url}"
+            return self._filtered_out(message, request, info, 'filtered_content_type')
+
         if not self.filter_start and not self.filter_end:
             return super().media_downloaded(response, request, info, item=item)
 
         dt = self._normalize_http_datetime(response.headers.get('Last-Modified'))
         if dt and not self._is_within_range(dt):
             message = f"Descarga omitida por fecha (Last-Modified {self._describe_datetime(dt)}): {request.url}"
-            spider = info.spider
-            if spider:
-                spider.logger.info(message)
-                activity_log_path = getattr(spider, 'activity_log_path', None)
-                if activity_log_path:
-                    write_activity(
-                        activity_log_path,
-                        'Download',
-                        'INFO',
-                        message,
-                        url_index=request.meta.get('log_index')
-                    )
-            self.inc_stats(info.spider, 'filtered_out_of_range')
-            return {
-                "url": request.url,
-                "path": None,
-                "checksum": None,
-                "status": "filtered-out"
-            }
+            return self._filtered_out(message, request, info, 'filtered_out_of_range')
 
         return super().media_downloaded(response, request, info, item=item)
 
@@ -0,0 +1,70 @@
+"""
+Contadores del rastreo en el estado de la ejecución.
+
+Además de las URLs raíz procesadas (que actualiza run_scraper.py), la interfaz
+muestra el avance real por páginas: peticiones enviadas, respuestas recibidas,
+items guardados y peticiones en cola. Cada PROGRESS_INTERVAL segundos esta
+extensión lee esos valores de las estadísticas de Scrapy y del scheduler y
+los añade a `counters` en el canal de estado (statuschannel.py), que agrupa
+las escrituras. Sólo activa si STATUS_FILE está definido.
+"""
+
+from scrapy import signals
+from scrapy.exceptions import NotConfigured
+from twisted.internet import task
+
+from autoconsumo_scraper_scrapy.statuschannel import get_channel
+
+PROGRESS_INTERVAL = 1.0
+
+
+class ProgressExtension:
+
+    def __init__(self, crawler, status_file, interval=PROGRESS_INTERVAL):
+        self.crawler = crawler
+        self.channel = get_channel(status_file)
+        self.interval = interval
+        self._loop = None
+
+    @classmethod
+    def from_crawler(cls, crawler):
+        status_file = crawler.settings.get('STATUS_FILE')
+        if not status_file:
+            raise NotConfigured
+        extension = cls(crawler, status_file, crawler.settings.getfloat('PROGRESS_INTERVAL', PROGRESS_INTERVAL))
+        crawler.signals.connect(extension.spider_opened, signal=signals.spider_opened)
+        crawler.signals.connect(extension.spider_closed, signal=signals.spider_closed)
+        return extension
+
+    def spider_opened(self, spider):
+        self._loop = task.LoopingCall(self.report)
+        self._loop.start(self.interval, now=True)
+
+    def spider_closed(self, spider, reason):
+        if self._loop and self._loop.running:
+            self._loop.stop()
+        self.report()
+        self.channel.flush()
+
+    def counters(self):
+        stats = self.crawler.stats
+        engine = self.crawler.engine
+        slot = getattr(engine, '_slot', None) or getattr(engine, 'slot', None)
+        scheduler = getattr(slot, 'scheduler', None)
+        try:
+            queued = len(scheduler) if scheduler is not None else 0
+        except TypeError:
+            queued = 0
+        downloader = getattr(engine, 'downloader', None)
+        return {
+            'requests': stats.get_value('downloader/request_count', 0),
+            'responses': stats.get_value('downloader/response_count', 0),
+            'items': stats.get_value('item_scraped_count', 0),
+            'queued': queued,
+            'in_progress': len(getattr(downloader, 'active', ()) or ()),
+        }
+
+    def report(self):
+        counters = self.counters()
+        if counters != self.channel.get('counters'):
+            self.channel.update(counters=counters)
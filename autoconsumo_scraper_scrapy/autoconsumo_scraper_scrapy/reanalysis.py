@@ -0,0 +1,252 @@
+"""
+Reanálisis sin red de las páginas guardadas en una ejecución.
+
+Aplica a los `.html`/`.txt` ya guardados (en ficheros o en segmentos, ver
+pagestore.py) la misma lógica de términos y exclusiones que
+`GenericSpider.parse`: recorrido único con `extract_page` y el autómata de
+`TermMatcher`, descartando la página en cuanto aparece una exclusión. Sirve
+para ver el efecto de un `terminos_interes.txt` o `exclusiones.txt` nuevos sin
+volver a rastrear.
+
+Las páginas se reparten por lotes entre un pool de procesos (un proceso por
+núcleo); cada proceso compila el matcher una sola vez y lee las páginas por su
+cuenta, de modo que al pool sólo viajan nombres y resultados. El resultado va a
+`<ejecución>/reanalisis/<fecha>/`: `procesados.md`, `resultados.jsonl` (una
+línea por página) y una copia de los términos y exclusiones usados.
+
+Sólo se guardaron las páginas que tenían algún término en la ejecución
+original: para analizar todas las páginas visitadas, reproduce la ejecución
+desde su grabación WARC (`warc_replay`).
+"""
+
+import json
+import os
+import shutil
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from pathlib import Path
+from urllib.parse import quote
+
+from scrapy.http import HtmlResponse
+
+from autoconsumo_scraper_scrapy.extraction import extract_page
+from autoconsumo_scraper_scrapy.matcher import TermMatcher
+from autoconsumo_scraper_scrapy.pagestore import PageStore, split_text_file
+from autoconsumo_scraper_scrapy.textnorm import normalize_term, normalize_text
+
+REANALYSIS_DIRNAME = 'reanalisis'
+RESULTS_NAME = 'resultados.jsonl'
+# Páginas por tarea: suficientes para amortizar el envío al pool
+BATCH_SIZE = 32
+
+# Estado de cada proceso del pool (lo fija _init_worker)
+_worker = {}
+
+
+def load_term_map(path):
+    """Término normalizado -> término original de un fichero de términos (vacío si no existe)."""
+    terms = {}
+    if not path or not os.path.exists(path):
+        return terms
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            stripped = line.strip()
+            if stripped and not stripped.startswith('#'):
+                terms[normalize_term(stripped)] = stripped
+    return terms
+
+
+def collect_pages(documents_dir):
+    """
+    Páginas guardadas de una carpeta de documentos, una por URL: el `.html` si
+    existe (mismo análisis que el spider) y si no el `.txt`.
+    """
+    store = PageStore.open(documents_dir)
+    candidates = {}
+    if store is not None:
+        for entry in store.entries():
+            base, _ = os.path.splitext(entry['name'])
+            candidates.setdefault(base, {})[entry['kind']] = {'name': entry['name'], 'url': entry['url']}
+    elif os.path.isdir(documents_dir):
+        for name in os.listdir(documents_dir):
+            base, ext = os.path.splitext(name)
+            if ext in ('.html', '.txt'):
+                candidates.setdefault(base, {})[ext[1:]] = {'name': name, 'url': None}
+
+    pages = []
+    for base in sorted(candidates):
+        kinds = candidates[base]
+        kind = 'html' if 'html' in kinds else 'txt'
+        page = dict(kinds[kind], kind=kind)
+        if page['url'] is None and 'txt' in kinds:
+            # En ficheros sueltos la URL sólo consta en la cabecera del .txt
+            page['url_from'] = kinds['txt']['name']
+        pages.append(page)
+    return pages
+
+
+def _init_worker(documents_dir, keywords_map, exclusions_map):
+    _worker['documents_dir'] = documents_dir
+    _worker['store'] = PageStore.open(documents_dir)
+    _worker['matcher'] = TermMatcher(keywords_map, exclusions_map)
+
+
+def _read(name):
+    store = _worker['store']
+    if store is not None and name in store:
+        return store.read(name)
+    with open(os.path.join(_worker['documents_dir'], name), 'rb') as f:
+        return f.read()
+
+
+def analyze_page(matcher, page, data, url=None):
+    """Resultado del análisis de una página: términos encontrados o exclusión."""
+    if page['kind'] == 'html':
+        response = HtmlResponse(url=url or 'http://localhost/', body=data, encoding='utf-8')
+        content = extract_page(response, matcher.scanner(normalize_text))
+        exclusion = content.exclusion
+        keywords = content.matches.keywords if content.matches is not None else set()
+    else:
+        text_url, text = split_text_file(data.decode('utf-8', errors='replace'))
+        url = url or text_url
+        matches = matcher.scan(normalize_text(text))
+        exclusion = matches.first_exclusion
+        keywords = matches.keywords
+    return {
+        'name': page['name'],
+        'url': url,
+        'kind': page['kind'],
+        'exclusion': exclusion,
+        # Como en el spider, una exclusión descarta la página entera
+        'keywords': [] if exclusion else sorted(keywords),
+    }
+
+
+def _analyze_batch(pages):
+    # Tiempo de CPU: no crece si hay más procesos que núcleos
+    started = time.process_time()
+    matcher = _worker['matcher']
+    results = []
+    for page in pages:
+        try:
+            url = page.get('url')
+            if url is None and page.get('url_from'):
+                url = split_text_file(_read(page['url_from']).decode('utf-8', errors='replace'))[0]
+            results.append(analyze_page(matcher, page, _read(page['name']), url))
+        except (OSError, ValueError) as exc:
+            results.append({'name': page['name'], 'url': page.get('url'), 'kind': page['kind'], 'error': str(exc)})
+    return results, time.process_time() - started
+
+
+def reanalyze(documents_dir, keywords_map, exclusions_map, workers=None, batch_size=BATCH_SIZE):
+    """
+    Analiza en paralelo las páginas de `documents_dir`. Devuelve
+    `(resultados, métricas)`; las métricas incluyen páginas por segundo en
+    total y por núcleo (páginas entre segundos de CPU de los procesos).
+    """
+    pages = collect_pages(documents_dir)
+    workers = max(1, min(workers or os.cpu_count() or 1, (len(pages) + batch_size - 1) // batch_size or 1))
+    batches = [pages[i:i + batch_size] for i in range(0, len(pages), batch_size)]
+
+    started = time.perf_counter()
+    results = []
+    busy_seconds = 0.0
+    with ProcessPoolExecutor(
+        max_workers=workers,
+        initializer=_init_worker,
+        initargs=(documents_dir, keywords_map, exclusions_map),
+    ) as pool:
+        for batch_results, batch_seconds in pool.map(_analyze_batch, batches):
+            results.extend(batch_results)
+            busy_seconds += batch_seconds
+    elapsed = time.perf_counter() - started
+
+    metrics = {
+        'pages': len(pages),
+        'workers': workers,
+        'seconds': elapsed,
+        'busy_seconds': busy_seconds,
+        'pages_per_second': len(pages) / elapsed if elapsed > 0 else 0.0,
+        'pages_per_second_per_core': len(pages) / busy_seconds if busy_seconds > 0 else 0.0,
+    }
+    return results, metrics
+
+
+def build_report(execution_name, results, metrics, keywords_map, exclusions_map):
+    """Contenido de procesados.md del reanálisis."""
+    matched = [result for result in results if result.get('keywords')]
+    excluded = [result for result in results if result.get('exclusion')]
+    errors = [result for result in results if result.get('error')]
+    unmatched = len(results) - len(matched) - len(excluded) - len(errors)
+
+    def page_link(name):
+        return f"[{name}](/api/pages/{quote(name)}?execution={quote(execution_name)})"
+
+    lines = [
+        "# Reanálisis de la ejecución",
+        "",
+        f"- Fecha: {datetime.now().isoformat(timespec='seconds')}",
+        f"- Términos de interés: {len(keywords_map)} · exclusiones: {len(exclusions_map)}",
+        f"- Páginas analizadas: {metrics['pages']}",
+        f"- Con términos: {len(matched)} · excluidas: {len(excluded)} · sin términos: {unmatched}",
+        f"- Rendimiento: {metrics['pages_per_second']:.1f} páginas/s con {metrics['workers']} procesos "
+        f"({metrics['pages_per_second_per_core']:.1f} páginas/s por núcleo) · {metrics['seconds']:.2f} s",
+    ]
+    if errors:
+        lines.append(f"- Páginas ilegibles: {len(errors)}")
+    lines.append("")
+
+    if matched:
+        lines.append("## Páginas con términos")
+        lines.append("")
+        for result in matched:
+            lines.append(f"- {result['url'] or result['name']}: {', '.join(result['keywords'])} "
+                         f"({page_link(result['name'])})")
+        lines.append("")
+    if excluded:
+        lines.append("## Páginas excluidas")
+        lines.append("")
+        for result in excluded:
+            lines.append(f"- {result['url'] or result['name']}: {result['exclusion']}")
+        lines.append("")
+    if errors:
+        lines.append("## Páginas ilegibles")
+        lines.append("")
+        for result in errors:
+            lines.append(f"- {result['name']}: {result['error']}")
+        lines.append("")
+    if not results:
+        lines.append("No hay páginas guardadas en esta ejecución.")
+    return "\n".join(lines)
+
+
+def run_reanalysis(execution_dir, terminos_file, exclusiones_file, workers=None, documents_dir=None):
+    """
+    Reanaliza la ejecución y guarda el resultado en `reanalisis/<fecha>/`.
+    Devuelve el resumen (carpeta de salida, recuentos y métricas).
+    """
+    execution_path = Path(execution_dir)
+    documents_dir = documents_dir or str(execution_path / 'autoconsumo_documents')
+    keywords_map = load_term_map(terminos_file)
+    exclusions_map = load_term_map(exclusiones_file)
+
+    results, metrics = reanalyze(documents_dir, keywords_map, exclusions_map, workers=workers)
+
+    output_dir = execution_path / REANALYSIS_DIRNAME / datetime.now().strftime("%Y-%m-%d_%H-%M-%S")
+    output_dir.mkdir(parents=True, exist_ok=True)
+    for source in (terminos_file, exclusiones_file):
+        if source and os.path.exists(source):
+            shutil.copy2(source, output_dir)
+    with open(output_dir / RESULTS_NAME, 'w', encoding='utf-8') as f:
+        for result in results:
+            f.write(json.dumps(result, ensure_ascii=False) + '\n')
+    report = build_report(execution_path.name, results, metrics, keywords_map, exclusions_map)
+    (output_dir / 'procesados.md').write_text(report, encoding='utf-8')
+
+    return {
+        'output_dir': str(output_dir),
+        'matched': sum(1 for result in results if result.get('keywords')),
+        'excluded': sum(1 for result in results if result.get('exclusion')),
+        'metrics': metrics,
+    }
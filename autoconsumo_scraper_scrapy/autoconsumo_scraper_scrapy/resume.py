@@ -0,0 +1,172 @@
+"""
+Soporte para ejecuciones reanudables (JOBDIR).
+
+Con `JOBDIR` Scrapy ya persiste la cola del scheduler y el conjunto de
+peticiones vistas, pero el estado del spider (`spider.state`) sólo se guarda al
+cerrar de forma ordenada. Esta extensión sustituye a `SpiderState` para:
+
+- avisar al spider cuando su estado se ha cargado (`restore_state`) y antes
+  de guardarlo (`sync_state`), y
+- guardar el estado y volcar el dupefilter periódicamente, de modo que una
+  ejecución que termina de forma abrupta también pueda reanudarse.
+
+Scrapy sólo escribe la cola en disco de forma legible al cerrar el scheduler:
+la cabecera de cada cola y `requests.queue/active.json`. Para que un cierre
+abrupto no la pierda, las colas de este módulo (SCHEDULER_DISK_QUEUE y
+SCHEDULER_START_DISK_QUEUE) dejan el fichero coherente tras cada operación, y
+al reanudar una sesión que no se cerró (queda `session.running` en JOBDIR) se
+reconstruye `active.json` a partir de las colas que hay en disco.
+"""
+
+import json
+import os
+import pickle
+import struct
+
+from scrapy.extensions.spiderstate import SpiderState
+from scrapy.squeues import PickleFifoDiskQueue, PickleLifoDiskQueue
+from twisted.internet import task
+
+STATE_SAVE_INTERVAL = 30.0
+# Existe mientras una sesión usa JOBDIR; si sigue ahí al reanudar, se cortó
+SESSION_MARKER = 'session.running'
+
+
+class SyncedPickleLifoDiskQueue(PickleLifoDiskQueue):
+    """PickleLifoDiskQueue con la cabecera (número de peticiones) al día."""
+
+    def push(self, request):
+        super().push(request)
+        self._sync()
+
+    def pop(self):
+        request = super().pop()
+        self._sync()
+        return request
+
+    def _sync(self):
+        self.f.seek(0)
+        self.f.write(struct.pack(self.SIZE_FORMAT, self.size))
+        self.f.seek(0, os.SEEK_END)
+        self.f.flush()
+
+
+class SyncedPickleFifoDiskQueue(PickleFifoDiskQueue):
+    """PickleFifoDiskQueue con info.json (cabeza y cola) al día."""
+
+    def push(self, request):
+        super().push(request)
+        self._sync()
+
+    def pop(self):
+        request = super().pop()
+        self._sync()
+        return request
+
+    def _sync(self):
+        self.headf.flush()
+        info_path = self._infopath()
+        tmp_path = info_path.with_name(info_path.name + '.tmp')
+        tmp_path.write_text(json.dumps(self.info))
+        os.replace(tmp_path, info_path)
+
+
+def recover_queue_state(jobdir):
+    """
+    Reconstruye `requests.queue/active.json` con las prioridades que tienen
+    cola en disco (`<prioridad>` y `<prioridad>s` para las semillas), como lo
+    deja ScrapyPriorityQueue al cerrar. Devuelve el número de colas.
+    """
+    queue_dir = os.path.join(jobdir, 'requests.queue')
+    if not os.path.isdir(queue_dir):
+        return 0
+    priorities = set()
+    for name in os.listdir(queue_dir):
+        try:
+            priorities.add(int(name[:-1] if name.endswith('s') else name))
+        except ValueError:
+            continue
+    tmp_path = os.path.join(queue_dir, 'active.json.tmp')
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(sorted(priorities), f)
+    os.replace(tmp_path, os.path.join(queue_dir, 'active.json'))
+    return len(priorities)
+
+
+class ResumableSpiderState(SpiderState):
+
+    def __init__(self, jobdir=None, crawler=None, interval=STATE_SAVE_INTERVAL):
+        super().__init__(jobdir)
+        self.crawler = crawler
+        self.interval = interval
+        self.interrupted = False
+        self._loop = None
+
+    @classmethod
+    def from_crawler(cls, crawler):
+        obj = super().from_crawler(crawler)
+        obj.crawler = crawler
+        obj.interval = crawler.settings.getfloat('RESUME_STATE_INTERVAL', STATE_SAVE_INTERVAL)
+        obj.interrupted = os.path.exists(obj._marker_path())
+        if obj.interrupted and crawler.settings.get('SCHEDULER_PRIORITY_QUEUE') == 'scrapy.pqueues.ScrapyPriorityQueue':
+            # El scheduler lee active.json al abrirse, después de crear las extensiones
+            recover_queue_state(obj.jobdir)
+        return obj
+
+    def spider_opened(self, spider):
+        super().spider_opened(spider)
+        restore = getattr(spider, 'restore_state', None)
+        if callable(restore):
+            restore(spider.state, interrupted=self.interrupted)
+        with open(self._marker_path(), 'w', encoding='utf-8') as f:
+            f.write(str(os.getpid()))
+        if self.interval > 0:
+            self._loop = task.LoopingCall(self.save, spider)
+            self._loop.start(self.interval, now=False)
+
+    def spider_closed(self, spider):
+        if self._loop and self._loop.running:
+            self._loop.stop()
+        self._sync_spider(spider)
+        super().spider_closed(spider)
+        # La cola ya está escrita: el scheduler se cierra antes de spider_closed
+        try:
+            os.remove(self._marker_path())
+        except OSError:
+            pass
+
+    def _marker_path(self):
+        return os.path.join(self.jobdir, SESSION_MARKER)
+
+    def save(self, spider):
+        """Guarda `spider.state` de forma atómica y vuelca las peticiones vistas."""
+        if not self.jobdir or not hasattr(spider, 'state'):
+            return
+        self._sync_spider(spider)
+        tmp_path = self.statefn + '.tmp'
+        try:
+            with open(tmp_path, 'wb') as f:
+                pickle.dump(spider.state, f, protocol=4)
+            os.replace(tmp_path, self.statefn)
+        except (OSError, pickle.PicklingError) as exc:
+            spider.logger.warning(f"No se pudo guardar el estado de reanudación: {exc}")
+        self._flush_dupefilter()
+
+    @staticmethod
+    def _sync_spider(spider):
+        sync = getattr(spider, 'sync_state', None)
+        if callable(sync):
+            sync()
+
+    def _flush_dupefilter(self):
+        engine = getattr(self.crawler, 'engine', None) if self.crawler else None
+        slot = getattr(engine, '_slot', None) or getattr(engine, 'slot', None)
+        scheduler = getattr(slot, 'scheduler', None)
+        dupefilter = getattr(scheduler, 'df', None)
+        seen_file = getattr(dupefilter, 'file', None)
+        if seen_file is not None:
+            try:
+                seen_file.flush()
+            except (OSError, ValueError):
+                pass
+
@@ -0,0 +1,232 @@
+"""
+Scheduler sobre la frontera compartida (sharedfrontier.py).
+
+Sustituye la cola y el conjunto de vistas de Scrapy por los de la frontera,
+de modo que varios nodos rastrean una misma ejecución sin repetir páginas:
+
+- `enqueue_request` descarta las peticiones cuya huella ya está en el
+  conjunto común y guarda el resto serializadas (igual que la cola en disco
+  de JOBDIR). Las semillas (`is_start_request`) de todos los nodos son las
+  mismas: se registran como `start:<URL raíz>:<huella>` y sólo entran la
+  primera vez, aunque lleven `dont_filter` (robots.txt y sitemaps).
+- `next_request` toma peticiones en préstamo de FRONTIER_LEASE_BATCH en
+  FRONTIER_LEASE_BATCH. Una petición prestada se confirma cuando Scrapy
+  termina con ella (se libera el objeto Request: respuesta procesada,
+  error o descarte); mientras tanto el nodo renueva su préstamo.
+- Cada pocos segundos (MAINTAIN_INTERVAL, como mucho FRONTIER_LEASE_SECONDS
+  / 4) se confirman las terminadas, se renuevan las que siguen en curso y se
+  devuelven a la cola los préstamos caducados de nodos que ya no responden.
+- Al cerrar por pausa o cancelación, las prestadas sin terminar vuelven a la
+  cola para los demás nodos.
+- Los presupuestos (max_pages, límites por fuente) son de cada nodo: una
+  petición prestada que el spider descartaría (`should_drop`, ver budget.py)
+  vuelve a la cola sin gastar un intento, en lugar de confirmarse. Si todo lo
+  que recibe el nodo son peticiones así, deja de pedir y termina; los demás
+  nodos siguen con ellas.
+
+El nodo no se da por terminado mientras quede algo en cola o en préstamo en
+cualquier nodo: el motor de Scrapy vuelve a preguntar cada pocos segundos.
+Las peticiones que no se pueden serializar se quedan en la cola en memoria
+del nodo, como hace Scheduler con JOBDIR.
+"""
+
+import gc
+import logging
+import os
+import pickle
+import socket
+import time
+import weakref
+from collections import deque
+
+from scrapy.core.scheduler import Scheduler
+from scrapy.utils.request import request_from_dict
+from twisted.internet import task
+
+from autoconsumo_scraper_scrapy.sharedfrontier import (
+    FRONTIER_LEASE_SECONDS, FRONTIER_MAX_ATTEMPTS, SharedFrontier, open_backend,
+)
+
+logger = logging.getLogger(__name__)
+
+FRONTIER_LEASE_BATCH = 4
+# Segundos máximos entre pasadas de mantenimiento (confirmar, renovar, recuperar)
+MAINTAIN_INTERVAL = 5.0
+
+
+class SharedFrontierScheduler(Scheduler):
+
+    @classmethod
+    def from_crawler(cls, crawler):
+        scheduler = super().from_crawler(crawler)
+        settings = crawler.settings
+        scheduler.frontier_url = settings.get('FRONTIER_URL')
+        if not scheduler.frontier_url:
+            raise ValueError('SharedFrontierScheduler necesita FRONTIER_URL')
+        scheduler.namespace = settings.get('FRONTIER_NAMESPACE') or crawler.spidercls.name
+        scheduler.lease_seconds = settings.getfloat('FRONTIER_LEASE_SECONDS', FRONTIER_LEASE_SECONDS)
+        scheduler.max_attempts = settings.getint('FRONTIER_MAX_ATTEMPTS', FRONTIER_MAX_ATTEMPTS)
+        scheduler.batch_size = max(1, settings.getint('FRONTIER_LEASE_BATCH', FRONTIER_LEASE_BATCH))
+        scheduler.worker_id = f'{socket.gethostname()}:{os.getpid()}'
+        return scheduler
+
+    def open(self, spider):
+        self.spider = spider
+        # Sólo para peticiones que no se pueden serializar
+        self.mqs = self._mq()
+        self.dqs = None
+        self.frontier = SharedFrontier(open_backend(self.frontier_url), self.namespace,
+                                       lease_seconds=self.lease_seconds, max_attempts=self.max_attempts)
+        self._leased = deque()
+        self._in_flight = set()
+        self._finished = []
+        self._last_finished = time.monotonic()
+        # La última tanda prestada sólo traía peticiones fuera del presupuesto del nodo
+        self._declined = False
+        self._loop = task.LoopingCall(self._maintain)
+        self._loop.start(max(0.5, min(MAINTAIN_INTERVAL, self.lease_seconds / 4)), now=False)
+        logger.info(
+            "Frontera compartida %s · espacio %s · nodo %s: %d en cola, %d en préstamo",
+            self.frontier_url, self.namespace, self.worker_id,
+            self.frontier.pending_count(), self.frontier.leased_count(),
+        )
+        return self.df.open()
+
+    def close(self, reason):
+        if self._loop.running:
+            self._loop.stop()
+        # Peticiones ya terminadas que sólo esperan a un ciclo del recolector
+        gc.collect()
+        self._confirm_finished()
+        if self._in_flight:
+            released = self.frontier.release(list(self._in_flight))
+            self.stats.inc_value('frontier/released', released, spider=self.spider)
+            logger.info("Frontera compartida: %d peticiones sin terminar vuelven a la cola", released)
+        self.frontier.close()
+        return self.df.close(reason)
+
+    def enqueue_request(self, request):
+        fingerprint = self.df.fingerprinter.fingerprint(request).hex()
+        if request.meta.get('is_start_request'):
+            # La fuente distingue el robots.txt de dos fuentes del mismo sitio
+            member = f"start:{request.meta.get('root_url', '')}:{fingerprint}"
+            if not self.frontier.add_seen(member):
+                self.stats.inc_value('frontier/start_skipped', spider=self.spider)
+                return False
+        if not request.dont_filter and not self.frontier.add_seen(fingerprint):
+            self.df.log(request, self.spider)
+            return False
+        try:
+            payload = pickle.dumps(request.to_dict(spider=self.spider), protocol=4)
+        except (ValueError, TypeError, AttributeError, pickle.PicklingError) as exc:
+            if self.logunser:
+                logger.warning("Petición no serializable, queda en este nodo: %s (%s)", request, exc)
+            self._mqpush(request)
+            self.stats.inc_value('scheduler/enqueued/memory', spider=self.spider)
+        else:
+            self.frontier.push(payload, request.priority)
+            self.stats.inc_value('frontier/enqueued', spider=self.spider)
+        self.stats.inc_value('scheduler/enqueued', spider=self.spider)
+        return True
+
+    def next_request(self):
+        self._confirm_finished()
+        request = self.mqs.pop()
+        if request is not None:
+            self.stats.inc_value('scheduler/dequeued/memory', spider=self.spider)
+            self.stats.inc_value('scheduler/dequeued', spider=self.spider)
+            return request
+        declined = []
+        while True:
+            if not self._leased:
+                if declined:
+                    # Sin volver a pedir: ZPOPMAX devolvería las mismas
+                    self._decline(declined)
+                    return None
+                self._lease()
+            if not self._leased:
+                return None
+            request_id, payload = self._leased.popleft()
+            try:
+                request = request_from_dict(pickle.loads(payload), spider=self.spider)
+            except Exception as exc:
+                logger.warning("Petición de la frontera no válida en este nodo, se descarta: %s", exc)
+                self._finished.append(request_id)
+                continue
+            should_drop = getattr(self.spider, 'should_drop', None)
+            if callable(should_drop) and should_drop(request):
+                # CrawlBudgetMiddleware la descartaría y se confirmaría para todos los nodos
+                declined.append(request_id)
+                continue
+            if declined:
+                self._decline(declined)
+            self._declined = False
+            # Confirmada cuando Scrapy suelta el Request (ver _confirm_finished)
+            weakref.finalize(request, self._request_finished, request_id)
+            self.stats.inc_value('frontier/leased', spider=self.spider)
+            self.stats.inc_value('scheduler/dequeued', spider=self.spider)
+            return request
+
+    def has_pending_requests(self):
+        self._confirm_finished()
+        if self._leased or len(self.mqs):
+            return True
+        if self._declined:
+            # Lo que queda excede el presupuesto de este nodo
+            return False
+        # Lo prestado a otros nodos aún puede generar peticiones nuevas
+        return bool(self.frontier.pending_count() or self.frontier.leased_count())
+
+    def __len__(self):
+        return len(self._leased) + len(self.mqs) + self.frontier.pending_count()
+
+    def _lease(self):
+        leased, abandoned = self.frontier.lease(self.batch_size)
+        if abandoned:
+            self.stats.inc_value('frontier/abandoned', abandoned, spider=self.spider)
+            logger.warning(
+                "Frontera compartida: %d peticiones descartadas tras %d préstamos sin terminar",
+                abandoned, self.max_attempts,
+            )
+        for request_id, payload in leased:
+            self._leased.append((request_id, payload))
+            self._in_flight.add(request_id)
+
+    def _decline(self, ids):
+        self._in_flight.difference_update(ids)
+        declined = self.frontier.decline(ids)
+        self.stats.inc_value('frontier/declined', declined, spider=self.spider)
+        if not self._declined:
+            self._declined = True
+            logger.info("Frontera compartida: %d peticiones fuera del presupuesto de este nodo vuelven a la cola",
+                        declined)
+
+    def _request_finished(self, request_id):
+        self._finished.append(request_id)
+        self._last_finished = time.monotonic()
+
+    def _confirm_finished(self):
+        if not self._finished:
+            return
+        finished, self._finished = self._finished, []
+        self._in_flight.difference_update(finished)
+        self.frontier.ack(finished)
+        self.stats.inc_value('frontier/acked', len(finished), spider=self.spider)
+
+    def _maintain(self):
+        if self._in_flight and time.monotonic() - self._last_finished > self._loop.interval:
+            # Las peticiones que acaban en error quedan en ciclos de referencias
+            # (Failure) que sólo libera el recolector, y con el nodo parado
+            # apenas pasa: sin él, sus préstamos no se confirmarían nunca
+            gc.collect()
+        try:
+            self._confirm_finished()
+            self.frontier.renew(list(self._in_flight))
+            reclaimed = self.frontier.reclaim_expired()
+        except Exception as exc:
+            # Frontera no disponible un momento: se reintenta en la siguiente pasada
+            logger.warning("Frontera compartida: error al renovar los préstamos: %s", exc)
+            return
+        if reclaimed:
+            self.stats.inc_value('frontier/reclaimed', reclaimed, spider=self.spider)
+            logger.info("Frontera compartida: %d peticiones de nodos sin respuesta vuelven a la cola", reclaimed)
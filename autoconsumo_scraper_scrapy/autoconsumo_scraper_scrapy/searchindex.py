@@ -0,0 +1,343 @@
+"""
+Índice de búsqueda de texto completo (SQLite FTS5) de todas las ejecuciones.
+
+TextFilePipeline añade cada página cuyo texto guarda (URL, ejecución, índice
+de la fuente, términos encontrados y texto) a una base de datos común
+(`search_index.sqlite3` junto a `ejecuciones/`); `app.py` la consulta en
+`/api/search` con resultados ordenados por relevancia (BM25), paginados y con
+fragmentos del texto. El tokenizador ignora mayúsculas y acentos, igual que
+la normalización de términos del spider.
+
+- `pages`: metadatos, una fila por (ejecución, fichero).
+- `pages_fts`: tabla FTS5 con `url`, `terms`, `text` y `execution` (rowid =
+  `pages.id`); el filtro por ejecución es un filtro de columna de FTS5.
+
+La base de datos es común a todas las ejecuciones, a los trabajos en paralelo
+y a los procesos de una ejecución repartida: `add_page` acumula las páginas en
+memoria y `commit` las escribe en una transacción corta (BEGIN IMMEDIATE), de
+modo que ningún escritor retiene el bloqueo mientras el rastreo espera la
+siguiente página. Si otro escritor lo tiene más de `busy_timeout` segundos, el
+lote se queda en memoria para el siguiente `commit`.
+
+Sin dependencias de Scrapy (lo usa también app.py). Para indexar ejecuciones
+anteriores (o eliminar las que ya no existen), desde autoconsumo_scraper_scrapy/::
+
+    python -m autoconsumo_scraper_scrapy.searchindex <base de datos> reindex <carpeta ejecuciones>
+    python -m autoconsumo_scraper_scrapy.searchindex <base de datos> search <consulta>
+"""
+
+import argparse
+import html
+import os
+import pathlib
+import re
+import sqlite3
+import sys
+import time
+from contextlib import contextmanager
+from datetime import datetime
+
+from autoconsumo_scraper_scrapy.pagestore import PageStore, split_text_file
+
+SEARCH_INDEX_NAME = 'search_index.sqlite3'
+
+# Pesos BM25 de las columnas url, terms, text y execution: un término de
+# interés o la URL pesan más que una mención en el texto
+RANK_WEIGHTS = (2.0, 4.0, 1.0, 0.0)
+
+# Páginas entre commits mientras se indexa durante el rastreo
+COMMIT_EVERY = 50
+COMMIT_INTERVAL = 5.0
+# Espera máxima por el bloqueo de escritura durante el rastreo (segundos)
+CRAWL_BUSY_TIMEOUT = 1.0
+# Páginas en memoria como mucho si la base de datos sigue bloqueada: las más
+# antiguas se descartan (se recuperan con `reindex`)
+MAX_PENDING = 1000
+
+SNIPPET_TOKENS = 24
+# Marcas del fragmento: caracteres de control que no aparecen en el texto, para
+# escapar el HTML antes de convertirlas en <mark>
+_MARK_START = '\x02'
+_MARK_END = '\x03'
+
+_QUERY_TOKEN = re.compile(r'"([^"]*)"|(\w+)(\*?)')
+_WORD = re.compile(r'\w+')
+
+SCHEMA = f"""
+CREATE TABLE IF NOT EXISTS pages (
+    id INTEGER PRIMARY KEY,
+    execution TEXT NOT NULL,
+    name TEXT NOT NULL,
+    url TEXT,
+    source_index INTEGER,
+    terms TEXT,
+    indexed_at TEXT,
+    UNIQUE (execution, name)
+);
+CREATE VIRTUAL TABLE IF NOT EXISTS pages_fts USING fts5(
+    url, terms, text, execution,
+    tokenize = 'unicode61 remove_diacritics 2'
+);
+INSERT INTO pages_fts (pages_fts, rank) VALUES ('rank', 'bm25({", ".join(map(str, RANK_WEIGHTS))})');
+"""
+
+
+def build_match_query(query):
+    """
+    Consulta FTS5 segura a partir del texto del usuario: todas las palabras
+    deben aparecer; "entre comillas" busca la frase y `palabra*` el prefijo.
+    Cadena vacía si no hay nada que buscar.
+    """
+    parts = []
+    for phrase, word, star in _QUERY_TOKEN.findall(query or ''):
+        if word:
+            parts.append(f'"{word}"{star}')
+        else:
+            words = _WORD.findall(phrase)
+            if words:
+                parts.append('"' + ' '.join(words) + '"')
+    return ' '.join(parts)
+
+
+def format_snippet(snippet):
+    """Fragmento de FTS5 con el HTML escapado y las coincidencias en <mark>."""
+    escaped = html.escape(snippet or '')
+    return escaped.replace(_MARK_START, '<mark>').replace(_MARK_END, '</mark>')
+
+
+class SearchIndex:
+
+    def __init__(self, path, timeout=30.0):
+        self.path = path
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        # Transacciones explícitas (ver _write)
+        self.conn = sqlite3.connect(path, timeout=timeout, isolation_level=None)
+        # Lectores (app.py) y escritor (el rastreo) a la vez
+        self.conn.execute('PRAGMA journal_mode=WAL')
+        self.conn.execute('PRAGMA synchronous=NORMAL')
+        with self._write():
+            exists = self.conn.execute(
+                "SELECT 1 FROM sqlite_master WHERE name = 'pages_fts'"
+            ).fetchone()
+            if not exists:
+                for statement in SCHEMA.split(';'):
+                    if statement.strip():
+                        self.conn.execute(statement)
+        self._pending = []
+        self.dropped = 0
+        self._last_commit = time.monotonic()
+
+    @classmethod
+    def open_existing(cls, path, timeout=5.0):
+        """
+        Índice en `path` sólo para consultas, o None si todavía no se ha creado.
+        Conexión de sólo lectura: no crea el esquema ni compite con el rastreo
+        por el bloqueo de escritura.
+        """
+        if not path or not os.path.exists(path):
+            return None
+        index = cls.__new__(cls)
+        index.path = path
+        index.conn = sqlite3.connect(
+            f'{pathlib.Path(path).resolve().as_uri()}?mode=ro', uri=True, timeout=timeout, isolation_level=None
+        )
+        index._pending = []
+        index.dropped = 0
+        index._last_commit = time.monotonic()
+        return index
+
+    @contextmanager
+    def _write(self):
+        self.conn.execute('BEGIN IMMEDIATE')
+        try:
+            yield
+        except BaseException:
+            self.conn.execute('ROLLBACK')
+            raise
+        self.conn.execute('COMMIT')
+
+    def add_page(self, execution, name, url, text, source_index=None, terms=()):
+        """Añade (o sustituye) una página; se escribe por lotes en `commit`."""
+        self._pending.append((execution, name, url, text, source_index, ', '.join(terms or ())))
+        if len(self._pending) > MAX_PENDING:
+            del self._pending[0]
+            self.dropped += 1
+        if len(self._pending) >= COMMIT_EVERY or time.monotonic() - self._last_commit >= COMMIT_INTERVAL:
+            self.commit()
+
+    def commit(self):
+        """
+        Escribe las páginas pendientes en una transacción. False si la base de
+        datos sigue bloqueada por otro escritor: el lote queda para el siguiente.
+        """
+        self._last_commit = time.monotonic()
+        if not self._pending:
+            return True
+        try:
+            with self._write():
+                cursor = self.conn.cursor()
+                for page in self._pending:
+                    self._write_page(cursor, *page)
+        except sqlite3.OperationalError as exc:
+            if 'locked' not in str(exc) and 'busy' not in str(exc):
+                raise
+            return False
+        self._pending = []
+        return True
+
+    def _write_page(self, cursor, execution, name, url, text, source_index, terms_text):
+        row = cursor.execute(
+            'SELECT id FROM pages WHERE execution = ? AND name = ?', (execution, name)
+        ).fetchone()
+        if row is not None:
+            page_id = row[0]
+            cursor.execute(
+                'UPDATE pages SET url = ?, source_index = ?, terms = ?, indexed_at = ? WHERE id = ?',
+                (url, source_index, terms_text, datetime.now().isoformat(timespec='seconds'), page_id),
+            )
+            cursor.execute('DELETE FROM pages_fts WHERE rowid = ?', (page_id,))
+        else:
+            cursor.execute(
+                'INSERT INTO pages (execution, name, url, source_index, terms, indexed_at) VALUES (?, ?, ?, ?, ?, ?)',
+                (execution, name, url, source_index, terms_text, datetime.now().isoformat(timespec='seconds')),
+            )
+            page_id = cursor.lastrowid
+        cursor.execute(
+            'INSERT INTO pages_fts (rowid, url, terms, text, execution) VALUES (?, ?, ?, ?, ?)',
+            (page_id, url or '', terms_text, text, execution),
+        )
+
+    def indexed_names(self, execution):
+        return {name for (name,) in self.conn.execute('SELECT name FROM pages WHERE execution = ?', (execution,))}
+
+    def executions(self):
+        return [execution for (execution,) in self.conn.execute('SELECT DISTINCT execution FROM pages')]
+
+    def remove_execution(self, execution):
+        with self._write():
+            self.conn.execute(
+                'DELETE FROM pages_fts WHERE rowid IN (SELECT id FROM pages WHERE execution = ?)', (execution,)
+            )
+            self.conn.execute('DELETE FROM pages WHERE execution = ?', (execution,))
+
+    def search(self, query, page=1, per_page=20, execution=None):
+        """
+        `(total, resultados)` de la consulta, ordenados por relevancia. Cada
+        resultado incluye ejecución, fichero, URL, fuente, términos y fragmento.
+        """
+        match = build_match_query(query)
+        if not match:
+            return 0, []
+        if execution:
+            # Filtro de columna: lo resuelve el índice FTS5, sin leer `pages`
+            execution_phrase = build_match_query(f'"{execution}"')
+            match = f'({match}) AND execution : {execution_phrase}'
+        total = self.conn.execute('SELECT count(*) FROM pages_fts WHERE pages_fts MATCH ?', (match,)).fetchone()[0]
+        offset = (max(page, 1) - 1) * per_page
+        # Relevancia sobre todas las coincidencias, en el mismo orden para
+        # todas las páginas; snippet() sólo se calcula para las devueltas
+        ranked = self.conn.execute(
+            """
+            SELECT rowid, snippet(pages_fts, 2, ?, ?, '…', ?), rank
+            FROM pages_fts WHERE pages_fts MATCH ?
+            ORDER BY rank, rowid
+            LIMIT ? OFFSET ?
+            """,
+            (_MARK_START, _MARK_END, SNIPPET_TOKENS, match, per_page, offset),
+        ).fetchall()
+        placeholders = ', '.join('?' * len(ranked))
+        metadata = {
+            row[0]: row[1:] for row in self.conn.execute(
+                f'SELECT id, execution, name, url, source_index, terms FROM pages WHERE id IN ({placeholders})',
+                [row[0] for row in ranked],
+            )
+        }
+        results = []
+        for page_id, snippet, rank in ranked:
+            execution_id, name, url, source_index, terms = metadata[page_id]
+            results.append({
+                'execution': execution_id,
+                'name': name,
+                'url': url,
+                'source_index': source_index,
+                'terms': [term for term in (terms or '').split(', ') if term],
+                'snippet': format_snippet(snippet),
+                'score': -rank,
+            })
+        return total, results
+
+    def index_execution(self, execution_dir):
+        """Indexa los .txt guardados de una ejecución que aún no estén; devuelve cuántos."""
+        execution = os.path.basename(os.path.normpath(execution_dir))
+        documents_dir = os.path.join(execution_dir, 'autoconsumo_documents')
+        known = self.indexed_names(execution)
+        store = PageStore.open(documents_dir)
+        if store is not None:
+            names = [entry['name'] for entry in store.entries('txt')]
+        elif os.path.isdir(documents_dir):
+            names = sorted(name for name in os.listdir(documents_dir) if name.endswith('.txt'))
+        else:
+            names = []
+        added = 0
+        for name in names:
+            if name in known:
+                continue
+            if store is not None:
+                content = store.read_text(name)
+            else:
+                with open(os.path.join(documents_dir, name), 'r', encoding='utf-8', errors='replace') as f:
+                    content = f.read()
+            url, text = split_text_file(content)
+            self.add_page(execution, name, url, text)
+            added += 1
+        self.commit()
+        return added
+
+    def close(self):
+        """Escribe lo pendiente y cierra; lo que no se pudo escribir cuenta en `dropped`."""
+        if not self.commit():
+            self.dropped += len(self._pending)
+            self._pending = []
+        self.conn.close()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Índice de búsqueda de las páginas guardadas.')
+    parser.add_argument('database', help='Fichero SQLite del índice')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    reindex_parser = subparsers.add_parser('reindex', help='Indexa las ejecuciones que falten y elimina las borradas')
+    reindex_parser.add_argument('executions_dir')
+    search_parser = subparsers.add_parser('search', help='Busca en el índice')
+    search_parser.add_argument('query')
+    search_parser.add_argument('--limit', type=int, default=10)
+    args = parser.parse_args(argv)
+
+    index = SearchIndex(args.database)
+    try:
+        if args.command == 'reindex':
+            existing = {
+                name for name in os.listdir(args.executions_dir)
+                if os.path.isdir(os.path.join(args.executions_dir, name))
+            }
+            for execution in set(index.executions()) - existing:
+                index.remove_execution(execution)
+                print(f"{execution}: eliminada del índice")
+            for execution in sorted(existing):
+                added = index.index_execution(os.path.join(args.executions_dir, execution))
+                if added:
+                    print(f"{execution}: {added} páginas indexadas")
+        else:
+            started = time.perf_counter()
+            total, results = index.search(args.query, per_page=args.limit)
+            elapsed_ms = (time.perf_counter() - started) * 1000
+            print(f"{total} resultados ({elapsed_ms:.1f} ms)")
+            for result in results:
+                print(f"{result['score']:.2f}\t{result['execution']}\t{result['url']}")
+    finally:
+        index.close()
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -46,15 +46,61 @@ DOWNLOAD_DELAY = 1
 
 # Enable or disable downloader middlewares
 # See https://docs.scrapy.org/en/latest/topics/downloader-middleware.html
-#DOWNLOADER_MIDDLEWARES = {
-#    "autoconsumo_scraper_scrapy.middlewares.AutoconsumoScraperScrapyDownloaderMiddleware": 543,
-#}
+DOWNLOADER_MIDDLEWARES = {
+    # Caché HTTP compartida con revalidación condicional (ver httpcache.py)
+    "scrapy.downloadermiddlewares.httpcache.HttpCacheMiddleware": None,
+    "autoconsumo_scraper_scrapy.httpcache.RevalidatingCacheMiddleware": 900,
+    # Corta la descarga del cuerpo según las cabeceras (ver headerfilter.py);
+    # antes de HttpCompressionMiddleware (590) en el procesado de respuestas
+    "autoconsumo_scraper_scrapy.headerfilter.HeaderFilterMiddleware": 595,
+    # Ritmo adaptativo por dominio (ve los 429/503 antes que RetryMiddleware)
+    "autoconsumo_scraper_scrapy.throttle.AdaptiveThrottleMiddleware": 580,
+    # Descarta peticiones pendientes con el presupuesto agotado (ver budget.py)
+    "autoconsumo_scraper_scrapy.budget.CrawlBudgetMiddleware": 50,
+    # Graba peticiones y respuestas en WARC (solo activo con WARC_OUTPUT_DIR)
+    "autoconsumo_scraper_scrapy.warc.WarcRecorderMiddleware": 850,
+}
 
 # Enable or disable extensions
 # See https://docs.scrapy.org/en/latest/topics/extensions.html
-#EXTENSIONS = {
-#    "scrapy.extensions.telnet.TelnetConsole": None,
-#}
+EXTENSIONS = {
+    # Estado del spider reanudable (solo activo con JOBDIR)
+    "scrapy.extensions.spiderstate.SpiderState": None,
+    "autoconsumo_scraper_scrapy.resume.ResumableSpiderState": 0,
+    # Contadores de peticiones, respuestas, items y cola en status.json (solo activo con STATUS_FILE)
+    "autoconsumo_scraper_scrapy.progress.ProgressExtension": 500,
+}
+
+# Huellas de petición sobre la URL canónica (ver canonical.py): variantes con
+# sesión, parámetros de seguimiento o index.html cuentan como una sola página
+REQUEST_FINGERPRINTER_CLASS = "autoconsumo_scraper_scrapy.canonical.CanonicalRequestFingerprinter"
+URL_CANONICALIZATION = {
+    # Reglas comunes; ver canonical.DEFAULT_RULES
+    "default": {},
+    # Reglas por dominio (se aplican también a sus subdominios), p. ej.:
+    # "www.boe.es": {"allow_params": ["id"], "fold_case": True},
+    "domains": {},
+}
+
+# URLs vistas con memoria acotada (ver dupefilter.py)
+DUPEFILTER_CLASS = "autoconsumo_scraper_scrapy.dupefilter.BoundedDupeFilter"
+SEEN_SET_MEMORY_LIMIT = 200000
+# 'bloom' (probabilístico, tamaño fijo) o 'disk' (SQLite, exacto)
+SEEN_SET_OVERFLOW = "bloom"
+SEEN_SET_BLOOM_CAPACITY = 10000000
+SEEN_SET_BLOOM_ERROR_RATE = 0.001
+
+# Segundos entre guardados del estado de reanudación (JOBDIR)
+RESUME_STATE_INTERVAL = 30.0
+# Colas en disco de JOBDIR que siguen siendo legibles tras un cierre abrupto
+SCHEDULER_DISK_QUEUE = "autoconsumo_scraper_scrapy.resume.SyncedPickleLifoDiskQueue"
+SCHEDULER_START_DISK_QUEUE = "autoconsumo_scraper_scrapy.resume.SyncedPickleFifoDiskQueue"
+
+# Estado de la ejecución (statuschannel.py): run_scraper.py apunta STATUS_FILE
+# a <ejecución>/status.json; PROGRESS_INTERVAL son los segundos entre lecturas
+# de los contadores (las escrituras se agrupan igualmente)
+STATUS_FILE = None
+PROGRESS_INTERVAL = 1.0
 
 # Configure item pipelines
 # See https://docs.scrapy.org/en/latest/topics/item-pipeline.html
@@ -63,6 +109,64 @@ ITEM_PIPELINES = {
     "autoconsumo_scraper_scrapy.pipelines.FilteredFilesPipeline": 1
 }
 
+# Almacén de documentos compartido entre ejecuciones (blobstore.py).
+# run_scraper.py lo apunta a blob_store/ y BLOB_MANIFEST_FILE al blobs.jsonl
+# de la ejecución; sin BLOB_STORE_DIR los ficheros se escriben tal cual.
+BLOB_STORE_DIR = None
+BLOB_MANIFEST_FILE = None
+
+# Páginas guardadas: 'files' (un .txt y un .html por página) o 'segments'
+# (segmentos gzip con índice, ver pagestore.py). run_scraper.py lo fija según
+# page_storage.
+PAGE_STORAGE = 'files'
+PAGE_SEGMENT_MAX_BYTES = 64 * 1024 * 1024
+
+# Grabación y reproducción WARC (warc.py). run_scraper.py fija WARC_OUTPUT_DIR
+# a <ejecución>/warc con warc_output, y con warc_replay apunta WARC_REPLAY_DIR
+# a la carpeta warc de otra ejecución y sustituye los DOWNLOAD_HANDLERS http/https.
+WARC_OUTPUT_DIR = None
+WARC_REPLAY_DIR = None
+WARC_MAX_FILE_BYTES = 1024 * 1024 * 1024
+
+# Índice de búsqueda FTS5 común a todas las ejecuciones (searchindex.py).
+# run_scraper.py lo apunta a search_index.sqlite3 y SEARCH_EXECUTION_ID al
+# nombre de la ejecución; sin SEARCH_INDEX_FILE no se indexa.
+SEARCH_INDEX_FILE = None
+SEARCH_EXECUTION_ID = None
+
+# Ejecución repartida por dominios entre varios procesos (sharding.py).
+# run_scraper.py fija SHARD_ID en cada proceso; con él los segmentos de
+# páginas y los ficheros WARC llevan el número de proceso en el nombre.
+SHARD_ID = None
+
+# Frontera compartida entre nodos (sharedfrontier.py, scheduler.py). Con la
+# opción frontier, run_scraper.py fija SCHEDULER a SharedFrontierScheduler,
+# FRONTIER_URL a la frontera (sqlite:///ruta o redis://...) y
+# FRONTIER_NAMESPACE a frontier_namespace (por defecto, el nombre de la ejecución).
+FRONTIER_URL = None
+FRONTIER_NAMESPACE = None
+# Segundos de préstamo de una petición; caducado, otro nodo la retoma
+FRONTIER_LEASE_SECONDS = 120.0
+# Préstamos de una petición antes de descartarla (0 = sin límite)
+FRONTIER_MAX_ATTEMPTS = 3
+# Peticiones tomadas en cada préstamo
+FRONTIER_LEASE_BATCH = 4
+
+# Ritmo adaptativo por dominio (throttle.py). run_scraper.py lo activa con
+# throttle_mode = 'adaptive'; parte de CONCURRENT_REQUESTS_PER_DOMAIN y
+# DOWNLOAD_DELAY y se mueve dentro de estos límites.
+ADAPTIVE_THROTTLE_ENABLED = False
+ADAPTIVE_THROTTLE_MIN_CONCURRENCY = 1
+ADAPTIVE_THROTTLE_MAX_CONCURRENCY = 4
+ADAPTIVE_THROTTLE_MIN_DELAY = 0.25
+ADAPTIVE_THROTTLE_MAX_DELAY = 60.0
+# Latencia (s) a partir de la cual se frena
+ADAPTIVE_THROTTLE_TARGET_LATENCY = 2.0
+# Fracción de errores (excepciones y 5xx) a partir de la cual se frena
+ADAPTIVE_THROTTLE_ERROR_RATE = 0.2
+# Respuestas por dominio entre ajustes
+ADAPTIVE_THROTTLE_WINDOW = 10
+
 # Enable and configure the AutoThrottle extension (disabled by default)
 # See https://docs.scrapy.org/en/latest/topics/autothrottle.html
 #AUTOTHROTTLE_ENABLED = True
@@ -78,11 +182,16 @@ ITEM_PIPELINES = {
 
 # Enable and configure HTTP caching (disabled by default)
 # See https://docs.scrapy.org/en/latest/topics/downloader-middleware.html#httpcache-middleware-settings
-#HTTPCACHE_ENABLED = True
-#HTTPCACHE_EXPIRATION_SECS = 0
-#HTTPCACHE_DIR = "httpcache"
-#HTTPCACHE_IGNORE_HTTP_CODES = []
-#HTTPCACHE_STORAGE = "scrapy.extensions.httpcache.FilesystemCacheStorage"
+# run_scraper.py la activa según la configuración (http_cache) y apunta
+# HTTPCACHE_DIR a http_cache/, compartido por todas las ejecuciones.
+HTTPCACHE_ENABLED = False
+HTTPCACHE_EXPIRATION_SECS = 0
+HTTPCACHE_DIR = "httpcache"
+HTTPCACHE_IGNORE_HTTP_CODES = []
+HTTPCACHE_POLICY = "autoconsumo_scraper_scrapy.httpcache.RevalidatingCachePolicy"
+HTTPCACHE_STORAGE = "autoconsumo_scraper_scrapy.httpcache.SharedCacheStorage"
+# Tamaño máximo de la caché; al superarlo se eliminan las entradas menos usadas
+HTTPCACHE_MAX_SIZE_MB = 2048
 
 # Set settings whose default value is deprecated to a future-proof value
 FEED_EXPORT_ENCODING = "utf-8"
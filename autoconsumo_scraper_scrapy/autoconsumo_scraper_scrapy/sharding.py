@@ -0,0 +1,193 @@
+"""
+Ejecución repartida por dominios entre varios procesos (`shards`).
+
+Un solo CrawlerProcess usa un núcleo: con decenas de dominios, el análisis
+del HTML, la normalización del texto y la búsqueda de términos limitan el
+ritmo. Con `shards` > 1, run_scraper.py reparte las fuentes de fuentes.csv por
+dominio (todas las de un dominio en el mismo proceso, así los límites por
+dominio siguen valiendo) y lanza un run_scraper.py por grupo, cada uno con su
+reactor.
+
+La ejecución sigue siendo una sola carpeta: los procesos comparten la carpeta
+de documentos (los nombres llevan el hash de la URL), el manifiesto del
+almacén de documentos y la carpeta WARC (ficheros con el número de proceso),
+y guardan en `shards/NN/` lo que es sólo suyo: scraper.log, activity.log,
+status.json, jobdir y `shard_result.json` (estadísticas al terminar). El
+proceso coordinador vuelca en el activity.log de la ejecución las líneas
+nuevas de cada proceso, suma sus estados en status.json y, al terminar todos,
+genera un único procesados.md con las estadísticas sumadas.
+
+Sin dependencias de Scrapy.
+"""
+
+import heapq
+import json
+import os
+from urllib.parse import urlparse
+
+SHARDS_DIRNAME = 'shards'
+SHARD_RESULT_NAME = 'shard_result.json'
+# Reparto guardado en jobdir/ para reanudar con los mismos grupos
+ASSIGNMENT_NAME = 'shards.json'
+
+# Estadísticas que se combinan con el máximo en lugar de sumarse
+MAX_STATS = ('memusage/max', 'memusage/startup', 'elapsed_time_seconds')
+
+
+def source_domain(url):
+    host = (urlparse(url).hostname or '').lower()
+    return host[4:] if host.startswith('www.') else host
+
+
+def assign_shards(urls, shard_count):
+    """
+    Índices de `urls` de cada proceso. Los dominios se asignan de mayor a menor
+    número de fuentes al proceso con menos fuentes; dentro de cada proceso se
+    conserva el orden de fuentes.csv. Nunca hay más procesos que dominios.
+    """
+    by_domain = {}
+    for index, url in enumerate(urls):
+        by_domain.setdefault(source_domain(url), []).append(index)
+    shard_count = max(1, min(int(shard_count), len(by_domain)))
+    shards = [[] for _ in range(shard_count)]
+    heap = [(0, shard_id) for shard_id in range(shard_count)]
+    for domain, indices in sorted(by_domain.items(), key=lambda item: (-len(item[1]), item[0])):
+        load, shard_id = heapq.heappop(heap)
+        shards[shard_id].extend(indices)
+        heapq.heappush(heap, (load + len(indices), shard_id))
+    return [sorted(indices) for indices in shards]
+
+
+def shard_dir(execution_dir, shard_id):
+    return os.path.join(execution_dir, SHARDS_DIRNAME, f'{shard_id:02d}')
+
+
+def save_assignment(job_dir, shards):
+    os.makedirs(job_dir, exist_ok=True)
+    with open(os.path.join(job_dir, ASSIGNMENT_NAME), 'w', encoding='utf-8') as f:
+        json.dump(shards, f)
+
+
+def load_assignment(job_dir):
+    try:
+        with open(os.path.join(job_dir, ASSIGNMENT_NAME), 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+class LogTail:
+    """Líneas completas añadidas a un fichero desde la última lectura."""
+
+    def __init__(self, path, offset=0):
+        self.path = path
+        self.offset = offset
+
+    @classmethod
+    def from_end(cls, path):
+        try:
+            return cls(path, os.path.getsize(path))
+        except OSError:
+            return cls(path)
+
+    def read_lines(self):
+        try:
+            with open(self.path, 'rb') as f:
+                f.seek(self.offset)
+                data = f.read()
+        except OSError:
+            return []
+        end = data.rfind(b'\n') + 1
+        if not end:
+            return []
+        self.offset += end
+        return data[:end].decode('utf-8', errors='replace').splitlines(keepends=True)
+
+
+def merge_log_lines(batches):
+    """Mezcla por hora ("HH:MM:SS · ...") las líneas nuevas de varios activity.log."""
+    return list(heapq.merge(*batches, key=lambda line: line[:8]))
+
+
+class MergedStats:
+    """Estadísticas de Scrapy sumadas de todos los procesos (interfaz de StatsCollector que usa run_scraper.py)."""
+
+    def __init__(self, results):
+        self._stats = {}
+        reasons = []
+        for result in results:
+            reasons.append(result.get('finish_reason'))
+            for key, value in (result.get('stats') or {}).items():
+                if not isinstance(value, (int, float)) or isinstance(value, bool):
+                    continue
+                if key in MAX_STATS:
+                    self._stats[key] = max(self._stats.get(key, value), value)
+                else:
+                    self._stats[key] = self._stats.get(key, 0) + value
+        # Basta un proceso detenido (pausa o cancelación) para que la ejecución lo esté
+        if 'shutdown' in reasons:
+            self._stats['finish_reason'] = 'shutdown'
+        elif reasons:
+            self._stats['finish_reason'] = next((reason for reason in reasons if reason != 'finished'), 'finished')
+
+    def get_stats(self):
+        return self._stats
+
+    def get_value(self, key, default=None):
+        return self._stats.get(key, default)
+
+
+def merge_near_duplicates(results):
+    """Grupos de casi duplicados de todos los procesos (None si ninguno los detectaba)."""
+    merged = None
+    for result in results:
+        clusters = result.get('near_duplicates')
+        if clusters is None:
+            continue
+        merged = merged or {}
+        for original, variants in clusters.items():
+            merged.setdefault(original, []).extend(variants)
+    return merged
+
+
+def write_shard_result(directory, stats, near_duplicates):
+    values = stats.get_stats() if stats is not None else {}
+    result = {
+        'finish_reason': values.get('finish_reason'),
+        'stats': {key: value for key, value in values.items()
+                  if isinstance(value, (int, float)) and not isinstance(value, bool)},
+        'near_duplicates': near_duplicates,
+    }
+    with open(os.path.join(directory, SHARD_RESULT_NAME), 'w', encoding='utf-8') as f:
+        json.dump(result, f, ensure_ascii=False)
+
+
+def read_shard_result(directory):
+    try:
+        with open(os.path.join(directory, SHARD_RESULT_NAME), 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def combine_status(statuses, total):
+    """
+    Estado de la ejecución a partir del de cada proceso (`statuses`, del
+    actualizado hace más tiempo al más reciente): avance y contadores sumados,
+    URL actual del último que ha avanzado.
+    """
+    current = sum(status.get('current', 0) or 0 for status in statuses)
+    counters = {}
+    for status in statuses:
+        for key, value in (status.get('counters') or {}).items():
+            counters[key] = counters.get(key, 0) + value
+    active = [status for status in statuses if status.get('current_url')]
+    latest = active[-1] if active else {}
+    return {
+        'current': min(current, total),
+        'total': total,
+        'current_url': latest.get('current_url'),
+        'current_description': latest.get('current_description'),
+        'current_index': latest.get('current_index', 0),
+        'counters': counters,
+    }
@@ -0,0 +1,447 @@
+"""
+Frontera de rastreo compartida entre varios nodos (cola de peticiones y URLs
+vistas fuera del proceso).
+
+Con `frontier` en la configuración, varios run_scraper.py (en la misma
+máquina o en otras) colaboran en una misma ejecución: el scheduler
+(scheduler.py) guarda las peticiones en la frontera compartida y cada nodo
+toma unas pocas en préstamo (*lease*) durante FRONTIER_LEASE_SECONDS. Un
+nodo vivo renueva el préstamo de las que aún procesa y las confirma al
+terminar; si muere, el préstamo caduca y otro nodo las vuelve a la cola.
+
+La frontera sólo usa comandos de Redis (SADD/SCARD, INCR,
+HSET/HGET/HMGET/HDEL/HINCRBY, ZADD/ZRANGEBYSCORE/ZREM/ZCARD, DEL) y
+dos scripts Lua que pasan peticiones de un zset a otro en un solo paso (de la
+cola al préstamo y de vuelta), para que un nodo que muere entre dos comandos
+no pierda ninguna; así que funciona igual con:
+
+- `SqliteRedis` (`sqlite:///ruta/frontera.sqlite3` o una ruta): esos
+  comandos, y los dos scripts como métodos, sobre un fichero SQLite en modo WAL, para varios procesos de una
+  máquina o para probar en local. No conviene en carpetas de red: el bloqueo
+  de SQLite no es fiable en NFS/SMB.
+- Redis (`redis://host:6379/0`), con el paquete `redis` instalado.
+
+Claves de un espacio de nombres `<ns>` (uno por ejecución compartida):
+
+- `<ns>:seq` contador de identificadores de petición
+- `<ns>:requests` hash id → (prioridad, petición serializada)
+- `<ns>:pending` zset id → prioridad (ZPOPMAX da la de mayor prioridad)
+- `<ns>:leases` zset id → fin del préstamo (segundos Unix)
+- `<ns>:attempts` hash id → veces prestada
+- `<ns>:seen` set de huellas de petición ya encoladas
+
+Los plazos usan la hora del sistema de cada nodo: los relojes deben estar
+sincronizados con un margen muy inferior a FRONTIER_LEASE_SECONDS.
+
+Sin dependencias de Scrapy. Para ver o vaciar una frontera, desde
+autoconsumo_scraper_scrapy/::
+
+    python -m autoconsumo_scraper_scrapy.sharedfrontier <url> <espacio> status
+    python -m autoconsumo_scraper_scrapy.sharedfrontier <url> <espacio> reset
+"""
+
+import argparse
+import os
+import pickle
+import sqlite3
+import sys
+import time
+
+FRONTIER_LEASE_SECONDS = 120.0
+FRONTIER_MAX_ATTEMPTS = 3
+# Préstamos caducados devueltos a la cola en cada pasada
+RECLAIM_BATCH = 100
+
+# ZPOPMAX de KEYS[1] y ZADD en KEYS[2] con puntuación ARGV[2] (SqliteRedis.zpopmove)
+LEASE_SCRIPT = """
+local popped = redis.call('ZPOPMAX', KEYS[1], ARGV[1])
+local members = {}
+for i = 1, #popped, 2 do
+    redis.call('ZADD', KEYS[2], ARGV[2], popped[i])
+    members[#members + 1] = popped[i]
+end
+return members
+"""
+# Si ARGV[1] estaba en KEYS[1], pasa a KEYS[2] con puntuación ARGV[2] (SqliteRedis.zmove)
+MOVE_SCRIPT = """
+if redis.call('ZREM', KEYS[1], ARGV[1]) == 1 then
+    redis.call('ZADD', KEYS[2], ARGV[2], ARGV[1])
+    return 1
+end
+return 0
+"""
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS kv (key TEXT PRIMARY KEY, value BLOB) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS sets (key TEXT, member BLOB, PRIMARY KEY (key, member)) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS hashes (key TEXT, field BLOB, value BLOB, PRIMARY KEY (key, field)) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS zsets (key TEXT, member BLOB, score REAL, PRIMARY KEY (key, member)) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS zsets_score ON zsets (key, score, member);
+"""
+
+
+def _bytes(value):
+    if isinstance(value, bytes):
+        return value
+    if isinstance(value, str):
+        return value.encode('utf-8')
+    return str(value).encode('utf-8')
+
+
+def _score(value):
+    if value in ('-inf', b'-inf'):
+        return float('-inf')
+    if value in ('+inf', 'inf', b'+inf', b'inf'):
+        return float('inf')
+    return float(value)
+
+
+class SqliteRedis:
+    """
+    Los comandos de redis-py que usa `SharedFrontier`, con la misma firma y
+    los mismos tipos de retorno (miembros y valores en bytes), sobre SQLite.
+    Cada comando es atómico; varios procesos pueden usar el mismo fichero.
+    """
+
+    def __init__(self, path, timeout=30.0):
+        self.path = path
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        self.conn = sqlite3.connect(path, timeout=timeout, isolation_level=None)
+        self.conn.execute('PRAGMA journal_mode=WAL')
+        self.conn.execute('PRAGMA synchronous=NORMAL')
+        self.conn.executescript(_SCHEMA)
+
+    def _write(self, operation):
+        """Ejecuta `operation(conn)` en una transacción de escritura."""
+        self.conn.execute('BEGIN IMMEDIATE')
+        try:
+            result = operation(self.conn)
+        except BaseException:
+            self.conn.execute('ROLLBACK')
+            raise
+        self.conn.execute('COMMIT')
+        return result
+
+    # -- cadenas --
+
+    def incr(self, key, amount=1):
+        def operation(conn):
+            row = conn.execute('SELECT value FROM kv WHERE key = ?', (key,)).fetchone()
+            value = int(row[0]) + amount if row else amount
+            conn.execute('INSERT OR REPLACE INTO kv (key, value) VALUES (?, ?)', (key, str(value).encode()))
+            return value
+        return self._write(operation)
+
+    def get(self, key):
+        row = self.conn.execute('SELECT value FROM kv WHERE key = ?', (key,)).fetchone()
+        return bytes(row[0]) if row else None
+
+    def set(self, key, value, nx=False):
+        sql = 'INSERT OR IGNORE' if nx else 'INSERT OR REPLACE'
+        cursor = self.conn.execute(f'{sql} INTO kv (key, value) VALUES (?, ?)', (key, _bytes(value)))
+        return True if cursor.rowcount else None
+
+    # -- conjuntos --
+
+    def sadd(self, key, *members):
+        def operation(conn):
+            added = 0
+            for member in members:
+                added += conn.execute('INSERT OR IGNORE INTO sets (key, member) VALUES (?, ?)',
+                                      (key, _bytes(member))).rowcount
+            return added
+        return self._write(operation)
+
+    def sismember(self, key, member):
+        return self.conn.execute('SELECT 1 FROM sets WHERE key = ? AND member = ?',
+                                 (key, _bytes(member))).fetchone() is not None
+
+    def scard(self, key):
+        return self.conn.execute('SELECT COUNT(*) FROM sets WHERE key = ?', (key,)).fetchone()[0]
+
+    # -- hashes --
+
+    def hset(self, key, field=None, value=None, mapping=None):
+        items = dict(mapping or {})
+        if field is not None:
+            items[field] = value
+
+        def operation(conn):
+            added = 0
+            for item_field, item_value in items.items():
+                exists = conn.execute('SELECT 1 FROM hashes WHERE key = ? AND field = ?',
+                                      (key, _bytes(item_field))).fetchone()
+                conn.execute('INSERT OR REPLACE INTO hashes (key, field, value) VALUES (?, ?, ?)',
+                             (key, _bytes(item_field), _bytes(item_value)))
+                added += 0 if exists else 1
+            return added
+        return self._write(operation)
+
+    def hget(self, key, field):
+        row = self.conn.execute('SELECT value FROM hashes WHERE key = ? AND field = ?',
+                                (key, _bytes(field))).fetchone()
+        return bytes(row[0]) if row else None
+
+    def hmget(self, key, keys):
+        return [self.hget(key, field) for field in keys]
+
+    def hdel(self, key, *fields):
+        def operation(conn):
+            return sum(conn.execute('DELETE FROM hashes WHERE key = ? AND field = ?',
+                                    (key, _bytes(field))).rowcount for field in fields)
+        return self._write(operation)
+
+    def hincrby(self, key, field, amount=1):
+        def operation(conn):
+            row = conn.execute('SELECT value FROM hashes WHERE key = ? AND field = ?',
+                               (key, _bytes(field))).fetchone()
+            value = int(row[0]) + amount if row else amount
+            conn.execute('INSERT OR REPLACE INTO hashes (key, field, value) VALUES (?, ?, ?)',
+                         (key, _bytes(field), str(value).encode()))
+            return value
+        return self._write(operation)
+
+    def hlen(self, key):
+        return self.conn.execute('SELECT COUNT(*) FROM hashes WHERE key = ?', (key,)).fetchone()[0]
+
+    # -- conjuntos ordenados --
+
+    def zadd(self, key, mapping, nx=False, xx=False):
+        def operation(conn):
+            added = 0
+            for member, score in mapping.items():
+                member = _bytes(member)
+                exists = conn.execute('SELECT 1 FROM zsets WHERE key = ? AND member = ?',
+                                      (key, member)).fetchone()
+                if (exists and nx) or (not exists and xx):
+                    continue
+                conn.execute('INSERT OR REPLACE INTO zsets (key, member, score) VALUES (?, ?, ?)',
+                             (key, member, float(score)))
+                added += 0 if exists else 1
+            return added
+        return self._write(operation)
+
+    def zrangebyscore(self, key, min, max, start=None, num=None):
+        sql = 'SELECT member FROM zsets WHERE key = ? AND score >= ? AND score <= ? ORDER BY score, member'
+        params = [key, _score(min), _score(max)]
+        if start is not None and num is not None:
+            sql += ' LIMIT ? OFFSET ?'
+            params += [num, start]
+        return [bytes(row[0]) for row in self.conn.execute(sql, params)]
+
+    def zrem(self, key, *members):
+        def operation(conn):
+            return sum(conn.execute('DELETE FROM zsets WHERE key = ? AND member = ?',
+                                    (key, _bytes(member))).rowcount for member in members)
+        return self._write(operation)
+
+    def zcard(self, key):
+        return self.conn.execute('SELECT COUNT(*) FROM zsets WHERE key = ?', (key,)).fetchone()[0]
+
+    # -- LEASE_SCRIPT y MOVE_SCRIPT --
+
+    def zpopmove(self, src, dst, count, score):
+        """Los `count` miembros de mayor puntuación de `src` pasan a `dst` con `score`."""
+        def operation(conn):
+            rows = conn.execute(
+                'SELECT member FROM zsets WHERE key = ? ORDER BY score DESC, member DESC LIMIT ?',
+                (src, count)
+            ).fetchall()
+            for (member,) in rows:
+                conn.execute('DELETE FROM zsets WHERE key = ? AND member = ?', (src, member))
+                conn.execute('INSERT OR REPLACE INTO zsets (key, member, score) VALUES (?, ?, ?)',
+                             (dst, member, float(score)))
+            return [bytes(member) for (member,) in rows]
+        return self._write(operation)
+
+    def zmove(self, src, dst, member, score):
+        """Si `member` estaba en `src`, pasa a `dst` con `score`; 1 si se ha movido."""
+        def operation(conn):
+            member_bytes = _bytes(member)
+            if not conn.execute('DELETE FROM zsets WHERE key = ? AND member = ?', (src, member_bytes)).rowcount:
+                return 0
+            conn.execute('INSERT OR REPLACE INTO zsets (key, member, score) VALUES (?, ?, ?)',
+                         (dst, member_bytes, float(score)))
+            return 1
+        return self._write(operation)
+
+    # -- claves --
+
+    def delete(self, *keys):
+        def operation(conn):
+            removed = 0
+            for key in keys:
+                found = 0
+                for table in ('kv', 'sets', 'hashes', 'zsets'):
+                    found += conn.execute(f'DELETE FROM {table} WHERE key = ?', (key,)).rowcount
+                removed += 1 if found else 0
+            return removed
+        return self._write(operation)
+
+    def close(self):
+        self.conn.close()
+
+
+def open_backend(url):
+    """Cliente de la frontera: Redis para `redis://`/`rediss://`; si no, SqliteRedis."""
+    if url.startswith(('redis://', 'rediss://', 'unix://')):
+        try:
+            import redis
+        except ImportError as exc:
+            raise RuntimeError(f"Para usar {url} como frontera hace falta el paquete 'redis' (pip install redis)") from exc
+        return redis.Redis.from_url(url)
+    if url.startswith('sqlite:///'):
+        url = url[len('sqlite:///'):]
+        # sqlite:////ruta/absoluta, igual que en las URLs de SQLAlchemy
+        if not url.startswith('/') and os.name != 'nt':
+            url = os.path.join(os.getcwd(), url)
+    return SqliteRedis(url)
+
+
+class SharedFrontier:
+    """Cola de peticiones con préstamos y conjunto de vistas de un espacio de nombres."""
+
+    def __init__(self, backend, namespace, lease_seconds=FRONTIER_LEASE_SECONDS,
+                 max_attempts=FRONTIER_MAX_ATTEMPTS):
+        self.backend = backend
+        self.namespace = namespace
+        self.lease_seconds = float(lease_seconds)
+        self.max_attempts = int(max_attempts)
+        if isinstance(backend, SqliteRedis):
+            self._zpopmove = backend.zpopmove
+            self._zmove = backend.zmove
+        else:
+            lease_script = backend.register_script(LEASE_SCRIPT)
+            move_script = backend.register_script(MOVE_SCRIPT)
+            self._zpopmove = lambda src, dst, count, score: lease_script(keys=[src, dst], args=[count, score])
+            self._zmove = lambda src, dst, member, score: move_script(keys=[src, dst], args=[member, score])
+
+    def key(self, name):
+        return f'{self.namespace}:{name}'
+
+    def add_seen(self, member):
+        """Registra `member` (bytes o str); True si no se había visto."""
+        return bool(self.backend.sadd(self.key('seen'), member))
+
+    def push(self, payload, priority=0):
+        """Encola `payload` (bytes) y devuelve su identificador."""
+        request_id = f"{self.backend.incr(self.key('seq')):012d}".encode()
+        # Primero el contenido: ningún nodo saca de la cola un id sin petición
+        self.backend.hset(self.key('requests'), request_id, pickle.dumps((priority, payload), protocol=4))
+        self.backend.zadd(self.key('pending'), {request_id: priority})
+        return request_id
+
+    def lease(self, count=1):
+        """
+        Toma hasta `count` peticiones de la cola (mayor prioridad primero; a
+        igual prioridad, la más reciente, como la cola LIFO de Scrapy).
+        Devuelve [(id, payload)] y el número de peticiones abandonadas por
+        superar FRONTIER_MAX_ATTEMPTS.
+        """
+        # De la cola al préstamo en un paso: si el nodo muere, el préstamo caduca
+        ids = [_bytes(member) for member in self._zpopmove(
+            self.key('pending'), self.key('leases'), count, time.time() + self.lease_seconds
+        )]
+        if not ids:
+            return [], 0
+        leased = []
+        abandoned = []
+        for request_id, stored in zip(ids, self.backend.hmget(self.key('requests'), ids)):
+            if stored is None:
+                # Confirmada por otro nodo entre ZPOPMAX y HMGET
+                self.backend.zrem(self.key('leases'), request_id)
+                continue
+            attempts = self.backend.hincrby(self.key('attempts'), request_id, 1)
+            if self.max_attempts and attempts > self.max_attempts:
+                abandoned.append(request_id)
+                continue
+            leased.append((request_id, pickle.loads(stored)[1]))
+        if abandoned:
+            self.ack(abandoned)
+        return leased, len(abandoned)
+
+    def renew(self, ids):
+        """Prolonga los préstamos de `ids` que sigan siendo de este nodo."""
+        if ids:
+            expires = time.time() + self.lease_seconds
+            self.backend.zadd(self.key('leases'), {request_id: expires for request_id in ids}, xx=True)
+
+    def ack(self, ids):
+        """Da por procesadas las peticiones `ids`."""
+        if ids:
+            self.backend.zrem(self.key('leases'), *ids)
+            self.backend.hdel(self.key('requests'), *ids)
+            self.backend.hdel(self.key('attempts'), *ids)
+
+    def release(self, ids):
+        """Devuelve a la cola peticiones prestadas sin procesar (parada ordenada)."""
+        return self._requeue(ids)
+
+    def decline(self, ids):
+        """
+        Devuelve a la cola peticiones que este nodo no puede procesar
+        (presupuesto agotado) sin contar el préstamo en FRONTIER_MAX_ATTEMPTS.
+        """
+        for request_id in ids:
+            self.backend.hincrby(self.key('attempts'), request_id, -1)
+        return self._requeue(ids)
+
+    def reclaim_expired(self, now=None):
+        """Devuelve a la cola los préstamos caducados (de nodos caídos); devuelve cuántos."""
+        now = time.time() if now is None else now
+        expired = self.backend.zrangebyscore(self.key('leases'), '-inf', now, start=0, num=RECLAIM_BATCH)
+        return self._requeue(expired)
+
+    def _requeue(self, ids):
+        requeued = 0
+        for request_id in ids:
+            stored = self.backend.hget(self.key('requests'), request_id)
+            if stored is None:
+                # Ya confirmada: sólo queda quitar el préstamo
+                self.backend.zrem(self.key('leases'), request_id)
+                continue
+            # Sólo el nodo que lo saca del préstamo lo vuelve a encolar
+            requeued += self._zmove(self.key('leases'), self.key('pending'), request_id, pickle.loads(stored)[0])
+        return requeued
+
+    def pending_count(self):
+        return self.backend.zcard(self.key('pending'))
+
+    def leased_count(self):
+        return self.backend.zcard(self.key('leases'))
+
+    def seen_count(self):
+        return self.backend.scard(self.key('seen'))
+
+    def reset(self):
+        self.backend.delete(*(self.key(name) for name in ('seq', 'requests', 'pending', 'leases', 'attempts', 'seen')))
+
+    def close(self):
+        close = getattr(self.backend, 'close', None)
+        if callable(close):
+            close()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Frontera de rastreo compartida')
+    parser.add_argument('url', help='sqlite:///ruta, ruta a un fichero SQLite o redis://host:puerto/db')
+    parser.add_argument('namespace', help='Espacio de nombres (frontier_namespace de la ejecución)')
+    parser.add_argument('command', choices=('status', 'reset'))
+    args = parser.parse_args(argv)
+
+    frontier = SharedFrontier(open_backend(args.url), args.namespace)
+    try:
+        if args.command == 'reset':
+            frontier.reset()
+            print(f"Frontera {args.namespace} vaciada")
+        else:
+            print(f"En cola: {frontier.pending_count()} · prestadas: {frontier.leased_count()} · "
+                  f"vistas: {frontier.seen_count()}")
+    finally:
+        frontier.close()
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -1,18 +1,27 @@
 import scrapy
 import os
-import unicodedata
+import time
 from datetime import datetime, timezone, timedelta
 from email.utils import parsedate_to_datetime
 from urllib.parse import urljoin, urlparse
 from autoconsumo_scraper_scrapy.items import AutoconsumoScraperScrapyItem
-from autoconsumo_scraper_scrapy.activity_log import write_activity
-
-def normalize_text(text: str) -> str:
-    text_norm = unicodedata.normalize('NFD', text)
-    stripped = ''.join(
-        c for c in text_norm if unicodedata.category(c) != 'Mn'
-    )
-    return stripped.lower()
+from autoconsumo_scraper_scrapy.activity_log import flush_activity, write_activity
+from autoconsumo_scraper_scrapy.matcher import TermMatcher
+from autoconsumo_scraper_scrapy.extraction import extract_page
+from autoconsumo_scraper_scrapy.textnorm import normalize_text, normalize_term
+from autoconsumo_scraper_scrapy.headerfilter import REJECT_DATE, REJECT_CONTENT_TYPE, DIRECT_FILE
+from autoconsumo_scraper_scrapy.frontier import LinkScorer
+from autoconsumo_scraper_scrapy.budget import format_size
+from autoconsumo_scraper_scrapy.neardup import NearDuplicateDetector
+from autoconsumo_scraper_scrapy.sitemaps import (
+    default_sitemap_url, parse_lastmod, parse_sitemap, robots_url, sitemap_body, sitemaps_from_robots,
+)
+
+# Tipos MIME que se analizan como página aunque no sean HTML
+TEXTUAL_MIME_MARKERS = ('html', 'xml', 'json')
+
+# Niveles de índices de sitemap anidados que se siguen como máximo
+SITEMAP_MAX_NESTING = 3
 
 class GenericSpider(scrapy.Spider):
     name = "generic_spider"
@@ -20,9 +29,9 @@ class GenericSpider(scrapy.Spider):
     handle_httpstatus_list = [301, 302, 400, 401, 403, 404, 500]
 
     def __init__(self, start_urls, keywords_map=None, exclusions_map=None, max_depth=3,
-                 crawl_strategy='continue', file_types=None, download_scope='same-domain',
+                 crawl_strategy='continue', seed_mode='links', file_types=None, download_scope='same-domain',
                  path_restriction='base-path', save_page_text=True, save_html=True,
-                 start_date=None, end_date=None,
+                 start_date=None, end_date=None, max_pages=0, near_duplicate_distance=None,
                  status_updater=None, activity_log_path=None, source_lookup=None,
                  *args, **kwargs):
         super(GenericSpider, self).__init__(*args, **kwargs)
@@ -30,9 +39,24 @@ class GenericSpider(scrapy.Spider):
         self.keywords_map = keywords_map or {}
         self.exclusions_map = exclusions_map or {}
         self.max_depth = int(max_depth)
+        # Autómata único para términos y exclusiones (una pasada por texto)
+        self.term_matcher = TermMatcher(self.keywords_map, self.exclusions_map)
 
         # Configuraciones avanzadas
-        self.crawl_strategy = crawl_strategy  # 'continue' or 'stop'
+        self.crawl_strategy = crawl_strategy  # 'continue', 'stop' or 'best-first'
+        self.seed_mode = seed_mode  # 'links' or 'sitemap'
+        # Presupuesto de páginas analizadas (0 = sin límite)
+        self.max_pages = int(max_pages or 0)
+        self._counters = {'pages': 0, 'sources': {}}
+        self._budget_logged = False
+        self._source_budget_logged = set()
+        # Referencia (time.monotonic) desde la que se cuenta el tiempo de cada
+        # fuente en esta sesión; lo anterior se acumula en counters['seconds']
+        self._source_clocks = {}
+        # Páginas casi duplicadas (None = desactivado)
+        self.near_duplicates = (
+            NearDuplicateDetector(near_duplicate_distance) if near_duplicate_distance is not None else None
+        )
         self.file_types = file_types or ['documents']
         self.download_scope = download_scope  # 'same-domain' or 'any-domain'
         self.path_restriction = path_restriction  # 'base-path' or 'same-domain'
@@ -41,11 +65,21 @@ class GenericSpider(scrapy.Spider):
         self.status_updater = status_updater
         self.activity_log_path = activity_log_path
         self._processed_roots = set()
+        # Reanudación tras un cierre abrupto (ver resume.py)
+        self._interrupted = False
         self.filter_start_raw = start_date
         self.filter_end_raw = end_date
         self.filter_start_date = self._parse_user_datetime(start_date, is_end=False)
         self.filter_end_date = self._parse_user_datetime(end_date, is_end=True)
         self.source_lookup = source_lookup or {}
+        # Límites por fuente (columnas adicionales de fuentes.csv), por root_url
+        self.source_limits = {
+            url: info['limits'] for url, info in self.source_lookup.items() if info.get('limits')
+        }
+        uses_best_first = crawl_strategy == 'best-first' or any(
+            limits.get('crawl_strategy') == 'best-first' for limits in self.source_limits.values()
+        )
+        self.link_scorer = LinkScorer(self.term_matcher) if uses_best_first else None
 
         # Extraer dominios únicos de las start_urls
         self.allowed_domains = list(set([urlparse(url).netloc for url in start_urls if url]))
@@ -69,27 +103,288 @@ class GenericSpider(scrapy.Spider):
 
         self.logger.info(f"Allowed domains: {self.allowed_domains}")
         self.logger.info(f"Crawl strategy: {self.crawl_strategy}")
+        self.logger.info(f"Seed mode: {self.seed_mode}")
+        for url, limits in self.source_limits.items():
+            self.logger.info(f"Source limits for {url}: {limits}")
         self.logger.info(f"File types: {self.file_types}")
         self.logger.info(f"Download scope: {self.download_scope}")
         self.logger.info(f"Path restriction: {self.path_restriction}")
         self.logger.info(f"Recognized file extensions: {self.recognized_exts}")
 
+    def _root_meta(self, url):
+        info = self.source_lookup.get(url, {})
+        index = info.get('index')
+        log_index = index + 1 if isinstance(index, int) else None
+        return {
+            'source_index': index,
+            'log_index': log_index,
+            'root_url': url
+        }
+
     def start_requests(self):
         for url in self.start_urls:
-            info = self.source_lookup.get(url, {})
-            index = info.get('index')
-            log_index = index + 1 if isinstance(index, int) else None
-            meta = {
-                'source_index': index,
-                'log_index': log_index,
-                'root_url': url
-            }
+            meta = self._root_meta(url)
             yield scrapy.Request(
                 url,
                 callback=self.parse,
                 cb_kwargs={'current_depth': 0},
-                meta=meta
+                meta=meta,
+                # Una raíz en curso al cortarse la sesión ya está en las vistas
+                # pero no en la cola: se vuelve a pedir
+                dont_filter=self._interrupted and url not in self._processed_roots
+            )
+            if self.seed_mode == 'sitemap':
+                # Cada fuente pide su robots.txt aunque compartan sitio: las
+                # semillas heredan la fuente (presupuestos, índice en el registro)
+                yield scrapy.Request(
+                    robots_url(url),
+                    callback=self.parse_robots,
+                    errback=self.sitemap_failed,
+                    meta=dict(meta),
+                    dont_filter=True
+                )
+
+    def _sitemap_request(self, url, meta, nesting=0):
+        return scrapy.Request(
+            url,
+            callback=self.parse_sitemap,
+            errback=self.sitemap_failed,
+            meta=dict(self._root_meta(meta['root_url']), sitemap_nesting=nesting),
+            dont_filter=True
+        )
+
+    def _in_sitemap_scope(self, root_url, url):
+        """Restricción de dominio y de ruta de la fuente aplicada a una URL del sitemap."""
+        target = urlparse(url)
+        if target.netloc not in self.allowed_domains:
+            return False
+        if self.path_restriction == 'base-path':
+            root = urlparse(root_url)
+            return target.netloc == root.netloc and target.path.startswith(os.path.dirname(root.path))
+        return True
+
+    def parse_robots(self, response):
+        root_url = response.meta['root_url']
+        sitemap_urls = [
+            url for url in sitemaps_from_robots(response)
+            if urlparse(url).netloc in self.allowed_domains
+        ]
+        if not sitemap_urls:
+            sitemap_urls = [default_sitemap_url(root_url)]
+            message = f"robots.txt sin sitemaps; se prueba {sitemap_urls[0]}"
+        else:
+            message = f"{len(sitemap_urls)} sitemaps declarados en {response.url}"
+        write_activity(
+            self.activity_log_path,
+            'Sitemap',
+            'INFO',
+            message,
+            url_index=response.meta.get('log_index')
+        )
+        for url in sitemap_urls:
+            yield self._sitemap_request(url, response.meta)
+
+    def parse_sitemap(self, response):
+        log_index = response.meta.get('log_index')
+        root_url = response.meta['root_url']
+        body = sitemap_body(response, self.settings.getint('DOWNLOAD_MAXSIZE')) if response.status == 200 else None
+        sitemap = parse_sitemap(body) if body else None
+        if sitemap is None:
+            write_activity(
+                self.activity_log_path,
+                'Sitemap',
+                'WARNING',
+                f"Sitemap no disponible o no válido (HTTP {response.status}): {response.url}",
+                url_index=log_index
             )
+            return
+
+        if sitemap.type == 'sitemapindex':
+            nesting = response.meta.get('sitemap_nesting', 0) + 1
+            if nesting > SITEMAP_MAX_NESTING:
+                self.logger.warning(f"Sitemap index nesting too deep, skipped: {response.url}")
+                return
+            followed = skipped = 0
+            for entry in sitemap:
+                # Un sitemap sin cambios desde la fecha inicial no contiene URLs nuevas
+                lastmod = parse_lastmod(entry.get('lastmod'))
+                if lastmod and self.filter_start_date and lastmod < self.filter_start_date:
+                    skipped += 1
+                    continue
+                if urlparse(entry['loc']).netloc not in self.allowed_domains:
+                    skipped += 1
+                    continue
+                followed += 1
+                yield self._sitemap_request(entry['loc'], response.meta, nesting)
+            write_activity(
+                self.activity_log_path,
+                'Sitemap',
+                'INFO',
+                f"Índice {response.url}: {followed} sitemaps a revisar, {skipped} omitidos",
+                url_index=log_index
+            )
+            return
+
+        seeded = out_of_scope = out_of_range = 0
+        for entry in sitemap:
+            url = entry['loc']
+            if not self._in_sitemap_scope(root_url, url):
+                out_of_scope += 1
+                continue
+            lastmod = parse_lastmod(entry.get('lastmod'))
+            if lastmod and not self._is_datetime_within_range(lastmod):
+                out_of_range += 1
+                continue
+            seeded += 1
+            yield scrapy.Request(
+                url,
+                callback=self.parse,
+                cb_kwargs={'current_depth': 0},
+                meta=dict(self._root_meta(root_url), sitemap_seed=True)
+            )
+        write_activity(
+            self.activity_log_path,
+            'Sitemap',
+            'INFO',
+            f"{response.url}: {seeded} URLs sembradas, {out_of_range} fuera del rango de fechas, "
+            f"{out_of_scope} fuera de la ruta",
+            url_index=log_index
+        )
+
+    def sitemap_failed(self, failure):
+        request = failure.request
+        write_activity(
+            self.activity_log_path,
+            'Sitemap',
+            'WARNING',
+            f"No se pudo descargar {request.url}: {failure.getErrorMessage()}",
+            url_index=request.meta.get('log_index')
+        )
+
+    def restore_state(self, state, interrupted=False):
+        """
+        Recupera el progreso guardado en JOBDIR al reanudar una ejecución.
+        `interrupted` indica que la sesión anterior no se cerró de forma ordenada.
+        """
+        self._interrupted = interrupted
+        processed_roots = state.setdefault('processed_roots', set())
+        processed_roots.update(self._processed_roots)
+        self._processed_roots = processed_roots
+        counters = state.setdefault('counters', {})
+        for key, value in self._counters.items():
+            counters.setdefault(key, value)
+        self._counters = counters
+        # El tiempo en pausa no cuenta: las fuentes empezadas siguen desde ahora
+        now = time.monotonic()
+        self._source_clocks = {
+            root_url: now for root_url, source in counters.get('sources', {}).items()
+            if source.get('seconds') is not None
+        }
+        if self.near_duplicates is not None:
+            self.near_duplicates.attach(state.setdefault('near_duplicates', {}))
+        if processed_roots:
+            write_activity(
+                self.activity_log_path,
+                'Spider',
+                'INFO',
+                f"Reanudando{' tras un cierre inesperado' if interrupted else ''}: "
+                f"{len(processed_roots)} URLs raíz ya procesadas"
+            )
+
+    def sync_state(self):
+        """Suma a `counters` el tiempo de las fuentes desde la última vez (antes de guardar el estado)."""
+        now = time.monotonic()
+        for root_url, started in self._source_clocks.items():
+            self._source_counters(root_url)['seconds'] += now - started
+            self._source_clocks[root_url] = now
+
+    def closed(self, reason):
+        # Lo pendiente del log llega al disco antes de que run_scraper.py lea el resultado
+        flush_activity(self.activity_log_path)
+
+    def _page_budget_exhausted(self):
+        return bool(self.max_pages) and self._counters['pages'] >= self.max_pages
+
+    def _source_limit(self, root_url, name, default):
+        value = self.source_limits.get(root_url, {}).get(name)
+        return default if value is None else value
+
+    def _source_counters(self, root_url):
+        sources = self._counters.setdefault('sources', {})
+        counters = sources.get(root_url)
+        if counters is None:
+            counters = sources[root_url] = {'pages': 0, 'bytes': 0, 'seconds': None}
+        return counters
+
+    def _source_seconds(self, root_url):
+        """Segundos en marcha de la fuente, sumando sesiones anteriores; None si no ha empezado."""
+        seconds = self._source_counters(root_url)['seconds']
+        started = self._source_clocks.get(root_url)
+        if seconds is None or started is None:
+            return seconds
+        return seconds + time.monotonic() - started
+
+    def _source_budget_reason(self, root_url):
+        """Presupuesto agotado de la fuente ('source_pages', 'source_bytes', 'source_time') o None."""
+        limits = self.source_limits.get(root_url)
+        if not limits:
+            return None
+        counters = self._source_counters(root_url)
+        max_pages = limits.get('max_pages')
+        if max_pages and counters['pages'] >= max_pages:
+            return 'source_pages'
+        max_bytes = limits.get('max_bytes')
+        if max_bytes and counters['bytes'] >= max_bytes:
+            return 'source_bytes'
+        max_seconds = limits.get('max_seconds')
+        if max_seconds and (self._source_seconds(root_url) or 0) >= max_seconds:
+            return 'source_time'
+        return None
+
+    def _log_source_budget(self, root_url, reason, log_index=None):
+        if root_url in self._source_budget_logged:
+            return
+        self._source_budget_logged.add(root_url)
+        limits = self.source_limits[root_url]
+        if reason == 'source_pages':
+            detail = f"{limits['max_pages']} páginas"
+        elif reason == 'source_bytes':
+            detail = format_size(limits['max_bytes'])
+        else:
+            detail = f"{limits['max_seconds']:.0f} s"
+        message = f"Presupuesto de la fuente agotado ({detail}); se descartan sus peticiones pendientes: {root_url}"
+        self.logger.info(message)
+        write_activity(
+            self.activity_log_path,
+            'Spider',
+            'INFO',
+            message,
+            url_index=log_index
+        )
+
+    def record_transfer(self, request, size):
+        """Suma los bytes recibidos al presupuesto de la fuente de la petición (ver budget.py)."""
+        root_url = request.meta.get('root_url')
+        if root_url in self.source_limits:
+            self._source_counters(root_url)['bytes'] += size
+
+    def should_drop(self, request):
+        """
+        Motivo para descartar una petición pendiente sin descargarla (ver
+        budget.py), o None. El presupuesto global de páginas sólo afecta a
+        páginas; los de bytes y tiempo de una fuente también a sus ficheros.
+        """
+        root_url = request.meta.get('root_url')
+        reason = self._source_budget_reason(root_url) if root_url else None
+        if reason:
+            self._log_source_budget(root_url, reason, request.meta.get('log_index'))
+            if reason != 'source_pages' or request.callback == self.parse:
+                return reason
+        if request.callback != self.parse:
+            return None
+        if self._page_budget_exhausted():
+            return 'pages'
+        return None
 
     def _build_file_extensions(self):
         """Construye el set de extensiones permitidas según file_types"""
@@ -138,7 +433,9 @@ class GenericSpider(scrapy.Spider):
         return dt.astimezone(timezone.utc).isoformat()
 
     def _get_last_modified_datetime(self, response):
-        header = response.headers.get('Last-Modified')
+        return self._parse_last_modified(response.headers.get('Last-Modified'))
+
+    def _parse_last_modified(self, header):
         if not header:
             return None
         try:
@@ -176,27 +473,70 @@ class GenericSpider(scrapy.Spider):
             return False
         return True
 
-    def _resolve_extension_from_content_type(self, response):
-        content_type_raw = response.headers.get('Content-Type')
+    def _get_content_type(self, headers):
+        content_type_raw = headers.get('Content-Type')
         if not content_type_raw:
             return None
         try:
             content_type = content_type_raw.decode('latin1')
         except Exception:
             content_type = content_type_raw.decode('utf-8', errors='ignore')
-        content_type = content_type.split(';')[0].strip().lower()
-        return self.content_type_map.get(content_type)
+        return content_type.split(';')[0].strip().lower() or None
 
-    def _is_direct_file_response(self, response):
-        parsed_path = urlparse(response.url).path or ''
+    def _resolve_extension_from_content_type(self, response):
+        return self.content_type_map.get(self._get_content_type(response.headers))
+
+    def _is_direct_file(self, url, headers):
+        parsed_path = urlparse(url).path or ''
         file_ext = os.path.splitext(parsed_path)[1].lower()
         if file_ext and file_ext in self.recognized_exts:
             return True
-        resolved_ext = self._resolve_extension_from_content_type(response)
+        resolved_ext = self.content_type_map.get(self._get_content_type(headers))
         if resolved_ext and resolved_ext in self.recognized_exts:
             return True
         return False
 
+    def _is_direct_file_response(self, response):
+        return self._is_direct_file(response.url, response.headers)
+
+    def evaluate_headers(self, headers, request):
+        """
+        Decide, con sólo las cabeceras, si hay que cortar la descarga del cuerpo
+        (ver headerfilter.py). Devuelve el motivo o None para seguir descargando.
+        """
+        if request.meta.get('media_request'):
+            return self._evaluate_media_headers(headers)
+        if request.callback != self.parse:
+            return None
+        if self.filter_start_date or self.filter_end_date:
+            dt = self._parse_last_modified(headers.get('Last-Modified'))
+            if dt and not self._is_datetime_within_range(dt):
+                return REJECT_DATE
+        if self._is_direct_file(request.url, headers):
+            # parse sólo necesita las cabeceras; el fichero lo descarga el pipeline
+            return DIRECT_FILE
+        content_type = self._get_content_type(headers)
+        if content_type and not content_type.startswith('text/') \
+                and not any(marker in content_type for marker in TEXTUAL_MIME_MARKERS):
+            return REJECT_CONTENT_TYPE
+        return None
+
+    def _evaluate_media_headers(self, headers):
+        if self.filter_start_date or self.filter_end_date:
+            dt = self._parse_last_modified(headers.get('Last-Modified'))
+            if dt and not self._is_datetime_within_range(dt):
+                return REJECT_DATE
+        content_type = self._get_content_type(headers)
+        if not content_type:
+            return None
+        if 'html' in content_type:
+            # Página de error o de aviso en lugar del fichero enlazado
+            return REJECT_CONTENT_TYPE
+        resolved_ext = self.content_type_map.get(content_type)
+        if resolved_ext and resolved_ext not in self.recognized_exts:
+            return REJECT_CONTENT_TYPE
+        return None
+
     def _handle_direct_file(self, response, log_index=None):
         status = getattr(response, 'status', 200)
         write_activity(
@@ -240,6 +580,7 @@ class GenericSpider(scrapy.Spider):
         item = AutoconsumoScraperScrapyItem()
         item['url'] = response.url
         item['source_index'] = log_index
+        item['root_url'] = response.meta.get('root_url')
         item['file_urls'] = [response.url]
         self.logger.info(f"Queued direct file for download: {response.url}")
         yield item
@@ -250,7 +591,12 @@ class GenericSpider(scrapy.Spider):
         if log_index is None and isinstance(source_index, int):
             log_index = source_index + 1
             response.meta['log_index'] = log_index
-        if current_depth == 0:
+        root_url = response.meta.get('root_url')
+        if root_url in self.source_limits and self._source_counters(root_url)['seconds'] is None:
+            # El tiempo de la fuente cuenta desde su primera respuesta
+            self._source_counters(root_url)['seconds'] = 0.0
+            self._source_clocks[root_url] = time.monotonic()
+        if current_depth == 0 and not response.meta.get('sitemap_seed'):
             is_new_root = response.url not in self._processed_roots
             if is_new_root:
                 self._processed_roots.add(response.url)
@@ -270,37 +616,70 @@ class GenericSpider(scrapy.Spider):
         if not self._is_response_within_date_range(response, log_index):
             return
 
+        if response.meta.pop('header_rejection', None) == REJECT_CONTENT_TYPE:
+            content_type = self._get_content_type(response.headers)
+            message = f"Descarga omitida por tipo de contenido ({content_type}): {response.url}"
+            self.logger.info(message)
+            write_activity(
+                self.activity_log_path,
+                'Spider',
+                'INFO',
+                message,
+                url_index=log_index
+            )
+            return
+
+        # Peticiones que ya esperaban en el downloader cuando se agotó el presupuesto
+        source_budget = self._source_budget_reason(root_url)
+        if source_budget:
+            self._log_source_budget(root_url, source_budget, log_index)
+            return
+
         if self._is_direct_file_response(response):
             yield from self._handle_direct_file(response, log_index=log_index)
             return
 
-        # Extract text
-        raw_text = ' '.join(response.css('body *::text').getall())
-        page_text_norm = normalize_text(raw_text)
+        if self._page_budget_exhausted():
+            return
+        self._counters['pages'] += 1
+        if root_url in self.source_limits:
+            self._source_counters(root_url)['pages'] += 1
+
+        # Extract visible text and links in one traversal; the term scan runs
+        # alongside and aborts the traversal as soon as an exclusion appears
+        page = extract_page(response, self.term_matcher.scanner(normalize_text))
         page_datetime = self._get_last_modified_datetime(response)
 
-        # Check for exclusions
-        if self.exclusions_map:
-            for norm_exc, orig_exc in self.exclusions_map.items():
-                if norm_exc in page_text_norm:
-                    self.logger.info(f"Exclusion keyword '{orig_exc}' found on {response.url}. Stopping this branch.")
-                    write_activity(
-                        self.activity_log_path,
-                        'Spider',
-                        'WARNING',
-                        f"Exclusión: {orig_exc}",
-                        url_index=log_index
-                    )
-                    return
+        if page.exclusion:
+            orig_exc = page.exclusion
+            self.logger.info(f"Exclusion keyword '{orig_exc}' found on {response.url}. Stopping this branch.")
+            write_activity(
+                self.activity_log_path,
+                'Spider',
+                'WARNING',
+                f"Exclusión: {orig_exc}",
+                url_index=log_index
+            )
+            return
 
-        # Check for keywords
-        keywords_on_page = set()
-        has_keywords = False
-        if self.keywords_map:
-            for norm_kw, orig_kw in self.keywords_map.items():
-                if norm_kw in page_text_norm:
-                    keywords_on_page.add(orig_kw)
-                    has_keywords = True
+        if self.near_duplicates is not None:
+            duplicate = self.near_duplicates.check(response.url, page.text)
+            if duplicate is not None:
+                original, distance = duplicate
+                self.crawler.stats.inc_value('neardup/duplicates')
+                message = f"Casi duplicada de {original} (distancia {distance}); no se guarda ni se siguen sus enlaces: {response.url}"
+                self.logger.info(message)
+                write_activity(
+                    self.activity_log_path,
+                    'Spider',
+                    'INFO',
+                    message,
+                    url_index=log_index
+                )
+                return
+
+        keywords_on_page = page.matches.keywords
+        has_keywords = page.matches.has_keywords
 
         # Save page content if keywords found
         if has_keywords:
@@ -323,10 +702,11 @@ class GenericSpider(scrapy.Spider):
             item = AutoconsumoScraperScrapyItem()
             item['url'] = response.url
             item['source_index'] = log_index
+            item['terms'] = sorted(keywords_on_page)
 
             # Guardar texto si está habilitado (NO loguear el contenido)
             if self.save_page_text:
-                item['text'] = raw_text
+                item['text'] = page.text
             else:
                 item['text'] = None
 
@@ -341,7 +721,9 @@ class GenericSpider(scrapy.Spider):
 
         # Determine if we should continue crawling
         should_continue_crawling = True
-        if self.crawl_strategy == 'stop' and not has_keywords:
+        crawl_strategy = self._source_limit(root_url, 'crawl_strategy', self.crawl_strategy)
+        max_depth = self._source_limit(root_url, 'max_depth', self.max_depth)
+        if crawl_strategy == 'stop' and not has_keywords:
             should_continue_crawling = False
             self.logger.info(f"No keywords found on {response.url}. Stopping this branch (crawl_strategy=stop).")
             write_activity(
@@ -352,12 +734,31 @@ class GenericSpider(scrapy.Spider):
                 url_index=log_index
             )
 
+        if self._page_budget_exhausted():
+            should_continue_crawling = False
+            if not self._budget_logged:
+                self._budget_logged = True
+                write_activity(
+                    self.activity_log_path,
+                    'Spider',
+                    'INFO',
+                    f"Presupuesto de {self.max_pages} páginas agotado; no se siguen más enlaces"
+                )
+        source_budget = self._source_budget_reason(root_url)
+        if source_budget:
+            should_continue_crawling = False
+            self._log_source_budget(root_url, source_budget, log_index)
+
+        page_score = None
+        if crawl_strategy == 'best-first':
+            page_score = self.link_scorer.page_score(keywords_on_page, response.meta.get('link_score', 0.0))
+
         # Follow links
-        if should_continue_crawling and current_depth < self.max_depth:
+        if should_continue_crawling and current_depth < max_depth:
             current_url_parsed = urlparse(response.url)
             base_path = os.path.dirname(current_url_parsed.path)
 
-            for link in response.css('a::attr(href)').getall():
+            for link, anchor_text in page.links:
                 parsed_href = urljoin(response.url, link)
                 target_parsed = urlparse(parsed_href)
                 target_domain = target_parsed.netloc
@@ -375,16 +776,25 @@ class GenericSpider(scrapy.Spider):
                 # If 'same-domain', no path restriction needed (already checked domain)
 
                 new_meta = response.meta.copy()
+                # Scrapy marca las semillas en su meta; los enlaces no lo son
+                new_meta.pop('is_start_request', None)
+                priority = 0
+                if page_score is not None:
+                    # Best-first: mejor puntuación primero en el scheduler
+                    link_score = self.link_scorer.link_score(anchor_text, parsed_href, page_score)
+                    new_meta['link_score'] = link_score
+                    priority = self.link_scorer.priority(link_score, current_depth + 1)
                 yield scrapy.Request(
                     parsed_href,
                     callback=self.parse,
                     cb_kwargs={'current_depth': current_depth + 1},
-                    meta=new_meta
+                    meta=new_meta,
+                    priority=priority
                 )
 
         # Find and download files (only if page has keywords)
         if has_keywords:
-            for link in response.css('a::attr(href)').getall():
+            for link in page.hrefs:
                 parsed_href = urljoin(response.url, link)
                 parsed_path = urlparse(parsed_href).path
                 file_ext = os.path.splitext(parsed_path)[1].lower()
@@ -394,20 +804,16 @@ class GenericSpider(scrapy.Spider):
                     file_display = file_name or parsed_path or parsed_href
 
                     if self.exclusions_map:
-                        normalized_name = normalize_text(file_name or '')
-                        skip_file = False
-                        for norm_exc, orig_exc in self.exclusions_map.items():
-                            if norm_exc and norm_exc in normalized_name:
-                                skip_file = True
-                                write_activity(
-                                    self.activity_log_path,
-                                    'Download',
-                                    'INFO',
-                                    f"Descarga omitida por exclusión ({orig_exc}): {file_display}",
-                                    url_index=log_index
-                                )
-                                break
-                        if skip_file:
+                        normalized_name = normalize_term(file_name or '')
+                        orig_exc = self.term_matcher.scan(normalized_name).first_exclusion
+                        if orig_exc:
+                            write_activity(
+                                self.activity_log_path,
+                                'Download',
+                                'INFO',
+                                f"Descarga omitida por exclusión ({orig_exc}): {file_display}",
+                                url_index=log_index
+                            )
                             continue
 
                     # Check download scope
@@ -429,6 +835,7 @@ class GenericSpider(scrapy.Spider):
                     item = AutoconsumoScraperScrapyItem()
                     item['url'] = parsed_href
                     item['source_index'] = log_index
+                    item['root_url'] = root_url
                     item['file_urls'] = [parsed_href]
                     self.logger.info(f"Downloading file: {parsed_href}")
                     yield item
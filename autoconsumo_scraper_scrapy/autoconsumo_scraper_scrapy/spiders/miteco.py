@@ -1,15 +1,8 @@
 import scrapy
 import os
-import unicodedata
 from urllib.parse import urljoin, urlparse
 from autoconsumo_scraper_scrapy.items import AutoconsumoScraperScrapyItem
-
-def normalize_text(text: str) -> str:
-    text_norm = unicodedata.normalize('NFD', text)
-    stripped = ''.join(
-        c for c in text_norm if unicodedata.category(c) != 'Mn'
-    )
-    return stripped.lower()
+from autoconsumo_scraper_scrapy.textnorm import normalize_text, normalize_term
 
 class MitecoSpider(scrapy.Spider):
     name = "miteco"
@@ -76,7 +69,7 @@ class MitecoSpider(scrapy.Spider):
             recognized_exts = {'.pdf', '.doc', '.docx', '.xls', '.xlsx', '.ppt', '.pptx'}
 
             if file_ext in recognized_exts:
-                link_text_norm = normalize_text(response.xpath(f'//a[@href="{link}"]//text()').get() or '')
+                link_text_norm = normalize_term(response.xpath(f'//a[@href="{link}"]//text()').get() or '')
                 should_download = False
                 if self.keywords_map:
                     for norm_kw in self.keywords_map.keys():
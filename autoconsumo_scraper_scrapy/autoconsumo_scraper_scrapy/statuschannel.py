@@ -0,0 +1,145 @@
+"""
+Canal de estado de una ejecución (`<ejecución>/status.json`).
+
+Un único escritor por fichero: run_scraper.py mantiene el estado en memoria
+(`StatusChannel`) y lo escribe con reemplazo atómico (temporal + `os.replace`),
+de modo que app.py nunca lee un JSON a medias. Las actualizaciones se agrupan:
+como mucho una escritura cada STATUS_MIN_INTERVAL segundos, y la última
+siempre llega al disco (un temporizador la escribe al vencer el plazo).
+
+Las peticiones de la interfaz (pausar, cancelar) no tocan status.json: app.py
+las deja en `control.json`, en la misma carpeta, y run_scraper.py las lee al
+terminar para saber cómo se ha detenido.
+
+Sin dependencias de Scrapy (lo usa también app.py); los contadores del
+rastreo los añade `progress.ProgressExtension`.
+"""
+
+import atexit
+import json
+import os
+import sys
+import threading
+import time
+
+STATUS_NAME = 'status.json'
+CONTROL_NAME = 'control.json'
+
+# Escrituras como máximo cada STATUS_MIN_INTERVAL segundos (la interfaz
+# refresca el estado cada segundo)
+STATUS_MIN_INTERVAL = 0.5
+
+_channels = {}
+_channels_lock = threading.Lock()
+
+
+def read_json(path):
+    """Contenido de un JSON de estado; dict vacío si no existe o no se puede leer."""
+    if not path:
+        return {}
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+    except (OSError, ValueError):
+        return {}
+    return data if isinstance(data, dict) else {}
+
+
+def write_json_atomic(path, data):
+    """Escribe `data` en `path` de una vez: los lectores ven el fichero anterior o el nuevo."""
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(data, f, ensure_ascii=False, indent=2)
+    os.replace(tmp_path, path)
+
+
+def read_control(execution_dir):
+    return read_json(os.path.join(execution_dir, CONTROL_NAME))
+
+
+def write_control(execution_dir, request, **fields):
+    """Petición de la interfaz al proceso del scraper (`pause` o `cancel`)."""
+    write_json_atomic(os.path.join(execution_dir, CONTROL_NAME), dict(fields, request=request))
+
+
+def clear_control(execution_dir):
+    try:
+        os.remove(os.path.join(execution_dir, CONTROL_NAME))
+    except FileNotFoundError:
+        pass
+
+
+class StatusChannel:
+    """Estado en memoria de una ejecución escrito en disco de forma atómica y agrupada."""
+
+    def __init__(self, path, min_interval=STATUS_MIN_INTERVAL):
+        self.path = path
+        self.min_interval = min_interval
+        # Parte del estado que dejó app.py al lanzar la ejecución
+        self.state = read_json(path)
+        self._lock = threading.Lock()
+        self._dirty = False
+        self._last_write = 0.0
+        self._timer = None
+
+    def update(self, updates=None, flush=False, **fields):
+        """Mezcla los cambios; se escriben ya si `flush` o si ha pasado el intervalo."""
+        with self._lock:
+            self.state.update(updates or {}, **fields)
+            self._dirty = True
+            wait = self.min_interval - (time.monotonic() - self._last_write)
+            if flush or wait <= 0:
+                self._write_locked()
+            elif self._timer is None:
+                self._timer = threading.Timer(wait, self.flush)
+                self._timer.daemon = True
+                self._timer.start()
+
+    def get(self, key, default=None):
+        with self._lock:
+            return self.state.get(key, default)
+
+    def flush(self):
+        with self._lock:
+            if self._dirty:
+                self._write_locked()
+            self._timer = None
+
+    def close(self):
+        with self._lock:
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+            if self._dirty:
+                self._write_locked()
+
+    def _write_locked(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        try:
+            write_json_atomic(self.path, self.state)
+        except OSError as exc:
+            print(f"Advertencia al actualizar {self.path}: {exc}", file=sys.stderr)
+        self._dirty = False
+        self._last_write = time.monotonic()
+
+
+def get_channel(path):
+    """Canal compartido de `path` dentro del proceso (spider, extensión y run_scraper.py)."""
+    with _channels_lock:
+        channel = _channels.get(path)
+        if channel is None:
+            channel = _channels[path] = StatusChannel(path)
+        return channel
+
+
+def close_channels():
+    with _channels_lock:
+        channels = list(_channels.values())
+        _channels.clear()
+    for channel in channels:
+        channel.close()
+
+
+atexit.register(close_channels)
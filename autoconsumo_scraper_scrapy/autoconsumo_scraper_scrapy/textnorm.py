@@ -0,0 +1,83 @@
+"""
+Normalización de texto compartida (sin acentos y en minúsculas).
+
+Sustituye a las copias de `normalize_text` que había en app.py, run_scraper.py
+y los spiders. El resultado es el mismo que el de la implementación de
+referencia (`normalize_unicode`: NFD + eliminar marcas `Mn` + `lower()`), pero
+sin recorrer el texto carácter a carácter en Python:
+
+- Texto ASCII: basta con `str.lower()`.
+- Resto: `lower()` y sustitución de cada carácter no ASCII distinto usando una
+  tabla precalculada para el rango latino (Latin-1 y Latin Extended A/B, que
+  cubre el español) y la implementación de referencia, cacheada por
+  carácter, para todo lo demás.
+
+Los términos de búsqueda y nombres de fichero, que se repiten mucho, pasan por
+`normalize_term`, que añade una caché LRU.
+"""
+
+import re
+import unicodedata
+from functools import lru_cache
+
+# Último code point cubierto por la tabla precalculada (fin de Latin Extended-B)
+LATIN_RANGE_END = 0x024F
+
+# Con más caracteres no ASCII distintos que este valor, un único `translate`
+# es más barato que encadenar `str.replace`.
+REPLACE_MAX_DISTINCT = 32
+
+TERM_CACHE_SIZE = 16384
+
+_NON_ASCII = re.compile(r'[^\x00-\x7f]')
+
+
+def normalize_unicode(text: str) -> str:
+    """Implementación de referencia: NFD, sin marcas combinantes y en minúsculas."""
+    text_norm = unicodedata.normalize('NFD', text)
+    stripped = ''.join(
+        c for c in text_norm if unicodedata.category(c) != 'Mn'
+    )
+    return stripped.lower()
+
+
+def _build_latin_table():
+    table = {}
+    for code_point in range(0x80, LATIN_RANGE_END + 1):
+        char = chr(code_point)
+        table[char] = normalize_unicode(char)
+    return table
+
+
+LATIN_TABLE = _build_latin_table()
+
+
+@lru_cache(maxsize=4096)
+def _normalize_char(char: str) -> str:
+    mapped = LATIN_TABLE.get(char)
+    if mapped is not None:
+        return mapped
+    return normalize_unicode(char)
+
+
+def normalize_text(text: str) -> str:
+    """Normaliza texto removiendo acentos y convirtiendo a minúsculas"""
+    if not text:
+        return ''
+    lowered = text.lower()
+    if lowered.isascii():
+        return lowered
+    distinct = set(_NON_ASCII.findall(lowered))
+    if len(distinct) <= REPLACE_MAX_DISTINCT:
+        for char in distinct:
+            replacement = _normalize_char(char)
+            if replacement != char:
+                lowered = lowered.replace(char, replacement)
+        return lowered
+    return lowered.translate({ord(char): _normalize_char(char) for char in distinct})
+
+
+@lru_cache(maxsize=TERM_CACHE_SIZE)
+def normalize_term(text: str) -> str:
+    """Igual que `normalize_text`, cacheado para términos y nombres de fichero."""
+    return normalize_text(text)
@@ -0,0 +1,214 @@
+"""
+Control adaptativo de concurrencia y retardo por dominio.
+
+Sustituye al ritmo fijo (`CONCURRENT_REQUESTS_PER_DOMAIN` / `DOWNLOAD_DELAY`)
+cuando `ADAPTIVE_THROTTLE_ENABLED` está activo. Por cada slot de descarga
+(un dominio) se observan la latencia (`download_latency`), los errores y las
+respuestas 429/503, y cada `ADAPTIVE_THROTTLE_WINDOW` respuestas se ajusta el
+slot:
+
+- 429/503: se reduce a la mitad la concurrencia y se dobla el retardo (o se
+  usa `Retry-After` si es mayor) de inmediato, sin esperar a la ventana.
+- Demasiados errores o latencia alta: concurrencia -1 y retardo x1.5.
+- En otro caso: concurrencia +1 y retardo x0.75.
+
+Concurrencia y retardo siempre quedan dentro de los límites configurados. Los
+cambios se anotan en el registro de actividad y, al terminar, el ritmo final
+de cada dominio.
+"""
+
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+
+from scrapy import signals
+from scrapy.exceptions import NotConfigured
+
+from autoconsumo_scraper_scrapy.activity_log import write_activity
+
+BACKOFF_STATUSES = (429, 503)
+
+# Peso de la última muestra en la media móvil de latencia
+LATENCY_EWMA_ALPHA = 0.3
+
+# La latencia se considera alta si supera el objetivo o este múltiplo de la
+# mejor latencia observada en el dominio
+LATENCY_BASELINE_FACTOR = 3.0
+# ...siempre que supere también esta fracción del objetivo (evita reaccionar
+# a variaciones de milisegundos en servidores rápidos)
+LATENCY_RELATIVE_FLOOR = 0.25
+
+DELAY_DECREASE_FACTOR = 0.75
+DELAY_INCREASE_FACTOR = 1.5
+
+
+class _DomainState:
+    __slots__ = ('concurrency', 'delay', 'latency', 'baseline', 'responses', 'errors')
+
+    def __init__(self, concurrency, delay):
+        self.concurrency = concurrency
+        self.delay = delay
+        self.latency = None
+        self.baseline = None
+        self.responses = 0
+        self.errors = 0
+
+    def observe_latency(self, latency):
+        if self.latency is None:
+            self.latency = latency
+        else:
+            self.latency = LATENCY_EWMA_ALPHA * latency + (1 - LATENCY_EWMA_ALPHA) * self.latency
+        if self.baseline is None or latency < self.baseline:
+            self.baseline = latency
+
+    def reset_window(self):
+        self.responses = 0
+        self.errors = 0
+
+
+class AdaptiveThrottleMiddleware:
+
+    def __init__(self, crawler):
+        settings = crawler.settings
+        if not settings.getbool('ADAPTIVE_THROTTLE_ENABLED'):
+            raise NotConfigured
+        self.crawler = crawler
+        self.min_concurrency = max(1, settings.getint('ADAPTIVE_THROTTLE_MIN_CONCURRENCY', 1))
+        self.max_concurrency = max(self.min_concurrency, settings.getint('ADAPTIVE_THROTTLE_MAX_CONCURRENCY', 4))
+        self.min_delay = max(0.0, settings.getfloat('ADAPTIVE_THROTTLE_MIN_DELAY', 0.25))
+        self.max_delay = max(self.min_delay, settings.getfloat('ADAPTIVE_THROTTLE_MAX_DELAY', 60.0))
+        self.target_latency = settings.getfloat('ADAPTIVE_THROTTLE_TARGET_LATENCY', 2.0)
+        self.error_threshold = settings.getfloat('ADAPTIVE_THROTTLE_ERROR_RATE', 0.2)
+        self.window = max(1, settings.getint('ADAPTIVE_THROTTLE_WINDOW', 10))
+        self.start_concurrency = self._clamp_concurrency(settings.getint('CONCURRENT_REQUESTS_PER_DOMAIN', 1))
+        self.start_delay = self._clamp_delay(settings.getfloat('DOWNLOAD_DELAY', 1.0))
+        self.activity_log_path = settings.get('ACTIVITY_LOG_FILE')
+        self.stats = crawler.stats
+        self.domains = {}
+
+    @classmethod
+    def from_crawler(cls, crawler):
+        middleware = cls(crawler)
+        crawler.signals.connect(middleware.spider_closed, signal=signals.spider_closed)
+        return middleware
+
+    def _clamp_concurrency(self, value):
+        return min(self.max_concurrency, max(self.min_concurrency, int(value)))
+
+    def _clamp_delay(self, value):
+        return min(self.max_delay, max(self.min_delay, float(value)))
+
+    def _get_slot(self, request):
+        key = request.meta.get('download_slot')
+        engine = getattr(self.crawler, 'engine', None)
+        downloader = getattr(engine, 'downloader', None)
+        if key is None or downloader is None:
+            return None, None
+        return key, downloader.slots.get(key)
+
+    def _state_for(self, key):
+        state = self.domains.get(key)
+        if state is None:
+            state = _DomainState(self.start_concurrency, self.start_delay)
+            self.domains[key] = state
+        return state
+
+    def process_response(self, request, response, spider):
+        key, slot = self._get_slot(request)
+        if key is None:
+            return response
+        latency = request.meta.get('download_latency')
+        if latency is None:
+            # Respuesta servida desde la caché sin contactar con el servidor
+            return response
+        state = self._state_for(key)
+        state.observe_latency(latency)
+        state.responses += 1
+
+        if response.status in BACKOFF_STATUSES:
+            retry_after = self._parse_retry_after(response.headers.get('Retry-After'))
+            self._backoff(key, state, response.status, retry_after)
+        else:
+            if response.status >= 500:
+                state.errors += 1
+            if state.responses >= self.window:
+                self._adjust(key, state)
+        self._apply(state, slot)
+        return response
+
+    def process_exception(self, request, exception, spider):
+        key, slot = self._get_slot(request)
+        if key is None:
+            return None
+        state = self._state_for(key)
+        state.responses += 1
+        state.errors += 1
+        if state.responses >= self.window:
+            self._adjust(key, state)
+        self._apply(state, slot)
+        return None
+
+    def _parse_retry_after(self, value):
+        if not value:
+            return None
+        text = value.decode('latin1').strip() if isinstance(value, bytes) else str(value).strip()
+        if text.isdigit():
+            return float(text)
+        try:
+            retry_at = parsedate_to_datetime(text)
+        except (TypeError, ValueError):
+            return None
+        if retry_at.tzinfo is None:
+            retry_at = retry_at.replace(tzinfo=timezone.utc)
+        return max(0.0, (retry_at - datetime.now(timezone.utc)).total_seconds())
+
+    def _backoff(self, key, state, status, retry_after):
+        state.concurrency = self._clamp_concurrency(state.concurrency // 2)
+        state.delay = self._clamp_delay(max(state.delay * 2, retry_after or 0.0))
+        state.reset_window()
+        if self.stats is not None:
+            self.stats.inc_value('adaptive_throttle/backoff')
+        detail = f", Retry-After {retry_after:.0f}s" if retry_after is not None else ""
+        self._log(
+            'WARNING',
+            f"{key}: HTTP {status}{detail} → concurrencia={state.concurrency}, retardo={state.delay:.2f}s"
+        )
+
+    def _adjust(self, key, state):
+        error_rate = state.errors / state.responses if state.responses else 0.0
+        slow = state.latency is not None and (
+            state.latency > self.target_latency
+            or state.latency > max(state.baseline * LATENCY_BASELINE_FACTOR, self.target_latency * LATENCY_RELATIVE_FLOOR)
+        )
+        previous = (state.concurrency, state.delay)
+        if error_rate > self.error_threshold or slow:
+            state.concurrency = self._clamp_concurrency(state.concurrency - 1)
+            state.delay = self._clamp_delay(state.delay * DELAY_INCREASE_FACTOR)
+        else:
+            state.concurrency = self._clamp_concurrency(state.concurrency + 1)
+            state.delay = self._clamp_delay(state.delay * DELAY_DECREASE_FACTOR)
+        state.reset_window()
+        if (state.concurrency, round(state.delay, 2)) != (previous[0], round(previous[1], 2)):
+            self._log(
+                'INFO',
+                f"{key}: concurrencia={state.concurrency}, retardo={state.delay:.2f}s "
+                f"(latencia {state.latency or 0:.2f}s, errores {error_rate:.0%})"
+            )
+
+    @staticmethod
+    def _apply(state, slot):
+        # El downloader elimina los slots inactivos; se reaplica en cada respuesta
+        if slot is None:
+            return
+        slot.concurrency = state.concurrency
+        slot.delay = state.delay
+
+    def _log(self, level, message):
+        write_activity(self.activity_log_path, 'Ritmo', level, message)
+
+    def spider_closed(self, spider):
+        for key, state in sorted(self.domains.items()):
+            self._log(
+                'INFO',
+                f"{key} (final): concurrencia={state.concurrency}, retardo={state.delay:.2f}s, "
+                f"latencia media {state.latency or 0:.2f}s"
+            )
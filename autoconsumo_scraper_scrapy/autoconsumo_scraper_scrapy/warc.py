@@ -0,0 +1,417 @@
+"""
+Grabación de las descargas en ficheros WARC y reproducción sin red.
+
+Con `WARC_OUTPUT_DIR`, `WarcRecorderMiddleware` añade cada par
+petición/respuesta que pasa por el descargador (páginas, robots.txt,
+sitemaps, redirecciones, reintentos y archivos de FilesPipeline) a
+`<ejecución>/warc/*.warc.gz`: un registro `request` y uno `response` por
+descarga, cada uno como miembro gzip independiente, y una línea en
+`indice.jsonl` con la posición del registro `response`.
+
+Con `WARC_REPLAY_DIR`, `WarcReplayDownloadHandler` sustituye a los
+manejadores http/https: sirve las respuestas grabadas en esa carpeta en lugar
+de ir a la red. Así se puede repetir una ejecución con otros
+`terminos_interes.txt` o exclusiones a la velocidad de la CPU, o medir cambios
+del spider siempre con la misma entrada. Las URLs que no están grabadas
+reciben un 404 (marcado con el flag `warc_missing`).
+
+El middleware va en 850: después de la caché HTTP (900), para grabar la copia
+servida en lugar del 304 de la revalidación, y antes de la descompresión
+(590), para guardar el cuerpo tal como llegó con su `Content-Encoding`.
+"""
+
+import base64
+import gzip
+import hashlib
+import json
+import logging
+import os
+import uuid
+import zlib
+from datetime import datetime, timezone
+from http import HTTPStatus
+from urllib.parse import urlparse
+
+from scrapy import signals
+from scrapy.exceptions import NotConfigured, StopDownload
+from scrapy.http import Headers
+from scrapy.responsetypes import responsetypes
+from twisted.internet import defer
+from twisted.python.failure import Failure
+
+logger = logging.getLogger(__name__)
+
+INDEX_NAME = 'indice.jsonl'
+WARC_SUFFIX = '.warc.gz'
+WARC_MAX_FILE_BYTES = 1024 * 1024 * 1024
+WARC_VERSION = 'WARC/1.1'
+# Lectura secuencial de los .warc.gz sin índice: bytes leídos y descomprimidos por paso
+SCAN_READ_BYTES = 1024 * 1024
+SCAN_INFLATE_BYTES = 1024 * 1024
+
+# Twisted entrega el cuerpo ya sin trocear: la cabecera ya no lo describe
+DROPPED_RESPONSE_HEADERS = {b'transfer-encoding'}
+
+
+def _record_id():
+    return f"<urn:uuid:{uuid.uuid4()}>"
+
+
+def _warc_date():
+    return datetime.now(timezone.utc).strftime('%Y-%m-%dT%H:%M:%SZ')
+
+
+def _sha1_digest(data):
+    return 'sha1:' + base64.b32encode(hashlib.sha1(data).digest()).decode('ascii')
+
+
+def _header_lines(headers, dropped=()):
+    lines = []
+    for name, values in headers.items():
+        if name.lower() in dropped:
+            continue
+        for value in values:
+            lines.append(name + b': ' + value)
+    return b''.join(line + b'\r\n' for line in lines)
+
+
+def http_request_block(request):
+    parsed = urlparse(request.url)
+    target = parsed.path or '/'
+    if parsed.query:
+        target += '?' + parsed.query
+    head = f"{request.method} {target} HTTP/1.1\r\n".encode('utf-8')
+    if b'Host' not in request.headers:
+        head += b'Host: ' + parsed.netloc.encode('utf-8') + b'\r\n'
+    return head + _header_lines(request.headers) + b'\r\n' + request.body
+
+
+def http_response_block(response):
+    try:
+        reason = HTTPStatus(response.status).phrase
+    except ValueError:
+        reason = ''
+    head = f"HTTP/1.1 {response.status} {reason}\r\n".encode('utf-8')
+    return head + _header_lines(response.headers, DROPPED_RESPONSE_HEADERS) + b'\r\n' + response.body
+
+
+def warc_record(record_type, block, headers):
+    """Registro WARC completo (cabeceras, bloque y separador) comprimido como miembro gzip."""
+    fields = [
+        (WARC_VERSION, None),
+        ('WARC-Type', record_type),
+        ('WARC-Record-ID', headers.pop('WARC-Record-ID', None) or _record_id()),
+        ('WARC-Date', _warc_date()),
+    ]
+    fields.extend(headers.items())
+    fields.append(('WARC-Block-Digest', _sha1_digest(block)))
+    fields.append(('Content-Length', str(len(block))))
+    head = ''.join(f"{name}: {value}\r\n" if value is not None else f"{name}\r\n" for name, value in fields)
+    return gzip.compress(head.encode('utf-8') + b'\r\n' + block + b'\r\n\r\n', mtime=0)
+
+
+class WarcWriter:
+    """Ficheros `<prefijo>-NNNNN.warc.gz` de una carpeta y su índice de respuestas."""
+
+    def __init__(self, directory, prefix, max_file_bytes=WARC_MAX_FILE_BYTES):
+        self.directory = directory
+        self.prefix = prefix
+        self.max_file_bytes = max_file_bytes
+        os.makedirs(directory, exist_ok=True)
+        self.file_number = 0
+        self._file = None
+        self._index = open(os.path.join(directory, INDEX_NAME), 'a', encoding='utf-8')
+        self.records = 0
+        self.bytes_written = 0
+
+    def _warc_file(self):
+        if self._file is not None and self._file.tell() >= self.max_file_bytes:
+            self._file.close()
+            self._file = None
+        if self._file is None:
+            self.file_number += 1
+            name = f"{self.prefix}-{self.file_number:05d}{WARC_SUFFIX}"
+            self._file = open(os.path.join(self.directory, name), 'ab')
+            info = (
+                'software: autoconsumo_scraper_scrapy\r\n'
+                'format: WARC File Format 1.1\r\n'
+            ).encode('utf-8')
+            self._write(warc_record('warcinfo', info, {
+                'WARC-Filename': name,
+                'Content-Type': 'application/warc-fields',
+            }))
+        return self._file
+
+    def _write(self, data):
+        offset = self._file.tell()
+        self._file.write(data)
+        self.bytes_written += len(data)
+        return offset
+
+    def write(self, request, response):
+        """Graba la respuesta y la petición que la originó."""
+        warc_file = self._warc_file()
+        response_id = _record_id()
+        response_headers = {
+            'WARC-Record-ID': response_id,
+            'WARC-Target-URI': request.url,
+            'Content-Type': 'application/http; msgtype=response',
+            'WARC-Payload-Digest': _sha1_digest(response.body),
+        }
+        truncated = 'download_stopped' in response.flags
+        if truncated:
+            # Cortada tras las cabeceras (headerfilter): sólo están las cabeceras
+            response_headers['WARC-Truncated'] = 'length'
+        response_record = warc_record('response', http_response_block(response), response_headers)
+        offset = self._write(response_record)
+        self._write(warc_record('request', http_request_block(request), {
+            'WARC-Target-URI': request.url,
+            'WARC-Concurrent-To': response_id,
+            'Content-Type': 'application/http; msgtype=request',
+        }))
+        warc_file.flush()
+        self._index.write(json.dumps({
+            'uri': request.url,
+            'method': request.method,
+            'status': response.status,
+            'file': os.path.basename(warc_file.name),
+            'offset': offset,
+            'length': len(response_record),
+            'truncated': truncated,
+        }, ensure_ascii=False) + '\n')
+        self._index.flush()
+        self.records += 1
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+        self._index.close()
+
+
+def parse_record(data):
+    """Miembro gzip de un registro -> (cabeceras WARC, bloque)."""
+    raw = gzip.decompress(data)
+    head, _, rest = raw.partition(b'\r\n\r\n')
+    headers = {}
+    for line in head.split(b'\r\n')[1:]:
+        name, _, value = line.decode('utf-8', errors='replace').partition(':')
+        headers[name.strip()] = value.strip()
+    length = int(headers.get('Content-Length', len(rest)))
+    return headers, rest[:length]
+
+
+def parse_http_response(block):
+    """Bloque `application/http; msgtype=response` -> (estado, Headers, cuerpo)."""
+    head, _, body = block.partition(b'\r\n\r\n')
+    lines = head.split(b'\r\n')
+    status = int(lines[0].split(b' ', 2)[1])
+    headers = Headers()
+    for line in lines[1:]:
+        name, _, value = line.partition(b':')
+        if name:
+            headers.appendlist(name.strip(), value.strip())
+    return status, headers, body
+
+
+def iter_members(path):
+    """
+    (desplazamiento, longitud) de cada miembro gzip de un fichero .warc.gz,
+    en una sola pasada: el sobrante de un miembro es el principio del siguiente.
+    """
+    with open(path, 'rb') as warc_file:
+        offset = 0
+        data = b''
+        while True:
+            decompressor = zlib.decompressobj(wbits=31)
+            consumed = 0
+            while not decompressor.eof:
+                if not data:
+                    data = warc_file.read(SCAN_READ_BYTES)
+                    if not data:
+                        # Fin del fichero, o último registro a medias tras una parada brusca
+                        return
+                consumed += len(data)
+                # El contenido no hace falta: sólo dónde termina el miembro
+                decompressor.decompress(data, SCAN_INFLATE_BYTES)
+                data = decompressor.unconsumed_tail
+                if not decompressor.eof:
+                    consumed -= len(data)
+            # Al terminar el miembro el sobrante de la última llamada queda en unused_data
+            data = decompressor.unused_data
+            length = consumed - len(data)
+            yield offset, length
+            offset += length
+
+
+def scan_directory(directory):
+    """Entradas del índice reconstruidas leyendo los .warc.gz (sin indice.jsonl)."""
+    entries = []
+    for name in sorted(os.listdir(directory)):
+        if not name.endswith(WARC_SUFFIX):
+            continue
+        path = os.path.join(directory, name)
+        with open(path, 'rb') as warc_file:
+            for offset, length in iter_members(path):
+                warc_file.seek(offset)
+                headers, block = parse_record(warc_file.read(length))
+                if headers.get('WARC-Type') != 'response':
+                    continue
+                entries.append({
+                    'uri': headers.get('WARC-Target-URI'),
+                    'method': 'GET',
+                    'status': parse_http_response(block)[0],
+                    'file': name,
+                    'offset': offset,
+                    'length': length,
+                    'truncated': 'WARC-Truncated' in headers,
+                })
+    return entries
+
+
+class WarcArchive:
+    """Respuestas grabadas en una carpeta, por método y URL."""
+
+    def __init__(self, directory):
+        self.directory = directory
+        index_path = os.path.join(directory, INDEX_NAME)
+        if os.path.exists(index_path):
+            entries = []
+            with open(index_path, 'r', encoding='utf-8') as index:
+                for line in index:
+                    try:
+                        entries.append(json.loads(line))
+                    except ValueError:
+                        continue
+        else:
+            entries = scan_directory(directory)
+        # Varias respuestas para la misma URL (reintentos, varias ejecuciones
+        # reanudadas): se sirven en el orden en que se grabaron
+        self._entries = {}
+        for entry in entries:
+            self._entries.setdefault((entry['method'], entry['uri']), []).append(entry)
+        self._served = {}
+
+    def __len__(self):
+        return sum(len(entries) for entries in self._entries.values())
+
+    def lookup(self, method, url):
+        """Siguiente respuesta grabada para `(method, url)`; la última se repite. None si no hay."""
+        entries = self._entries.get((method, url))
+        if not entries:
+            return None
+        position = self._served.get((method, url), 0)
+        self._served[(method, url)] = position + 1
+        return entries[min(position, len(entries) - 1)]
+
+    def read(self, entry):
+        """(estado, Headers, cuerpo) de una entrada del índice."""
+        with open(os.path.join(self.directory, entry['file']), 'rb') as warc_file:
+            warc_file.seek(entry['offset'])
+            _, block = parse_record(warc_file.read(entry['length']))
+        return parse_http_response(block)
+
+
+class WarcRecorderMiddleware:
+
+    def __init__(self, directory, prefix, max_file_bytes=WARC_MAX_FILE_BYTES, stats=None):
+        self.writer = WarcWriter(directory, prefix, max_file_bytes)
+        self.stats = stats
+
+    @classmethod
+    def from_crawler(cls, crawler):
+        directory = crawler.settings.get('WARC_OUTPUT_DIR')
+        if not directory:
+            raise NotConfigured
+        prefix = 'autoconsumo-' + datetime.now(timezone.utc).strftime('%Y%m%d%H%M%S')
+        shard = crawler.settings.get('SHARD_ID')
+        if shard is not None:
+            # Varios procesos de la misma ejecución escriben en la misma carpeta
+            prefix += f'-{int(shard):02d}'
+        middleware = cls(
+            directory, prefix,
+            crawler.settings.getint('WARC_MAX_FILE_BYTES', WARC_MAX_FILE_BYTES),
+            crawler.stats,
+        )
+        crawler.signals.connect(middleware.spider_closed, signal=signals.spider_closed)
+        return middleware
+
+    def process_response(self, request, response, spider):
+        before = self.writer.bytes_written
+        self.writer.write(request, response)
+        if self.stats is not None:
+            self.stats.inc_value('warc/records', spider=spider)
+            self.stats.inc_value('warc/bytes', self.writer.bytes_written - before, spider=spider)
+        return response
+
+    def spider_closed(self, spider):
+        self.writer.close()
+
+
+class WarcReplayDownloadHandler:
+    """Manejador de descargas http/https que sirve las respuestas de una carpeta WARC."""
+
+    lazy = False
+
+    def __init__(self, crawler):
+        directory = crawler.settings.get('WARC_REPLAY_DIR')
+        if not directory:
+            raise NotConfigured
+        self.crawler = crawler
+        self.archive = WarcArchive(directory)
+        logger.info("Reproduciendo %d respuestas grabadas de %s", len(self.archive), directory)
+
+    @classmethod
+    def from_crawler(cls, crawler):
+        return cls(crawler)
+
+    def download_request(self, request, spider):
+        try:
+            return defer.succeed(self._replay(request, spider))
+        except StopDownload as exc:
+            return defer.fail(Failure(exc))
+
+    def _replay(self, request, spider):
+        stats = self.crawler.stats
+        entry = self.archive.lookup(request.method, request.url)
+        if entry is None:
+            stats.inc_value('warc/replay/missing', spider=spider)
+            logger.debug("Sin respuesta grabada para %s", request.url, extra={'spider': spider})
+            return self._build_response(request, 404, Headers(), b'', ['warc', 'warc_missing'])
+        status, headers, body = self.archive.read(entry)
+        stats.inc_value('warc/replay/hit', spider=spider)
+
+        # Mismo comportamiento que HTTP11DownloadHandler: headerfilter decide
+        # con las cabeceras si se descarta el cuerpo
+        content_length = headers.get(b'Content-Length')
+        results = self.crawler.signals.send_catch_log(
+            signal=signals.headers_received,
+            headers=headers,
+            body_length=int(content_length) if content_length and content_length.isdigit() else -1,
+            request=request,
+            spider=spider,
+        )
+        for _, result in results:
+            if isinstance(result, Failure) and isinstance(result.value, StopDownload):
+                response = self._build_response(request, status, headers, b'', ['warc', 'download_stopped'])
+                if result.value.fail:
+                    result.value.response = response
+                    raise result.value
+                return response
+        if entry.get('truncated'):
+            # La descarga original se cortó: no hay cuerpo que servir
+            return self._build_response(request, status, headers, b'', ['warc', 'download_stopped'])
+        return self._build_response(request, status, headers, body, ['warc'])
+
+    @staticmethod
+    def _build_response(request, status, headers, body, flags):
+        respcls = responsetypes.from_args(headers=headers, url=request.url, body=body)
+        return respcls(
+            url=request.url,
+            status=status,
+            headers=headers,
+            body=body,
+            flags=flags,
+            request=request,
+            protocol='HTTP/1.1',
+        )
@@ -0,0 +1,272 @@
+"""
+Proceso de scraping en caliente (opcional, sólo POSIX).
+
+Cada ejecución lanza un `python run_scraper.py` nuevo que importa Scrapy,
+Twisted y el proyecto antes de la primera petición; en rastreos pequeños y
+frecuentes ese arranque es buena parte del tiempo total. Con
+`python run_scraper.py --serve [socket]` un proceso importa todo una vez y
+espera trabajos en un socket Unix local. Cada trabajo
+(`{"config_file": ..., "resume": ...}`) se ejecuta en un hijo creado con
+fork: hereda los módulos ya importados, pero instala y para su propio
+reactor, así que los trabajos no comparten estado de Twisted. El proceso en
+caliente nunca instala el reactor.
+
+Protocolo (una línea JSON por mensaje): el cliente envía el trabajo; el
+servidor responde `{"pid": N}` al crear el hijo y `{"returncode": N}` cuando
+termina (o `{"error": ...}`). La conexión sigue abierta mientras dura el
+trabajo.
+
+app.py usa `launch_warm` si SCRAPER_WARM_WORKER apunta al socket;
+`WarmProcess` ofrece lo que la cola de ejecuciones usa de subprocess.Popen
+(`pid`, `poll`, `wait`, `terminate`, `send_signal`).
+
+Sin dependencias de Scrapy.
+"""
+
+import atexit
+import json
+import os
+import selectors
+import signal
+import socket
+import sys
+import threading
+import time
+import traceback
+
+SOCKET_NAME = 'warm_worker.sock'
+
+# Segundos entre comprobaciones de los hijos terminados
+REAP_INTERVAL = 0.5
+# Espera máxima de la respuesta del servidor al lanzar un trabajo
+CONNECT_TIMEOUT = 10.0
+# Tamaño máximo de la petición de un trabajo
+MAX_REQUEST = 64 * 1024
+
+
+def send_message(conn, message):
+    conn.sendall(json.dumps(message).encode('utf-8') + b'\n')
+
+
+def read_line(conn, limit=MAX_REQUEST):
+    """Primera línea recibida y lo que llegó detrás (bloqueante, con el timeout de `conn`)."""
+    data = b''
+    while b'\n' not in data:
+        chunk = conn.recv(4096)
+        if not chunk:
+            raise ConnectionError('Conexión cerrada antes de completar el mensaje')
+        data += chunk
+        if len(data) > limit:
+            raise ValueError('Mensaje demasiado largo')
+    line, _, rest = data.partition(b'\n')
+    return json.loads(line), rest
+
+
+# ---- Cliente (app.py) ----
+
+class WarmProcess:
+    """Trabajo lanzado en el proceso en caliente, con la interfaz de Popen que usa app.py."""
+
+    def __init__(self, conn, pid, buffer=b''):
+        self.pid = pid
+        self.returncode = None
+        self._conn = conn
+        self._buffer = buffer
+        self._lock = threading.Lock()
+        self._conn.setblocking(False)
+
+    def poll(self):
+        with self._lock:
+            if self.returncode is None:
+                self._read_messages()
+            return self.returncode
+
+    def wait(self, timeout=None):
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while self.poll() is None:
+            if deadline is not None and time.monotonic() >= deadline:
+                raise TimeoutError(f'El trabajo {self.pid} sigue en marcha')
+            time.sleep(0.05)
+        return self.returncode
+
+    def send_signal(self, sig):
+        if self.poll() is None:
+            os.kill(self.pid, sig)
+
+    def terminate(self):
+        self.send_signal(signal.SIGTERM)
+
+    def kill(self):
+        self.send_signal(signal.SIGKILL)
+
+    def _read_messages(self):
+        if self._conn is not None:
+            try:
+                while True:
+                    chunk = self._conn.recv(4096)
+                    if not chunk:
+                        self._conn.close()
+                        self._conn = None
+                        break
+                    self._buffer += chunk
+            except BlockingIOError:
+                pass
+            except OSError:
+                self._conn.close()
+                self._conn = None
+        while b'\n' in self._buffer:
+            line, _, self._buffer = self._buffer.partition(b'\n')
+            message = json.loads(line)
+            if 'returncode' in message:
+                self.returncode = message['returncode']
+        if self.returncode is None and self._conn is None and not pid_alive(self.pid):
+            # El proceso en caliente se cerró antes que el hijo: se desconoce su código
+            self.returncode = -1
+
+
+def pid_alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def launch_warm(socket_path, config_file, resume=False, timeout=CONNECT_TIMEOUT):
+    """Pide un trabajo al proceso en caliente; OSError si no está disponible."""
+    conn = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        conn.settimeout(timeout)
+        conn.connect(socket_path)
+        send_message(conn, {'config_file': os.path.abspath(config_file), 'resume': bool(resume)})
+        message, rest = read_line(conn)
+    except (OSError, ValueError) as exc:
+        conn.close()
+        raise OSError(f'Proceso en caliente no disponible en {socket_path}: {exc}') from exc
+    if 'pid' not in message:
+        conn.close()
+        raise OSError(f"El proceso en caliente rechazó el trabajo: {message.get('error')}")
+    return WarmProcess(conn, message['pid'], rest)
+
+
+# ---- Servidor (run_scraper.py --serve) ----
+
+def serve(socket_path, run_job, log=print):
+    """
+    Atiende trabajos en `socket_path` hasta recibir SIGINT o SIGTERM.
+    `run_job(config_file, resume)` se ejecuta en el hijo y devuelve su código de salida.
+    """
+    if os.path.exists(socket_path):
+        # Socket de una ejecución anterior que no se cerró bien
+        os.remove(socket_path)
+    server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    server.bind(socket_path)
+    os.chmod(socket_path, 0o600)
+    server.listen()
+    selector = selectors.DefaultSelector()
+    selector.register(server, selectors.EVENT_READ)
+    children = {}
+
+    def stop(signum, frame):
+        raise SystemExit(0)
+
+    signal.signal(signal.SIGTERM, stop)
+    log(f"Proceso en caliente escuchando en {socket_path} (pid {os.getpid()})")
+    try:
+        while True:
+            for _key, _events in selector.select(REAP_INTERVAL):
+                conn, _address = server.accept()
+                pid = start_child(server, conn, children, run_job)
+                if pid:
+                    children[pid] = conn
+                    log(f"Trabajo lanzado en el hijo {pid}")
+            reap_children(children, log)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        selector.close()
+        server.close()
+        try:
+            os.remove(socket_path)
+        except FileNotFoundError:
+            pass
+        for conn in children.values():
+            conn.close()
+        log("Proceso en caliente detenido (los trabajos en marcha siguen hasta terminar)")
+
+
+def start_child(server, conn, children, run_job):
+    try:
+        conn.settimeout(CONNECT_TIMEOUT)
+        request, _rest = read_line(conn)
+        config_file = request['config_file']
+        if not os.path.isfile(config_file):
+            raise ValueError(f'No existe {config_file}')
+    except (OSError, ValueError, KeyError, TypeError) as exc:
+        try:
+            send_message(conn, {'error': str(exc)})
+        except OSError:
+            pass
+        conn.close()
+        return None
+
+    pid = os.fork()
+    if pid == 0:
+        # Hijo: nada del servidor, su propia sesión y las señales por defecto
+        server.close()
+        for other in children.values():
+            other.close()
+        conn.close()
+        os.setsid()
+        signal.signal(signal.SIGTERM, signal.SIG_DFL)
+        signal.signal(signal.SIGINT, signal.default_int_handler)
+        os._exit(run_child(run_job, config_file, bool(request.get('resume'))))
+
+    try:
+        send_message(conn, {'pid': pid})
+    except OSError:
+        pass
+    return pid
+
+
+def run_child(run_job, config_file, resume):
+    code = 1
+    try:
+        code = run_job(config_file, resume)
+    except SystemExit as exc:
+        code = exc.code if isinstance(exc.code, int) else 1
+    except BaseException:
+        traceback.print_exc()
+    finally:
+        # os._exit no pasa por atexit: estado, log de actividad y logging
+        # deben volcarse aquí
+        try:
+            atexit._run_exitfuncs()
+        except Exception:
+            traceback.print_exc()
+        sys.stdout.flush()
+        sys.stderr.flush()
+    return code or 0
+
+
+def reap_children(children, log):
+    while children:
+        try:
+            pid, status = os.waitpid(-1, os.WNOHANG)
+        except ChildProcessError:
+            return
+        if pid == 0:
+            return
+        conn = children.pop(pid, None)
+        if conn is None:
+            continue
+        returncode = os.waitstatus_to_exitcode(status)
+        log(f"Trabajo del hijo {pid} terminado (código {returncode})")
+        try:
+            send_message(conn, {'returncode': returncode})
+        except OSError:
+            # app.py ya no escucha (se reinició); el estado está en status.json
+            pass
+        conn.close()
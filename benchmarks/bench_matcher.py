@@ -0,0 +1,106 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Benchmark del buscador de términos: páginas/segundo frente al número de términos.
+
+Compara el recorrido término a término que usaba GenericSpider.parse con
+TermMatcher (autómata Aho-Corasick y ruta de subcadenas para listas cortas).
+
+Uso: python benchmarks/bench_matcher.py [--pages N] [--page-kb KB]
+"""
+
+import argparse
+import os
+import random
+import sys
+import time
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(BASE_DIR, 'autoconsumo_scraper_scrapy'))
+
+from autoconsumo_scraper_scrapy.matcher import TermMatcher  # noqa: E402
+
+SYLLABLES = [
+    'au', 'to', 'con', 'su', 'mo', 'fo', 'vol', 'tai', 'ca', 'ener', 'gi', 'a', 're', 'no',
+    'va', 'ble', 'tra', 'mi', 'ta', 'cion', 'sub', 'ven', 'ci', 'on', 'de', 'la', 'red',
+    'ins', 'ta', 'la', 'dor', 'ex', 'ce', 'den', 'tes', 'co', 'lec', 'ti', 'vo', 'pla', 'ca',
+]
+
+
+def make_word(rng: random.Random) -> str:
+    return ''.join(rng.choice(SYLLABLES) for _ in range(rng.randint(1, 4)))
+
+
+def make_page(rng: random.Random, vocabulary, size_kb: int) -> str:
+    target = size_kb * 1024
+    words = []
+    length = 0
+    while length < target:
+        word = rng.choice(vocabulary)
+        words.append(word)
+        length += len(word) + 1
+    return ' '.join(words)
+
+
+def make_terms(rng: random.Random, vocabulary, count: int):
+    terms = {}
+    while len(terms) < count:
+        term = ' '.join(rng.sample(vocabulary, rng.randint(1, 2)))
+        terms[term] = term
+    return terms
+
+
+def legacy_scan(keywords_map, exclusions_map, text):
+    for norm_exc, orig_exc in exclusions_map.items():
+        if norm_exc in text:
+            return set(), orig_exc
+    keywords = set()
+    for norm_kw, orig_kw in keywords_map.items():
+        if norm_kw in text:
+            keywords.add(orig_kw)
+    return keywords, None
+
+
+def pages_per_second(func, pages) -> float:
+    start = time.perf_counter()
+    for page in pages:
+        func(page)
+    elapsed = time.perf_counter() - start
+    return len(pages) / elapsed if elapsed else float('inf')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--pages', type=int, default=20)
+    parser.add_argument('--page-kb', type=int, default=100)
+    parser.add_argument('--terms', type=int, nargs='*', default=[10, 50, 100, 300, 500, 1000, 2000])
+    args = parser.parse_args()
+
+    rng = random.Random(42)
+    vocabulary = list({make_word(rng) for _ in range(8000)})
+    pages = [make_page(rng, vocabulary, args.page_kb) for _ in range(args.pages)]
+
+    print(f"{args.pages} páginas de {args.page_kb} KB")
+    print(f"{'términos':>9} | {'legacy p/s':>11} | {'subcadenas p/s':>14} | {'autómata p/s':>12}")
+    print('-' * 56)
+    for count in args.terms:
+        terms = make_terms(rng, vocabulary, count)
+        items = list(terms.items())
+        # Exclusiones poco frecuentes para que el recorrido legacy no corte pronto
+        exclusions_map = {f"zz{norm}zz": orig for norm, orig in items[:count // 4]}
+        keywords_map = dict(items[count // 4:])
+
+        substring = TermMatcher(keywords_map, exclusions_map, min_automaton_terms=10 ** 9)
+        automaton = TermMatcher(keywords_map, exclusions_map, min_automaton_terms=0)
+        for page in pages[:2]:
+            expected, _ = legacy_scan(keywords_map, exclusions_map, page)
+            assert automaton.scan(page).keywords == expected
+
+        legacy_rate = pages_per_second(lambda p: legacy_scan(keywords_map, exclusions_map, p), pages)
+        substring_rate = pages_per_second(substring.scan, pages)
+        automaton_rate = pages_per_second(automaton.scan, pages)
+        print(f"{count:>9} | {legacy_rate:>11.1f} | {substring_rate:>14.1f} | {automaton_rate:>12.1f}")
+
+
+if __name__ == '__main__':
+    main()
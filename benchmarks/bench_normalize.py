@@ -0,0 +1,57 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Micro-benchmark de normalización de texto sobre páginas de varios MB:
+implementación anterior (NFD + unicodedata.category por carácter) frente a
+textnorm.normalize_text.
+
+Uso: python benchmarks/bench_normalize.py [--mb 1 4 8] [--repeat N]
+"""
+
+import argparse
+import os
+import sys
+import time
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(BASE_DIR, 'autoconsumo_scraper_scrapy'))
+
+from autoconsumo_scraper_scrapy.textnorm import normalize_text, normalize_unicode  # noqa: E402
+
+SAMPLES = {
+    'ascii': "Self consumption guide for collective installations and grid access. ",
+    'español': ("La tramitación del autoconsumo colectivo en España requiere la solicitud de "
+                "acceso y conexión a la red; la instalación fotovoltaica y sus subvenciones. "),
+    'mixto': ("Autoconsumo — Ελληνικά σύνοψη, Ñandú, pingüino, Łódź, Straße, 自家消費 y "
+              "æøå para comprobar la ruta de respaldo fuera del rango latino. "),
+}
+
+
+def best_of(func, text, repeat):
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func(text)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--mb', type=float, nargs='*', default=[1, 4, 8])
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    print(f"{'texto':>8} | {'MB':>4} | {'anterior ms':>11} | {'nuevo ms':>8} | {'x':>5}")
+    print('-' * 50)
+    for label, sample in SAMPLES.items():
+        for size_mb in args.mb:
+            text = sample * int(size_mb * 1024 * 1024 / len(sample))
+            assert normalize_text(text) == normalize_unicode(text)
+            legacy = best_of(normalize_unicode, text, args.repeat)
+            fast = best_of(normalize_text, text, args.repeat)
+            print(f"{label:>8} | {size_mb:>4g} | {legacy * 1000:>11.1f} | {fast * 1000:>8.1f} | {legacy / fast:>5.1f}")
+
+
+if __name__ == '__main__':
+    main()
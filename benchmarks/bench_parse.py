@@ -0,0 +1,103 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Benchmark de extracción de página: CPU y pico de memoria de
+`response.css('body *::text')` + dos `response.css('a::attr(href)')` frente al
+recorrido único de extraction.extract_page.
+
+Uso: python benchmarks/bench_parse.py [--links N] [--paragraphs N] [--repeat N]
+"""
+
+import argparse
+import os
+import sys
+import time
+import tracemalloc
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(BASE_DIR, 'autoconsumo_scraper_scrapy'))
+
+from scrapy.http import HtmlResponse  # noqa: E402
+
+from autoconsumo_scraper_scrapy.extraction import extract_page  # noqa: E402
+from autoconsumo_scraper_scrapy.matcher import TermMatcher  # noqa: E402
+from autoconsumo_scraper_scrapy.textnorm import normalize_text  # noqa: E402
+
+
+def build_portal_page(paragraphs: int, links: int, exclusion: bool = False) -> bytes:
+    parts = ['<html><head><title>Portal</title>',
+             '<style>' + 'body { margin: 0 } ' * 2000 + '</style>',
+             '<script>' + 'var tracking = "autoconsumo"; ' * 4000 + '</script>',
+             '</head><body><nav>']
+    for i in range(links):
+        parts.append(f'<li><a href="/es/energia/seccion-{i}/index.html">Sección {i} de energía</a></li>')
+    parts.append('</nav><main>')
+    for i in range(paragraphs):
+        parts.append(f'<div class="bloque"><h2>Apartado {i}</h2><p>Información sobre tramitación, '
+                     f'subvenciones y <strong>instalaciones</strong> fotovoltaicas número {i}.</p></div>')
+        if exclusion and i == paragraphs // 10:
+            parts.append('<p>Página no encontrada</p>')
+    parts.append('<p>Guía de autoconsumo colectivo</p></main></body></html>')
+    return ''.join(parts).encode('utf-8')
+
+
+def legacy_parse(response, matcher):
+    raw_text = ' '.join(response.css('body *::text').getall())
+    matches = matcher.scan(normalize_text(raw_text))
+    if matches.exclusions:
+        return matches
+    follow = response.css('a::attr(href)').getall()
+    files = response.css('a::attr(href)').getall()
+    return matches, raw_text, follow, files
+
+
+def single_pass_parse(response, matcher):
+    page = extract_page(response, matcher.scanner(normalize_text))
+    if page.exclusion:
+        return page.exclusion
+    return page.matches, page.text, page.hrefs
+
+
+def measure(func, body, matcher, repeat):
+    def fresh_response():
+        # Respuesta nueva en cada vuelta: el parseo lxml es parte del coste
+        return HtmlResponse(url='https://www.miteco.gob.es/es/energia/index.html', body=body, encoding='utf-8')
+
+    cpu = 0.0
+    for _ in range(repeat):
+        response = fresh_response()
+        start = time.process_time()
+        func(response, matcher)
+        cpu += time.process_time() - start
+
+    # El pico de memoria se mide aparte: tracemalloc distorsiona los tiempos
+    response = fresh_response()
+    tracemalloc.start()
+    func(response, matcher)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return cpu / repeat, peak
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--paragraphs', type=int, default=5000)
+    parser.add_argument('--links', type=int, default=3000)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    matcher = TermMatcher(
+        {'autoconsumo': 'autoconsumo', 'tramitacion': 'tramitación'},
+        {'pagina no encontrada': 'Página no encontrada', 'publicidad': 'publicidad'},
+    )
+    for label, exclusion in (('sin exclusión', False), ('con exclusión', True)):
+        body = build_portal_page(args.paragraphs, args.links, exclusion=exclusion)
+        legacy_cpu, legacy_peak = measure(legacy_parse, body, matcher, args.repeat)
+        new_cpu, new_peak = measure(single_pass_parse, body, matcher, args.repeat)
+        print(f"Página {len(body) / 1024:.0f} KB ({label})")
+        print(f"  legacy:       {legacy_cpu * 1000:8.1f} ms CPU · pico {legacy_peak / 1024:8.0f} KB")
+        print(f"  recorrido 1x: {new_cpu * 1000:8.1f} ms CPU · pico {new_peak / 1024:8.0f} KB")
+
+
+if __name__ == '__main__':
+    main()
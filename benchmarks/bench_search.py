@@ -0,0 +1,78 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Benchmark del índice de búsqueda (searchindex.py): tiempo de indexación y
+latencia de /api/search con muchas ejecuciones indexadas.
+
+Uso: python benchmarks/bench_search.py [--executions N] [--pages N] [--words N] [--queries N]
+"""
+
+import argparse
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(BASE_DIR, 'autoconsumo_scraper_scrapy'))
+
+from autoconsumo_scraper_scrapy.searchindex import SearchIndex  # noqa: E402
+
+VOCABULARY = (
+    'autoconsumo colectivo compartido instalación fotovoltaica placas solares subvención ayudas '
+    'tramitación comunidad energética excedentes compensación simplificada red distribución '
+    'potencia kilovatio almacenamiento baterías contador bidireccional comercializadora peaje '
+    'cargos real decreto boletín oficial convocatoria plazo solicitud beneficiarios vivienda '
+    'empresa polígono cubierta tejado inversor rendimiento mantenimiento licencia municipal'
+).split()
+
+QUERIES = ('autoconsumo colectivo', 'subvención baterías', '"compensación simplificada"',
+           'comunidad energética', 'tramita*', 'real decreto convocatoria', 'inversor')
+
+
+def build_index(path, executions, pages, words):
+    rng = random.Random(42)
+    index = SearchIndex(path)
+    started = time.perf_counter()
+    for execution in range(executions):
+        execution_id = f"2025-01-{execution // 24 + 1:02d}_{execution % 24:02d}-00-00"
+        for page in range(pages):
+            text = ' '.join(rng.choice(VOCABULARY) for _ in range(words))
+            index.add_page(execution_id, f"pagina{page}_{execution:04x}.txt",
+                           f"https://www.idae.es/ayudas/{execution}/{page}.html", text,
+                           source_index=page % 20, terms=rng.sample(VOCABULARY[:8], 2))
+    index.commit()
+    return index, time.perf_counter() - started
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--executions', type=int, default=300)
+    parser.add_argument('--pages', type=int, default=100)
+    parser.add_argument('--words', type=int, default=400)
+    parser.add_argument('--queries', type=int, default=50)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'search_index.sqlite3')
+        index, seconds = build_index(path, args.executions, args.pages, args.words)
+        total_pages = args.executions * args.pages
+        size_mb = os.path.getsize(path) / (1024 * 1024)
+        print(f"Indexadas {total_pages} páginas de {args.executions} ejecuciones en {seconds:.1f} s "
+              f"({total_pages / seconds:.0f} páginas/s) · {size_mb:.1f} MB")
+
+        for query in QUERIES:
+            timings = []
+            for i in range(args.queries):
+                started = time.perf_counter()
+                total, _ = index.search(query, page=1 + i % 5, per_page=20)
+                timings.append((time.perf_counter() - started) * 1000)
+            print(f"{query:32s} {total:7d} resultados · mediana {statistics.median(timings):7.2f} ms · "
+                  f"máx {max(timings):7.2f} ms")
+        index.close()
+
+
+if __name__ == '__main__':
+    main()
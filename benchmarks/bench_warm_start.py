@@ -0,0 +1,176 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Benchmark del arranque de una ejecución: tiempo hasta la primera petición
+HTTP y hasta el final del proceso con `python run_scraper.py` nuevo (en
+frío) frente al proceso en caliente (`run_scraper.py --serve`, warmworker.py).
+
+Cada ejecución rastrea una página de un servidor local, así que el tiempo
+total es casi todo arranque y cierre. El servidor hace de proxy HTTP
+(`http_proxy`) para que la fuente sea un dominio sin puerto, como las reales.
+
+Uso: python benchmarks/bench_warm_start.py [--runs N]
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(BASE_DIR, 'autoconsumo_scraper_scrapy'))
+
+from autoconsumo_scraper_scrapy.warmworker import launch_warm  # noqa: E402
+
+SOURCE_URL = 'http://autoconsumo.test/index.html'
+PAGE = b'<html><body><h1>Autoconsumo</h1><p>Ayudas al autoconsumo colectivo.</p></body></html>'
+
+
+class FirstRequest:
+    """Momento de la primera petición recibida desde el último `reset`."""
+
+    def __init__(self):
+        self.event = threading.Event()
+        self.at = None
+
+    def reset(self):
+        self.at = None
+        self.event.clear()
+
+    def hit(self):
+        if self.at is None:
+            self.at = time.perf_counter()
+            self.event.set()
+
+
+def start_server(first_request):
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            first_request.hit()
+            body = PAGE if self.path.endswith('.html') else b''
+            self.send_response(200 if body else 404)
+            self.send_header('Content-Type', 'text/html; charset=utf-8')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def write_config(tmp, name):
+    execution_dir = os.path.join(tmp, 'ejecuciones', name)
+    documents_dir = os.path.join(execution_dir, 'autoconsumo_documents')
+    os.makedirs(documents_dir)
+    fuentes_file = os.path.join(execution_dir, 'fuentes.csv')
+    with open(fuentes_file, 'w', encoding='utf-8') as f:
+        f.write(f'Benchmark;{SOURCE_URL}\n')
+    terminos_file = os.path.join(execution_dir, 'terminos_interes.txt')
+    with open(terminos_file, 'w', encoding='utf-8') as f:
+        f.write('autoconsumo\n')
+    config_file = os.path.join(execution_dir, 'scraper_config.json')
+    with open(config_file, 'w', encoding='utf-8') as f:
+        json.dump({
+            'execution_dir': execution_dir,
+            'documents_dir': documents_dir,
+            'fuentes_file': fuentes_file,
+            'terminos_file': terminos_file,
+            'exclusiones_file': None,
+            'http_cache_dir': os.path.join(tmp, 'http_cache'),
+            'blob_store_dir': os.path.join(tmp, 'blob_store'),
+            'search_index_file': os.path.join(tmp, 'search_index.sqlite3'),
+            'user_config': {'max_depth': 0, 'http_cache': False, 'resumable': False,
+                            'search_index': False, 'shared_blobs': False}
+        }, f)
+    return config_file
+
+
+def measure(first_request, launch):
+    first_request.reset()
+    started = time.perf_counter()
+    process = launch()
+    if not first_request.event.wait(60):
+        raise RuntimeError('El scraper no llegó a hacer ninguna petición')
+    returncode = process.wait(timeout=120)
+    finished = time.perf_counter()
+    if returncode != 0:
+        raise RuntimeError(f'El scraper terminó con código {returncode}')
+    return first_request.at - started, finished - started
+
+
+def proxy_env(port):
+    env = dict(os.environ, http_proxy=f'http://127.0.0.1:{port}')
+    env.pop('no_proxy', None)
+    env.pop('NO_PROXY', None)
+    return env
+
+
+def launch_cold(config_file, env):
+    return subprocess.Popen([sys.executable, os.path.join(BASE_DIR, 'run_scraper.py'), config_file],
+                            cwd=BASE_DIR, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+
+
+def start_warm_worker(socket_path, env):
+    worker = subprocess.Popen([sys.executable, os.path.join(BASE_DIR, 'run_scraper.py'), '--serve', socket_path],
+                              cwd=BASE_DIR, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    started = time.perf_counter()
+    while not os.path.exists(socket_path):
+        if worker.poll() is not None:
+            raise RuntimeError('El proceso en caliente no ha arrancado')
+        if time.perf_counter() - started > 60:
+            raise RuntimeError('El proceso en caliente no ha creado su socket')
+        time.sleep(0.01)
+    return worker, time.perf_counter() - started
+
+
+def report(label, samples):
+    first = [sample[0] * 1000 for sample in samples]
+    total = [sample[1] * 1000 for sample in samples]
+    print(f"{label:<11} primera petición: mediana {statistics.median(first):7.1f} ms "
+          f"(mín {min(first):7.1f}) · total: mediana {statistics.median(total):7.1f} ms "
+          f"(mín {min(total):7.1f})")
+    return statistics.median(first)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--runs', type=int, default=5)
+    args = parser.parse_args()
+
+    first_request = FirstRequest()
+    server = start_server(first_request)
+    env = proxy_env(server.server_address[1])
+
+    with tempfile.TemporaryDirectory() as tmp:
+        cold = [measure(first_request, lambda: launch_cold(write_config(tmp, f'cold{run}'), env))
+                for run in range(args.runs)]
+
+        socket_path = os.path.join(tmp, 'warm_worker.sock')
+        worker, preload_seconds = start_warm_worker(socket_path, env)
+        try:
+            warm = [measure(first_request, lambda: launch_warm(socket_path, write_config(tmp, f'warm{run}')))
+                    for run in range(args.runs)]
+        finally:
+            worker.terminate()
+            worker.wait()
+
+    print(f"{args.runs} ejecuciones de una página por modo · arranque del proceso en caliente: "
+          f"{preload_seconds * 1000:.0f} ms (una vez)")
+    cold_first = report('En frío', cold)
+    warm_first = report('En caliente', warm)
+    print(f"Primera petición {cold_first / warm_first:.1f}x antes en caliente")
+    server.shutdown()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,53 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Reanaliza sin red las páginas guardadas de una ejecución con los términos y
+exclusiones actuales (ver autoconsumo_scraper_scrapy/reanalysis.py).
+
+Uso: python reanalyze.py <carpeta de ejecución> [--terminos F] [--exclusiones F] [--workers N] [--json]
+"""
+
+import argparse
+import json
+import os
+import sys
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(BASE_DIR, 'autoconsumo_scraper_scrapy'))
+
+from autoconsumo_scraper_scrapy.reanalysis import run_reanalysis  # noqa: E402
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Reanaliza las páginas guardadas de una ejecución.')
+    parser.add_argument('execution_dir', help='Carpeta de la ejecución (ejecuciones/<fecha>)')
+    parser.add_argument('--terminos', default=os.path.join(BASE_DIR, 'terminos_interes.txt'),
+                        help='Fichero de términos de interés (por defecto el actual)')
+    parser.add_argument('--exclusiones', default=os.path.join(BASE_DIR, 'exclusiones.txt'),
+                        help='Fichero de exclusiones (por defecto el actual)')
+    parser.add_argument('--documents-dir', default=None,
+                        help='Carpeta de documentos (por defecto <ejecución>/autoconsumo_documents)')
+    parser.add_argument('--workers', type=int, default=None, help='Procesos (por defecto uno por núcleo)')
+    parser.add_argument('--json', action='store_true', help='Escribe el resumen como JSON')
+    args = parser.parse_args(argv)
+
+    if not os.path.isdir(args.execution_dir):
+        print(f"No existe la ejecución: {args.execution_dir}", file=sys.stderr)
+        return 1
+
+    summary = run_reanalysis(args.execution_dir, args.terminos, args.exclusiones,
+                             workers=args.workers, documents_dir=args.documents_dir)
+    if args.json:
+        print(json.dumps(summary, ensure_ascii=False))
+        return 0
+    metrics = summary['metrics']
+    print(f"Páginas analizadas: {metrics['pages']} · con términos: {summary['matched']} · "
+          f"excluidas: {summary['excluded']}")
+    print(f"Rendimiento: {metrics['pages_per_second']:.1f} páginas/s con {metrics['workers']} procesos "
+          f"({metrics['pages_per_second_per_core']:.1f} páginas/s por núcleo)")
+    print(f"Resultado en {summary['output_dir']}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
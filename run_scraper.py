@@ -9,10 +9,15 @@ import sys
 import os
 import json
 import csv
-import unicodedata
+import math
+import shutil
+import signal
+import subprocess
+import time
 from datetime import datetime, timezone
 from pathlib import Path
 from typing import Any, Dict, List, Optional
+from urllib.parse import quote
 
 # Agregar el directorio de Scrapy al path
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
@@ -26,33 +31,33 @@ os.environ['SCRAPY_SETTINGS_MODULE'] = 'autoconsumo_scraper_scrapy.settings'
 from scrapy.crawler import CrawlerProcess
 from scrapy.utils.project import get_project_settings
 from autoconsumo_scraper_scrapy.spiders.generic_spider import GenericSpider
-from autoconsumo_scraper_scrapy.activity_log import write_activity
+from autoconsumo_scraper_scrapy.activity_log import get_writer, install_signal_flush, write_activity
+from autoconsumo_scraper_scrapy.textnorm import normalize_term
+from autoconsumo_scraper_scrapy.budget import format_size, parse_source_limits
+from autoconsumo_scraper_scrapy.blobstore import MANIFEST_NAME, BlobStore
+from autoconsumo_scraper_scrapy.pagestore import PageStore
+from autoconsumo_scraper_scrapy.searchindex import SEARCH_INDEX_NAME
+from autoconsumo_scraper_scrapy.sharding import (
+    SHARD_RESULT_NAME, LogTail, MergedStats, assign_shards, combine_status, load_assignment,
+    merge_log_lines, merge_near_duplicates, read_shard_result, save_assignment, shard_dir,
+    source_domain, write_shard_result,
+)
+from autoconsumo_scraper_scrapy.statuschannel import STATUS_NAME, clear_control, get_channel, read_control, read_json
 
+WARC_HANDLER = 'autoconsumo_scraper_scrapy.warc.WarcReplayDownloadHandler'
+FRONTIER_SCHEDULER = 'autoconsumo_scraper_scrapy.scheduler.SharedFrontierScheduler'
+# Segundos entre pasadas del coordinador de una ejecución repartida
+SHARD_POLL_INTERVAL = 0.5
 
-def normalize_text(text: str) -> str:
-    """Normaliza texto removiendo acentos y convirtiendo a minúsculas"""
-    text_norm = unicodedata.normalize('NFD', text)
-    stripped = ''.join(
-        c for c in text_norm if unicodedata.category(c) != 'Mn'
-    )
-    return stripped.lower()
 
-def write_status(status_file: Optional[str], updates: dict) -> None:
-    """Actualiza status.json de forma segura."""
+def write_status(status_file: Optional[str], updates: dict, flush: bool = True) -> None:
+    """
+    Actualiza el estado de la ejecución (ver statuschannel.py). Con
+    `flush=False` la escritura se agrupa con las siguientes.
+    """
     if not status_file:
         return
-    try:
-        current = {}
-        status_path = Path(status_file)
-        if status_path.exists():
-            try:
-                current = json.loads(status_path.read_text(encoding='utf-8'))
-            except json.JSONDecodeError:
-                current = {}
-        current.update(updates)
-        status_path.write_text(json.dumps(current, ensure_ascii=False, indent=2), encoding='utf-8')
-    except Exception as exc:
-        print(f"Advertencia al actualizar status.json: {exc}", file=sys.stderr)
+    get_channel(status_file).update(updates, flush=flush)
 
 def load_sources(csv_path: str) -> List[Dict[str, Any]]:
     """Carga las fuentes desde CSV devolviendo descripción, URL y columnas adicionales."""
@@ -79,33 +84,185 @@ def load_start_urls(csv_path: str) -> List[str]:
     """Carga únicamente las URLs iniciales desde el CSV."""
     return [source['url'] for source in load_sources(csv_path)]
 
-def build_summary(execution_dir: str, documents_dir: str, start_urls: List[str]) -> dict:
+def collect_cache_stats(stats) -> Optional[Dict[str, int]]:
+    """Extrae los contadores de la caché HTTP de las stats de Scrapy (None si no se usó)."""
+    if stats is None:
+        return None
+    values = stats.get_stats()
+    if not any(key.startswith('httpcache/') for key in values):
+        return None
+    return {
+        'hit': values.get('httpcache/hit', 0),
+        'revalidate': values.get('httpcache/revalidate', 0),
+        'invalidate': values.get('httpcache/invalidate', 0),
+        'miss': values.get('httpcache/miss', 0),
+        'evicted': values.get('httpcache/evicted', 0),
+    }
+
+
+def collect_header_filter_stats(stats) -> Optional[Dict[str, int]]:
+    """Descargas cortadas tras recibir las cabeceras y bytes ahorrados (None si no hubo)."""
+    if stats is None:
+        return None
+    values = stats.get_stats()
+    aborted = values.get('headerfilter/aborted', 0)
+    if not aborted:
+        return None
+    return {
+        'aborted': aborted,
+        'date': values.get('headerfilter/aborted/date', 0),
+        'content_type': values.get('headerfilter/aborted/content_type', 0),
+        'direct_file': values.get('headerfilter/aborted/direct_file', 0),
+        'bytes_saved': values.get('headerfilter/bytes_saved', 0),
+        'unknown_length': values.get('headerfilter/unknown_length', 0),
+    }
+
+
+def collect_blob_stats(stats) -> Optional[Dict[str, int]]:
+    """Ficheros nuevos y reutilizados del almacén de documentos (None si no se guardó ninguno)."""
+    if stats is None:
+        return None
+    values = stats.get_stats()
+    if not any(key.startswith('blobstore/') for key in values):
+        return None
+    return {
+        'new': values.get('blobstore/new', 0),
+        'reused': values.get('blobstore/reused', 0),
+        'bytes_reused': values.get('blobstore/bytes_reused', 0),
+    }
+
+
+def collect_warc_stats(stats) -> Optional[Dict[str, int]]:
+    """Respuestas grabadas en WARC y servidas desde WARC (None si no se usó)."""
+    if stats is None:
+        return None
+    values = stats.get_stats()
+    if not any(key.startswith('warc/') for key in values):
+        return None
+    return {
+        'records': values.get('warc/records', 0),
+        'bytes': values.get('warc/bytes', 0),
+        'replay_hit': values.get('warc/replay/hit', 0),
+        'replay_missing': values.get('warc/replay/missing', 0),
+    }
+
+
+def collect_frontier_stats(stats) -> Optional[Dict[str, int]]:
+    """Peticiones de la frontera compartida atendidas por este nodo (None si no se usó)."""
+    if stats is None:
+        return None
+    values = stats.get_stats()
+    if not any(key.startswith('frontier/') for key in values):
+        return None
+    return {
+        'enqueued': values.get('frontier/enqueued', 0),
+        'leased': values.get('frontier/leased', 0),
+        'reclaimed': values.get('frontier/reclaimed', 0),
+        'released': values.get('frontier/released', 0),
+        'abandoned': values.get('frontier/abandoned', 0),
+        'declined': values.get('frontier/declined', 0),
+    }
+
+
+def build_summary(execution_dir: str, documents_dir: str, start_urls: List[str],
+                  cache_stats: Optional[Dict[str, int]] = None,
+                  header_stats: Optional[Dict[str, int]] = None,
+                  near_duplicates: Optional[Dict[str, List[List[Any]]]] = None,
+                  blob_stats: Optional[Dict[str, int]] = None,
+                  warc_stats: Optional[Dict[str, int]] = None,
+                  frontier_stats: Optional[Dict[str, int]] = None) -> dict:
     """Genera el fichero procesados.md con un resumen básico de la ejecución."""
     exec_path = Path(execution_dir)
     docs_path = Path(documents_dir)
     procesados_path = exec_path / 'procesados.md'
 
+    def page_link(name: str) -> str:
+        return f"[{name}](/api/pages/{quote(name)}?execution={quote(exec_path.name)})"
+
     txt_files = sorted(docs_path.glob('*.txt'))
     html_files = sorted(docs_path.glob('*.html'))
     other_files = sorted(
         [p for p in docs_path.glob('*') if p.is_file() and p.suffix.lower() not in {'.txt', '.html'}]
     )
+    # Páginas guardadas en segmentos comprimidos (page_storage = 'segments')
+    page_store = PageStore.open(documents_dir)
+    stored_txt = sorted(page_store.entries('txt'), key=lambda entry: entry['name']) if page_store else []
+    stored_html = sorted(page_store.entries('html'), key=lambda entry: entry['name']) if page_store else []
+    txt_count = len(txt_files) + len(stored_txt)
+    html_count = len(html_files) + len(stored_html)
 
     lines = [
         "# Resumen de la ejecución",
         "",
         f"- Fecha de finalización: {datetime.now().isoformat(timespec='seconds')}",
         f"- URLs iniciales: {len(start_urls)}",
-        f"- Archivos .txt generados: {len(txt_files)}",
-        f"- Archivos .html generados: {len(html_files)}",
+        f"- Archivos .txt generados: {txt_count}",
+        f"- Archivos .html generados: {html_count}",
         f"- Otros archivos descargados: {len(other_files)}",
-        ""
     ]
+    if page_store is not None:
+        lines.append(
+            f"- Páginas en segmentos comprimidos: {len(page_store)} "
+            f"({format_size(page_store.raw_bytes())} → {format_size(page_store.stored_bytes())})"
+        )
+    if cache_stats is not None:
+        lines.append(
+            f"- Caché HTTP: {cache_stats['hit']} aciertos · "
+            f"{cache_stats['revalidate']} revalidadas sin cambios (304) · "
+            f"{cache_stats['invalidate']} modificadas · {cache_stats['miss']} fallos"
+        )
+    if header_stats is not None:
+        lines.append(
+            f"- Descargas cortadas tras las cabeceras: {header_stats['aborted']} "
+            f"(fecha: {header_stats['date']} · tipo: {header_stats['content_type']} · "
+            f"ficheros directos: {header_stats['direct_file']}) · "
+            f"{header_stats['bytes_saved'] / (1024 * 1024):.1f} MB ahorrados"
+        )
+    if blob_stats is not None:
+        lines.append(
+            f"- Almacén de documentos: {blob_stats['new']} nuevos · {blob_stats['reused']} ya guardados "
+            f"({format_size(blob_stats['bytes_reused'])} sin escribir)"
+        )
+    if warc_stats is not None and warc_stats['records']:
+        lines.append(
+            f"- Grabadas en WARC: {warc_stats['records']} respuestas ({format_size(warc_stats['bytes'])})"
+        )
+    if warc_stats is not None and (warc_stats['replay_hit'] or warc_stats['replay_missing']):
+        lines.append(
+            f"- Reproducción WARC: {warc_stats['replay_hit']} respuestas servidas · "
+            f"{warc_stats['replay_missing']} URLs no grabadas"
+        )
+    if frontier_stats is not None:
+        lines.append(
+            f"- Frontera compartida: {frontier_stats['leased']} peticiones atendidas en este nodo · "
+            f"{frontier_stats['enqueued']} encoladas · {frontier_stats['reclaimed']} recuperadas de nodos caídos"
+        )
+    duplicate_count = sum(len(variants) for variants in near_duplicates.values()) if near_duplicates else 0
+    if near_duplicates is not None:
+        lines.append(
+            f"- Páginas casi duplicadas omitidas: {duplicate_count} (en {len(near_duplicates)} grupos)"
+        )
+    lines.append("")
+
+    if near_duplicates:
+        lines.append("## Páginas casi duplicadas")
+        lines.append("")
+        for original, variants in sorted(near_duplicates.items()):
+            lines.append(f"- {original}")
+            for url, distance in variants:
+                lines.append(f"  - {url} (distancia {distance})")
+        lines.append("")
 
-    if txt_files or html_files or other_files:
+    if txt_count or html_count or other_files:
         lines.append("## Archivos guardados")
         lines.append("")
-        for file_path in txt_files + html_files + other_files:
+        # Las páginas enlazan a /api/pages, que las lee de segmentos o de disco
+        for entry in stored_txt + stored_html:
+            lines.append(f"- {page_link(entry['name'])} ({entry['size'] / 1024:.1f} KB)")
+        for file_path in txt_files + html_files:
+            size_kb = file_path.stat().st_size / 1024 if file_path.exists() else 0
+            lines.append(f"- {page_link(file_path.name)} ({size_kb:.1f} KB)")
+        for file_path in other_files:
             size_kb = file_path.stat().st_size / 1024 if file_path.exists() else 0
             lines.append(f"- {file_path.name} ({size_kb:.1f} KB)")
     else:
@@ -114,18 +271,266 @@ def build_summary(execution_dir: str, documents_dir: str, start_urls: List[str])
     procesados_path.write_text("\n".join(lines), encoding='utf-8')
     return {
         'start_urls': len(start_urls),
-        'txt_files': len(txt_files),
-        'html_files': len(html_files),
+        'txt_files': txt_count,
+        'html_files': html_count,
         'other_files': len(other_files),
+        'cache': cache_stats,
+        'header_filter': header_stats,
+        'near_duplicates': duplicate_count if near_duplicates is not None else None,
+        'blob_store': blob_stats,
+        'warc': warc_stats,
+        'frontier': frontier_stats,
     }
 
 
-def main(config_file_path):
+def finish_execution(stats, near_duplicate_clusters, execution_dir: str, documents_dir: str,
+                     start_urls: List[str], status_file: str, activity_log_file: str,
+                     resumable: bool, job_dir: str, shared_blobs: bool, blob_store_dir: str) -> None:
+    """
+    Cierre de la ejecución: resumen en activity.log y estado final (completada,
+    pausada o cancelada). `stats` son las del crawler o, en una ejecución
+    repartida, las sumadas de todos los procesos (sharding.MergedStats).
+    """
+    finish_reason = stats.get_value('finish_reason') if stats else None
+    cache_stats = collect_cache_stats(stats)
+    header_stats = collect_header_filter_stats(stats)
+    blob_stats = collect_blob_stats(stats)
+    warc_stats = collect_warc_stats(stats)
+    frontier_stats = collect_frontier_stats(stats)
+    summary = build_summary(execution_dir, documents_dir, start_urls,
+                            cache_stats=cache_stats, header_stats=header_stats,
+                            near_duplicates=near_duplicate_clusters,
+                            blob_stats=blob_stats, warc_stats=warc_stats,
+                            frontier_stats=frontier_stats)
+    write_activity(
+        activity_log_file,
+        'Sistema',
+        'INFO',
+        f"Resumen: textos={summary['txt_files']} · html={summary['html_files']} · otros={summary['other_files']}"
+    )
+    if cache_stats is not None:
+        write_activity(
+            activity_log_file,
+            'Sistema',
+            'INFO',
+            f"Caché HTTP: aciertos={cache_stats['hit']} · revalidadas={cache_stats['revalidate']} · "
+            f"modificadas={cache_stats['invalidate']} · fallos={cache_stats['miss']} · "
+            f"eliminadas={cache_stats['evicted']}"
+        )
+    if header_stats is not None:
+        write_activity(
+            activity_log_file,
+            'Sistema',
+            'INFO',
+            f"Descargas cortadas tras las cabeceras: {header_stats['aborted']} · "
+            f"{header_stats['bytes_saved'] / (1024 * 1024):.1f} MB ahorrados"
+        )
+    if blob_stats is not None:
+        write_activity(
+            activity_log_file,
+            'Sistema',
+            'INFO',
+            f"Almacén de documentos: nuevos={blob_stats['new']} · reutilizados={blob_stats['reused']} · "
+            f"{format_size(blob_stats['bytes_reused'])} sin escribir"
+        )
+    if warc_stats is not None and (warc_stats['replay_hit'] or warc_stats['replay_missing']):
+        write_activity(
+            activity_log_file,
+            'Sistema',
+            'INFO',
+            f"Reproducción WARC: servidas={warc_stats['replay_hit']} · no grabadas={warc_stats['replay_missing']}"
+        )
+    if frontier_stats is not None:
+        write_activity(
+            activity_log_file,
+            'Sistema',
+            'INFO',
+            f"Frontera compartida: atendidas={frontier_stats['leased']} · encoladas={frontier_stats['enqueued']} · "
+            f"recuperadas={frontier_stats['reclaimed']} · devueltas={frontier_stats['released']} · "
+            f"descartadas={frontier_stats['abandoned']} · cedidas={frontier_stats['declined']}"
+        )
+    if near_duplicate_clusters:
+        write_activity(
+            activity_log_file,
+            'Sistema',
+            'INFO',
+            f"Páginas casi duplicadas omitidas: {summary['near_duplicates']} "
+            f"(en {len(near_duplicate_clusters)} grupos)"
+        )
+    if finish_reason == 'shutdown':
+        # Parada ordenada (pausa o cancelación): la cola queda en JOBDIR
+        control_request = read_control(execution_dir).get('request')
+        if control_request == 'pause':
+            write_status(status_file, {
+                'status': 'paused',
+                'resumable': resumable,
+                'current_url': None,
+                'current_description': None,
+                'message': 'Ejecución pausada' if resumable else 'Ejecución detenida (no reanudable)',
+                'finished_at': datetime.now().isoformat(timespec='seconds')
+            })
+            write_activity(activity_log_file, 'Sistema', 'INFO', "Ejecución pausada")
+        elif control_request == 'cancel':
+            write_status(status_file, {
+                'status': 'idle',
+                'current_url': None,
+                'current_description': None,
+                'message': 'Cancelado por el usuario',
+                'finished_at': datetime.now().isoformat(timespec='seconds')
+            })
+            write_activity(activity_log_file, 'Sistema', 'INFO', "Ejecución cancelada")
+        else:
+            write_status(status_file, {'finished_at': datetime.now().isoformat(timespec='seconds')})
+            write_activity(activity_log_file, 'Sistema', 'INFO', "Ejecución detenida")
+        print("Scraping detenido.")
+        return
+
+    if resumable:
+        shutil.rmtree(job_dir, ignore_errors=True)
+    if shared_blobs:
+        # Blobs de ejecuciones que ya se han borrado
+        removed, freed = BlobStore(blob_store_dir).collect_garbage(os.path.dirname(execution_dir))
+        if removed:
+            write_activity(
+                activity_log_file,
+                'Sistema',
+                'INFO',
+                f"Almacén de documentos: {removed} ficheros sin referencias eliminados ({format_size(freed)})"
+            )
+    write_status(status_file, {
+        'status': 'idle',
+        'resumable': False,
+        'current': len(start_urls),
+        'total': len(start_urls),
+        'current_url': None,
+        'current_description': None,
+        'current_index': len(start_urls),
+        'message': 'Scraping completado',
+        'finished_at': datetime.now().isoformat(timespec='seconds')
+    })
+    write_activity(activity_log_file, 'Sistema', 'INFO', "Scraping completado correctamente")
+    print("Scraping completado.")
+
+
+def fail_execution(status_file: str, activity_log_file: str, exc: Exception) -> None:
+    write_status(status_file, {
+        'status': 'error',
+        'message': f'Error durante la ejecución: {exc}',
+        'current_url': None,
+        'current_description': None,
+        'finished_at': datetime.now().isoformat(timespec='seconds')
+    })
+    write_activity(activity_log_file, 'Sistema', 'ERROR', f"Error durante la ejecución: {exc}")
+
+
+def run_shards(config: dict, shards: List[List[int]], start_urls: List[str], resume: bool,
+               status_file: str, activity_log_file: str, job_dir: str) -> List[dict]:
+    """
+    Ejecución repartida por dominios (sharding.py): lanza un run_scraper.py por
+    grupo de fuentes en shards/NN/ y, hasta que terminan todos, pasa sus líneas
+    nuevas de activity.log al de la ejecución y suma sus estados en status.json.
+    Devuelve el shard_result.json de cada proceso.
+    """
+    execution_dir = config['execution_dir']
+    user_config = config['user_config']
+    max_pages = user_config.get('max_pages') or 0
+    if user_config.get('resumable', True):
+        save_assignment(job_dir, shards)
+
+    directories = [shard_dir(execution_dir, shard_id) for shard_id in range(len(shards))]
+    processes = []
+    tails = []
+    for shard_id, (directory, sources) in enumerate(zip(directories, shards)):
+        os.makedirs(directory, exist_ok=True)
+        result = read_shard_result(directory)
+        if resume and result is not None and result.get('finish_reason') != 'shutdown':
+            # Terminó en una sesión anterior
+            continue
+        shard_resume = resume and os.path.isdir(os.path.join(directory, 'jobdir'))
+        Path(directory, SHARD_RESULT_NAME).unlink(missing_ok=True)
+        shard_config = dict(config, execution_dir=directory, shard={
+            'id': shard_id,
+            'count': len(shards),
+            'sources': sources,
+            'execution_dir': execution_dir,
+        })
+        if max_pages:
+            # El límite de páginas se reparte según el número de fuentes
+            shard_pages = max(1, math.ceil(max_pages * len(sources) / len(start_urls)))
+            shard_config['user_config'] = dict(user_config, max_pages=shard_pages)
+        config_path = os.path.join(directory, 'scraper_config.json')
+        with open(config_path, 'w', encoding='utf-8') as f:
+            json.dump(shard_config, f, indent=2, ensure_ascii=False)
+
+        shard_log = os.path.join(directory, 'activity.log')
+        tails.append(LogTail.from_end(shard_log) if shard_resume else LogTail(shard_log))
+        if not shard_resume:
+            Path(shard_log).unlink(missing_ok=True)
+        domains = len({source_domain(start_urls[idx]) for idx in sources})
+        write_activity(
+            activity_log_file, 'Sistema', 'INFO',
+            f"Proceso {shard_id + 1}/{len(shards)}: {len(sources)} fuentes de {domains} dominios"
+            + (" (reanudado)" if shard_resume else "")
+        )
+        args = [sys.executable, os.path.abspath(__file__), config_path]
+        if shard_resume:
+            args.append('--resume')
+        # Grupo propio: sólo reciben las señales que les reenvía el coordinador
+        if os.name == 'nt':
+            process = subprocess.Popen(args, cwd=BASE_DIR, creationflags=subprocess.CREATE_NEW_PROCESS_GROUP)
+        else:
+            process = subprocess.Popen(args, cwd=BASE_DIR, start_new_session=True)
+        processes.append(process)
+
+    def forward_signal(signum, frame):
+        # Pausa o cancelación: parada ordenada de cada proceso (su cola queda en su JOBDIR)
+        for process in processes:
+            if process.poll() is None:
+                process.send_signal(signal.CTRL_BREAK_EVENT if os.name == 'nt' else signum)
+
+    previous_handlers = {}
+    for name in ('SIGINT', 'SIGTERM', 'SIGBREAK'):
+        signum = getattr(signal, name, None)
+        if signum is not None:
+            previous_handlers[signum] = signal.signal(signum, forward_signal)
+
+    writer = get_writer(activity_log_file)
+    total = len(start_urls)
+    try:
+        while True:
+            running = sum(1 for process in processes if process.poll() is None)
+            for line in merge_log_lines([tail.read_lines() for tail in tails]):
+                writer.write(line)
+            status_files = [os.path.join(directory, STATUS_NAME) for directory in directories]
+            status_files.sort(key=lambda path: os.path.getmtime(path) if os.path.exists(path) else 0)
+            combined = combine_status([read_json(path) or {} for path in status_files], total)
+            progress_parts = [f"Procesando {combined['current']}/{total}", f"{running} procesos"]
+            if combined['current_description'] or combined['current_url']:
+                progress_parts.append(combined['current_description'] or combined['current_url'])
+            write_status(status_file, dict(combined, message=" · ".join(progress_parts)), flush=False)
+            if not running:
+                break
+            time.sleep(SHARD_POLL_INTERVAL)
+    finally:
+        for signum, handler in previous_handlers.items():
+            signal.signal(signum, handler)
+
+    results = []
+    for shard_id, directory in enumerate(directories):
+        result = read_shard_result(directory)
+        if result is None:
+            raise RuntimeError(f"El proceso {shard_id + 1}/{len(shards)} terminó sin resultado (ver {directory}/scraper.log)")
+        results.append(result)
+    return results
+
+
+def main(config_file_path, resume=False):
     """
     Función principal que ejecuta el scraper.
 
     Args:
         config_file_path: Ruta al archivo JSON con la configuración
+        resume: Reanudar la ejecución desde su JOBDIR en lugar de empezar de cero
     """
     # 1. Leer configuración desde el archivo JSON
     with open(config_file_path, 'r', encoding='utf-8') as f:
@@ -136,9 +541,31 @@ def main(config_file_path):
     fuentes_file = config['fuentes_file']
     terminos_file = config['terminos_file']
     exclusiones_file = config['exclusiones_file']
-    status_file = config.get('status_file')
+    # Proceso de una ejecución repartida por dominios (lo lanza run_shards):
+    # id, count, sources (índices en fuentes.csv) y execution_dir de la ejecución
+    shard = config.get('shard')
+    parent_dir = shard['execution_dir'] if shard else execution_dir
+    execution_id = os.path.basename(os.path.normpath(parent_dir))
+    # Estado en la carpeta de la ejecución (también en las creadas con un status_file global)
+    status_file = os.path.join(execution_dir, STATUS_NAME)
     activity_log_file = os.path.join(execution_dir, 'activity.log')
     user_config = config['user_config']
+    resumable = user_config.get('resumable', True)
+    http_cache = user_config.get('http_cache', True)
+    shared_blobs = user_config.get('shared_blobs', True)
+    page_storage = user_config.get('page_storage', 'files')
+    search_index = user_config.get('search_index', True)
+    search_index_file = config.get('search_index_file') or os.path.join(BASE_DIR, SEARCH_INDEX_NAME)
+    warc_output = user_config.get('warc_output', False)
+    warc_replay = user_config.get('warc_replay')
+    warc_replay_dir = config.get('warc_replay_dir') or (
+        os.path.join(BASE_DIR, 'ejecuciones', warc_replay, 'warc') if warc_replay else None
+    )
+    blob_store_dir = config.get('blob_store_dir') or os.path.join(BASE_DIR, 'blob_store')
+    frontier_url = user_config.get('frontier')
+    # Nodos de otras máquinas se unen a la ejecución con el mismo espacio de nombres
+    frontier_namespace = user_config.get('frontier_namespace') or execution_id
+    job_dir = os.path.join(execution_dir, 'jobdir')
 
     def normalize_date(value: Optional[str], is_end: bool = False) -> Optional[datetime]:
         if not value:
@@ -162,13 +589,29 @@ def main(config_file_path):
             print(f"Advertencia: no se pudo interpretar la fecha '{value}'", file=sys.stderr)
             return None
 
-    # Reiniciar activity log
-    Path(activity_log_file).write_text("", encoding='utf-8')
-    write_activity(activity_log_file, 'Sistema', 'INFO', f"Iniciando ejecución en {execution_dir}")
+    install_signal_flush()
+    # Peticiones de pausa o cancelación de una sesión anterior
+    clear_control(execution_dir)
+    write_status(status_file, {'status': 'running', 'execution': execution_id})
+    if resume:
+        if not os.path.isdir(job_dir):
+            raise RuntimeError(f"La ejecución {execution_dir} no tiene estado para reanudar")
+        if shard is None:
+            write_activity(activity_log_file, 'Sistema', 'INFO', f"Reanudando ejecución en {execution_dir}")
+    else:
+        # Reiniciar activity log
+        Path(activity_log_file).write_text("", encoding='utf-8')
+        if shard is None:
+            write_activity(activity_log_file, 'Sistema', 'INFO', f"Iniciando ejecución en {execution_dir}")
 
     # 2. Extraer configuración del usuario
     max_depth = user_config.get('max_depth', 3)
     crawl_strategy = user_config.get('crawl_strategy', 'continue')
+    seed_mode = user_config.get('seed_mode', 'links')
+    throttle_mode = user_config.get('throttle_mode', 'fixed')
+    max_pages = user_config.get('max_pages') or 0
+    near_duplicates = user_config.get('near_duplicates', True)
+    near_duplicate_distance = int(user_config.get('near_duplicate_distance', 3))
     file_types = user_config.get('file_types', ['documents'])
     download_scope = user_config.get('download_scope', 'same-domain')
     path_restriction = user_config.get('path_restriction', 'base-path')
@@ -188,12 +631,36 @@ def main(config_file_path):
         end_txt = end.astimezone(timezone.utc).strftime("%Y-%m-%d") if end else "--"
         return f"{start_txt} → {end_txt}"
 
-    write_activity(
-        activity_log_file,
-        'Sistema',
-        'INFO',
-        f"Config: profundidad={max_depth}, estrategia={crawl_strategy}, archivos={','.join(file_types)}, alcance={download_scope}, path={path_restriction}, fechas={format_filter_range(filter_start_dt, filter_end_dt)}"
-    )
+    def format_source_limits(limits: Dict[str, Any]) -> str:
+        parts = []
+        if 'max_depth' in limits:
+            parts.append(f"profundidad={limits['max_depth']}")
+        if 'max_pages' in limits:
+            parts.append(f"páginas={limits['max_pages']}")
+        if 'max_bytes' in limits:
+            parts.append(f"bytes={format_size(limits['max_bytes'])}")
+        if 'max_seconds' in limits:
+            parts.append(f"tiempo={limits['max_seconds']:.0f} s")
+        if 'crawl_strategy' in limits:
+            parts.append(f"estrategia={limits['crawl_strategy']}")
+        return ", ".join(parts)
+
+    def format_warc_mode() -> str:
+        modes = []
+        if warc_output:
+            modes.append('grabar')
+        if warc_replay_dir:
+            modes.append(f"reproducir {warc_replay or warc_replay_dir}")
+        return ' + '.join(modes) or 'no'
+
+    shard_count = int(user_config.get('shards', 1) or 1)
+    if shard is None:
+        write_activity(
+            activity_log_file,
+            'Sistema',
+            'INFO',
+            f"Config: profundidad={max_depth}, páginas={max_pages or 'sin límite'}, estrategia={crawl_strategy}, semillas={seed_mode}, ritmo={throttle_mode}, archivos={','.join(file_types)}, alcance={download_scope}, path={path_restriction}, fechas={format_filter_range(filter_start_dt, filter_end_dt)}, caché={'sí' if http_cache else 'no'}, warc={format_warc_mode()}, casi-duplicados={f'distancia ≤ {near_duplicate_distance}' if near_duplicates else 'no'}, procesos={shard_count}, frontera={f'{frontier_url} ({frontier_namespace})' if frontier_url else 'local'}"
+        )
     # 3. Leer URLs desde fuentes.csv
     sources: List[Dict[str, Any]] = []
     try:
@@ -211,7 +678,12 @@ def main(config_file_path):
         write_activity(activity_log_file, 'Sistema', 'ERROR', f"Error leyendo fuentes.csv: {e}")
         sys.exit(1)
 
-    start_urls = [source['url'] for source in sources]
+    indexed_sources = list(enumerate(sources))
+    if shard is not None:
+        # Sólo las fuentes de este proceso, con su posición en fuentes.csv
+        assigned = set(shard['sources'])
+        indexed_sources = [(idx, source) for idx, source in indexed_sources if idx in assigned]
+    start_urls = [source['url'] for _idx, source in indexed_sources]
     if not start_urls:
         print("No se encontraron URLs en fuentes.csv", file=sys.stderr)
         write_status(status_file, {
@@ -225,16 +697,45 @@ def main(config_file_path):
         write_activity(activity_log_file, 'Sistema', 'ERROR', "No se encontraron URLs válidas en fuentes.csv")
         sys.exit(1)
 
-    write_activity(activity_log_file, 'Sistema', 'INFO', f"{len(start_urls)} URLs iniciales cargadas")
+    if shard is None:
+        write_activity(activity_log_file, 'Sistema', 'INFO', f"{len(start_urls)} URLs iniciales cargadas")
 
-    source_lookup: Dict[str, Dict[str, Any]] = {
-        source['url']: {
+    if warc_replay_dir and not os.path.isdir(warc_replay_dir):
+        print(f"No se encontró la grabación WARC: {warc_replay_dir}", file=sys.stderr)
+        write_status(status_file, {
+            'status': 'error',
+            'message': f'No se encontró la grabación WARC de {warc_replay or warc_replay_dir}',
+            'finished_at': datetime.now().isoformat(timespec='seconds'),
+            'current_url': None,
+            'current_description': None,
+            'current_index': 0
+        })
+        write_activity(activity_log_file, 'Sistema', 'ERROR', f"No se encontró la grabación WARC: {warc_replay_dir}")
+        sys.exit(1)
+
+    source_lookup: Dict[str, Dict[str, Any]] = {}
+    for idx, source in indexed_sources:
+        # Límites propios de la fuente en las columnas adicionales (clave=valor)
+        limits, invalid = parse_source_limits(source.get('extra', []))
+        # En una ejecución repartida estos avisos los escribe el coordinador
+        for column in (invalid if shard is None else []):
+            write_activity(
+                activity_log_file, 'Sistema', 'WARNING',
+                f"Columna no reconocida en fuentes.csv, se ignora: {column}",
+                url_index=idx + 1
+            )
+        if limits and shard is None:
+            write_activity(
+                activity_log_file, 'Sistema', 'INFO',
+                f"Límites de la fuente: {format_source_limits(limits)}",
+                url_index=idx + 1
+            )
+        source_lookup[source['url']] = {
             'description': source.get('description', ''),
             'extra': source.get('extra', []),
+            'limits': limits,
             'index': idx
         }
-        for idx, source in enumerate(sources)
-    }
 
     # 4. Leer términos de interés
     keywords_map = {}
@@ -243,7 +744,7 @@ def main(config_file_path):
             for line in f:
                 stripped = line.strip()
                 if stripped and not stripped.startswith('#'):
-                    keywords_map[normalize_text(stripped)] = stripped
+                    keywords_map[normalize_term(stripped)] = stripped
 
     # 5. Leer exclusiones
     exclusions_map = {}
@@ -252,7 +753,24 @@ def main(config_file_path):
             for line in f:
                 stripped = line.strip()
                 if stripped and not stripped.startswith('#'):
-                    exclusions_map[normalize_text(stripped)] = stripped
+                    exclusions_map[normalize_term(stripped)] = stripped
+
+    finish_context = dict(
+        execution_dir=execution_dir, documents_dir=documents_dir, start_urls=start_urls,
+        status_file=status_file, activity_log_file=activity_log_file, resumable=resumable,
+        job_dir=job_dir, shared_blobs=shared_blobs, blob_store_dir=blob_store_dir,
+    )
+    if shard is None and shard_count > 1:
+        # Reparto por dominios; al reanudar, el mismo que en la primera sesión
+        shards = (load_assignment(job_dir) if resume else None) or assign_shards(start_urls, shard_count)
+        if len(shards) > 1:
+            try:
+                results = run_shards(config, shards, start_urls, resume, status_file, activity_log_file, job_dir)
+                finish_execution(MergedStats(results), merge_near_duplicates(results), **finish_context)
+            except Exception as exc:
+                fail_execution(status_file, activity_log_file, exc)
+                raise
+            return
 
     # 6. Configurar Scrapy
     # Obtener los settings del proyecto (ya configurados vía SCRAPY_SETTINGS_MODULE)
@@ -263,9 +781,62 @@ def main(config_file_path):
     settings.set('LOG_FILE', log_file, priority='cmdline')
     settings.set('FILES_STORE', documents_dir, priority='cmdline')
     settings.set('TEXT_FILES_STORE', documents_dir, priority='cmdline')
+    settings.set('PAGE_STORAGE', page_storage, priority='cmdline')
     settings.set('ACTIVITY_LOG_FILE', activity_log_file, priority='cmdline')
+    settings.set('STATUS_FILE', status_file, priority='cmdline')
     settings.set('FILTER_START_DATE', filter_start_iso, priority='cmdline')
     settings.set('FILTER_END_DATE', filter_end_iso, priority='cmdline')
+    if resumable:
+        # Cola del scheduler, peticiones vistas y estado del spider en disco
+        settings.set('JOBDIR', job_dir, priority='cmdline')
+    if throttle_mode == 'adaptive':
+        # Concurrencia y retardo por dominio según latencia, errores y 429/503
+        settings.set('ADAPTIVE_THROTTLE_ENABLED', True, priority='cmdline')
+        for option, setting_name in (
+            ('throttle_max_concurrency', 'ADAPTIVE_THROTTLE_MAX_CONCURRENCY'),
+            ('throttle_min_delay', 'ADAPTIVE_THROTTLE_MIN_DELAY'),
+            ('throttle_max_delay', 'ADAPTIVE_THROTTLE_MAX_DELAY'),
+        ):
+            value = user_config.get(option)
+            if value is not None and value != '':
+                settings.set(setting_name, value, priority='cmdline')
+    # Caché HTTP compartida por todas las ejecuciones (fuera de ejecuciones/<fecha>)
+    settings.set('HTTPCACHE_ENABLED', bool(http_cache), priority='cmdline')
+    settings.set('HTTPCACHE_DIR', config.get('http_cache_dir') or os.path.join(BASE_DIR, 'http_cache'), priority='cmdline')
+    if shared_blobs:
+        # Documentos descargados guardados una sola vez para todas las ejecuciones
+        settings.set('BLOB_STORE_DIR', blob_store_dir, priority='cmdline')
+        settings.set('BLOB_MANIFEST_FILE', os.path.join(parent_dir, MANIFEST_NAME), priority='cmdline')
+    if search_index:
+        # Páginas guardadas buscables desde /api/search (todas las ejecuciones)
+        settings.set('SEARCH_INDEX_FILE', search_index_file, priority='cmdline')
+        settings.set('SEARCH_EXECUTION_ID', execution_id, priority='cmdline')
+    if warc_output:
+        settings.set('WARC_OUTPUT_DIR', os.path.join(parent_dir, 'warc'), priority='cmdline')
+    if shard is not None:
+        # Segmentos de páginas y ficheros WARC con el número de proceso en el nombre
+        settings.set('SHARD_ID', shard['id'], priority='cmdline')
+    if frontier_url:
+        # Cola y URLs vistas compartidas con los demás nodos de la ejecución
+        settings.set('SCHEDULER', FRONTIER_SCHEDULER, priority='cmdline')
+        settings.set('FRONTIER_URL', frontier_url, priority='cmdline')
+        settings.set('FRONTIER_NAMESPACE', frontier_namespace, priority='cmdline')
+        for option, setting_name in (
+            ('frontier_lease_seconds', 'FRONTIER_LEASE_SECONDS'),
+            ('frontier_max_attempts', 'FRONTIER_MAX_ATTEMPTS'),
+        ):
+            value = user_config.get(option)
+            if value is not None and value != '':
+                settings.set(setting_name, value, priority='cmdline')
+    if warc_replay_dir:
+        # Respuestas de una ejecución anterior en lugar de la red: sin caché,
+        # sin esperas y sin límite por dominio
+        settings.set('WARC_REPLAY_DIR', warc_replay_dir, priority='cmdline')
+        settings.set('DOWNLOAD_HANDLERS', {'http': WARC_HANDLER, 'https': WARC_HANDLER}, priority='cmdline')
+        settings.set('HTTPCACHE_ENABLED', False, priority='cmdline')
+        settings.set('ADAPTIVE_THROTTLE_ENABLED', False, priority='cmdline')
+        settings.set('DOWNLOAD_DELAY', 0, priority='cmdline')
+        settings.set('CONCURRENT_REQUESTS_PER_DOMAIN', settings.getint('CONCURRENT_REQUESTS'), priority='cmdline')
 
     custom_user_agent = user_config.get('user_agent') or (
         'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 '
@@ -321,7 +892,7 @@ def main(config_file_path):
             'current_description': description,
             'current_index': current_index,
             'message': progress_message
-        })
+        }, flush=False)
         write_activity(
             activity_log_file,
             'Scrapy',
@@ -330,13 +901,15 @@ def main(config_file_path):
             url_index=current_index if isinstance(current_index, int) and current_index > 0 else None
         )
 
+    crawler = process.create_crawler(GenericSpider)
     process.crawl(
-        GenericSpider,
+        crawler,
         start_urls=start_urls,
         keywords_map=keywords_map,
         exclusions_map=exclusions_map,
         max_depth=max_depth,
         crawl_strategy=crawl_strategy,
+        seed_mode=seed_mode,
         file_types=file_types,
         download_scope=download_scope,
         path_restriction=path_restriction,
@@ -344,6 +917,8 @@ def main(config_file_path):
         save_html=save_html,
         start_date=filter_start_iso,
         end_date=filter_end_iso,
+        max_pages=max_pages,
+        near_duplicate_distance=near_duplicate_distance if near_duplicates else None,
         status_updater=update_progress,
         activity_log_path=activity_log_file,
         source_lookup=source_lookup
@@ -358,52 +933,102 @@ def main(config_file_path):
 
     try:
         process.start()  # Esto bloquea hasta que termine el scraping
-        summary = build_summary(execution_dir, documents_dir, start_urls)
-        write_activity(
-            activity_log_file,
-            'Sistema',
-            'INFO',
-            f"Resumen: textos={summary['txt_files']} · html={summary['html_files']} · otros={summary['other_files']}"
-        )
-        write_status(status_file, {
-            'status': 'idle',
-            'current': len(start_urls),
-            'total': len(start_urls),
-            'current_url': None,
-            'current_description': None,
-            'current_index': len(start_urls),
-            'message': 'Scraping completado',
-            'finished_at': datetime.now().isoformat(timespec='seconds')
-        })
-        write_activity(activity_log_file, 'Sistema', 'INFO', "Scraping completado correctamente")
-        print("Scraping completado.")
+        detector = getattr(crawler.spider, 'near_duplicates', None)
+        near_duplicate_clusters = detector.clusters if detector is not None else None
+        if shard is not None:
+            # Proceso de una ejecución repartida: el resumen lo hace el coordinador
+            write_shard_result(execution_dir, crawler.stats, near_duplicate_clusters)
+            if resumable and crawler.stats.get_value('finish_reason') != 'shutdown':
+                shutil.rmtree(job_dir, ignore_errors=True)
+            print("Proceso de la ejecución repartida terminado.")
+            return
+        finish_execution(crawler.stats, near_duplicate_clusters, **finish_context)
     except Exception as exc:
-        write_status(status_file, {
-            'status': 'error',
-            'message': f'Error durante la ejecución: {exc}',
-            'current_url': None,
-            'current_description': None,
-            'finished_at': datetime.now().isoformat(timespec='seconds')
-        })
-        write_activity(activity_log_file, 'Sistema', 'ERROR', f"Error durante la ejecución: {exc}")
+        fail_execution(status_file, activity_log_file, exc)
         raise
 
 
-if __name__ == '__main__':
-    if len(sys.argv) < 2:
-        print("Usage: python run_scraper.py <config_file_path>", file=sys.stderr)
-        sys.exit(1)
-
-    config_file = sys.argv[1]
-
+def run_job(config_file: str, resume: bool = False) -> int:
+    """Ejecuta una configuración y devuelve el código de salida del proceso."""
     if not os.path.exists(config_file):
         print(f"Error: Config file not found: {config_file}", file=sys.stderr)
-        sys.exit(1)
-
+        return 1
     try:
-        main(config_file)
+        main(config_file, resume=resume)
     except Exception as e:
         print(f"Error fatal: {e}", file=sys.stderr)
         import traceback
         traceback.print_exc()
+        return 1
+    return 0
+
+
+def preload_crawl_stack() -> int:
+    """
+    Importa los componentes que Scrapy cargaría al crear el crawler
+    (middlewares, extensiones, pipelines, manejadores de descarga, spiders),
+    para que los trabajos del proceso en caliente empiecen con todo cargado.
+    No instala el reactor: cada hijo instala el suyo.
+    """
+    from importlib import import_module
+    from scrapy.utils.misc import load_object
+
+    settings = get_project_settings()
+    paths = []
+    for key in ('DOWNLOADER_MIDDLEWARES_BASE', 'DOWNLOADER_MIDDLEWARES', 'SPIDER_MIDDLEWARES_BASE',
+                'SPIDER_MIDDLEWARES', 'EXTENSIONS_BASE', 'EXTENSIONS', 'ITEM_PIPELINES'):
+        paths.extend(settings.getdict(key))
+    # Sólo http(s): el manejador de FTP instala el reactor al importarse
+    handlers = settings.getdict('DOWNLOAD_HANDLERS_BASE')
+    paths.extend(handlers[scheme] for scheme in ('http', 'https') if handlers.get(scheme))
+    paths.append(WARC_HANDLER)
+    for key in ('SCHEDULER', 'DUPEFILTER_CLASS', 'STATS_CLASS', 'LOG_FORMATTER', 'SPIDER_LOADER_CLASS',
+                'HTTPCACHE_STORAGE', 'HTTPCACHE_POLICY', 'SCHEDULER_PRIORITY_QUEUE',
+                'SCHEDULER_DISK_QUEUE', 'SCHEDULER_MEMORY_QUEUE'):
+        paths.append(settings.get(key))
+    paths.append('autoconsumo_scraper_scrapy.logformatter.PoliteLogFormatter')
+    loaded = 0
+    for path in paths:
+        if not isinstance(path, str):
+            continue
+        try:
+            load_object(path)
+            loaded += 1
+        except Exception as exc:
+            print(f"Advertencia: no se pudo precargar {path}: {exc}", file=sys.stderr)
+    load_object(settings.get('SPIDER_LOADER_CLASS')).from_settings(settings.frozencopy())
+    reactor_path = settings.get('TWISTED_REACTOR')
+    if reactor_path:
+        import_module(reactor_path.rsplit('.', 1)[0])
+    if 'twisted.internet.reactor' in sys.modules:
+        raise RuntimeError('La precarga ha instalado un reactor de Twisted; los hijos no podrían usar el suyo')
+    return loaded
+
+
+def serve(socket_path: str) -> int:
+    """Proceso en caliente: precarga Scrapy y atiende trabajos en `socket_path` (ver warmworker.py)."""
+    from autoconsumo_scraper_scrapy.warmworker import serve as serve_jobs
+
+    if os.name == 'nt':
+        print("Error: el proceso en caliente necesita fork (no disponible en Windows)", file=sys.stderr)
+        return 1
+    os.chdir(BASE_DIR)
+    started = datetime.now()
+    loaded = preload_crawl_stack()
+    print(f"Precargados {loaded} componentes de Scrapy en {(datetime.now() - started).total_seconds():.2f}s")
+    serve_jobs(socket_path, run_job)
+    return 0
+
+
+if __name__ == '__main__':
+    if len(sys.argv) < 2:
+        print("Usage: python run_scraper.py <config_file_path> [--resume]", file=sys.stderr)
+        print("       python run_scraper.py --serve [socket_path]", file=sys.stderr)
         sys.exit(1)
+
+    if sys.argv[1] == '--serve':
+        from autoconsumo_scraper_scrapy.warmworker import SOCKET_NAME
+        socket_path = sys.argv[2] if len(sys.argv) > 2 else os.path.join(BASE_DIR, SOCKET_NAME)
+        sys.exit(serve(os.path.abspath(socket_path)))
+
+    sys.exit(run_job(sys.argv[1], resume='--resume' in sys.argv[2:]))
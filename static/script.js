@@ -23,6 +23,8 @@ document.addEventListener('DOMContentLoaded', () => {
     const procesadosOutput = document.getElementById('procesados-output');
     const startScrapeBtn = document.getElementById('start-scrape');
     const cancelScrapeBtn = document.getElementById('cancel-scrape');
+    const pauseScrapeBtn = document.getElementById('pause-scrape');
+    const resumeScrapeBtn = document.getElementById('resume-scrape');
     const scrapeStatusSpan = document.getElementById('scrape-status');
     const reloadFilesBtn = document.getElementById('reload-files');
     const fuentesPreview = document.getElementById('fuentes-preview-container');
@@ -33,6 +35,7 @@ document.addEventListener('DOMContentLoaded', () => {
     const saveButtons = document.querySelectorAll('.save-btn');
     const dedupeFuentesBtn = document.getElementById('dedupe-fuentes');
     const dedupeFeedback = document.getElementById('dedupe-feedback');
+    const reanalyzeBtn = document.getElementById('reanalyze-btn');
     const filterStartInput = document.getElementById('filter-start-date');
     const filterEndInput = document.getElementById('filter-end-date');
 
@@ -45,6 +48,8 @@ document.addEventListener('DOMContentLoaded', () => {
     let procesadosIntervalId = null;
     let pollingStartTimeout = null;
     let logGroupMode = 'chronological';
+    // Mientras se muestra un reanálisis, el polling no sustituye procesados.md
+    let showingReanalysis = false;
     const processedUrlBuckets = {
         markdown: new Set(),
         logs: new Set()
@@ -111,13 +116,89 @@ document.addEventListener('DOMContentLoaded', () => {
     const stopAllIntervals = () => {
         clearLiveInitialTimeouts();
         clearDataPollingIntervals();
+        stopLiveStream();
         if (scrapeStatusInterval) {
             clearInterval(scrapeStatusInterval);
             scrapeStatusInterval = null;
         }
     };
 
+    // Eventos en directo (/api/events, SSE) de la ejecución actual; si el
+    // navegador o el servidor no los admiten, se vuelve al polling
+    const LIVE_STREAM_RETRY_MS = 30000;
+    let liveEventSource = null;
+    let liveStreamRetryTimeout = null;
+    let liveStatus = {};
+
+    const stopLiveStream = () => {
+        if (liveStreamRetryTimeout) {
+            clearTimeout(liveStreamRetryTimeout);
+            liveStreamRetryTimeout = null;
+        }
+        if (liveEventSource) {
+            liveEventSource.close();
+            liveEventSource = null;
+        }
+    };
+
+    const startLiveStream = () => {
+        if (typeof EventSource === 'undefined' || isHistoricalMode()) {
+            return false;
+        }
+        stopLiveStream();
+        const source = new EventSource('/api/events');
+        liveEventSource = source;
+        liveStatus = {};
+        source.addEventListener('open', () => {
+            // Los eventos sustituyen al polling
+            clearDataPollingIntervals();
+            if (scrapeStatusInterval) {
+                clearInterval(scrapeStatusInterval);
+                scrapeStatusInterval = null;
+            }
+        });
+        source.addEventListener('status', event => {
+            // Sólo llegan los campos que cambian
+            liveStatus = { ...liveStatus, ...JSON.parse(event.data) };
+            applyScrapeStatus(liveStatus);
+        });
+        source.addEventListener('log', event => {
+            applyLogData(JSON.parse(event.data));
+        });
+        source.addEventListener('procesados', event => {
+            applyProcesados(JSON.parse(event.data));
+            fetchExecutionsList();
+        });
+        source.addEventListener('executions', () => {
+            fetchExecutionsList();
+        });
+        source.addEventListener('error', () => {
+            if (liveEventSource !== source) return;
+            console.warn('Eventos en directo no disponibles; se usa polling');
+            stopLiveStream();
+            startIntervalPolling();
+            if (!scrapeStatusInterval) {
+                scrapeStatusInterval = setInterval(updateScrapeStatus, 1000);
+            }
+            liveStreamRetryTimeout = setTimeout(() => {
+                liveStreamRetryTimeout = null;
+                startPolling();
+            }, LIVE_STREAM_RETRY_MS);
+        });
+        return true;
+    };
+
     const startPolling = () => {
+        clearDataPollingIntervals();
+        if (isHistoricalMode()) {
+            return;
+        }
+        if (!startLiveStream()) {
+            startIntervalPolling();
+        }
+    };
+
+    const startIntervalPolling = () => {
         clearDataPollingIntervals();
         if (isHistoricalMode()) {
             return;
@@ -145,6 +226,11 @@ document.addEventListener('DOMContentLoaded', () => {
     const applyModeToUi = (historical) => {
         setElementHidden(startScrapeBtn, historical);
         setElementHidden(cancelScrapeBtn, historical);
+        setElementHidden(pauseScrapeBtn, historical);
+        if (resumeScrapeBtn) {
+            const meta = historical ? findExecutionMeta(currentExecutionId) : null;
+            resumeScrapeBtn.style.display = meta && meta.resumable ? 'inline-block' : 'none';
+        }
         setElementHidden(toggleConfigBtn, historical);
         if (configPanel) {
             configPanel.classList.toggle('hidden', historical);
@@ -191,11 +277,13 @@ document.addEventListener('DOMContentLoaded', () => {
             executionSelector.value = executionId;
         }
         currentExecutionId = executionId;
+        showingReanalysis = false;
         stopAllIntervals();
         applyModeToUi(true);
         activateTab('fuentes-preview-container');
         resetProcessedUrlTracking();
         lastLogRawContent = '';
+        logCursor = null;
         loadFiles();
         loadProcesados();
         loadLogs();
@@ -223,11 +311,13 @@ document.addEventListener('DOMContentLoaded', () => {
             executionSelector.value = '__live';
         }
         currentExecutionId = null;
+        showingReanalysis = false;
         stopAllIntervals();
         applyModeToUi(false);
         highlightSourceByUrl(null);
         resetProcessedUrlTracking();
         lastLogRawContent = '';
+        logCursor = null;
         scheduleLiveDataLoads();
         pollingStartTimeout = setTimeout(() => {
             startPolling();
@@ -259,6 +349,27 @@ document.addEventListener('DOMContentLoaded', () => {
         } else {
             executionSelector.value = '__live';
         }
+        renderWarcReplayOptions();
+    };
+
+    // Ejecuciones con grabación WARC que se pueden reproducir
+    const renderWarcReplayOptions = () => {
+        const warcReplaySelect = document.getElementById('warc-replay');
+        if (!warcReplaySelect) return;
+        const previousValue = warcReplaySelect.value;
+        warcReplaySelect.innerHTML = '';
+        const networkOption = document.createElement('option');
+        networkOption.value = '';
+        networkOption.textContent = 'No (descargar de la red)';
+        warcReplaySelect.appendChild(networkOption);
+        executionsList.filter(exec => exec.warc).forEach(exec => {
+            const option = document.createElement('option');
+            option.value = exec.id;
+            option.textContent = exec.label || exec.id;
+            warcReplaySelect.appendChild(option);
+        });
+        const exists = executionsList.some(exec => exec.warc && exec.id === previousValue);
+        warcReplaySelect.value = exists ? previousValue : '';
     };
 
     const fetchExecutionsList = () => {
@@ -276,14 +387,32 @@ document.addEventListener('DOMContentLoaded', () => {
     // Configuración del Scraper (valores por defecto)
     let scraperConfig = {
         max_depth: 3,
+        max_pages: 0,
         crawl_strategy: 'continue',
+        seed_mode: 'links',
+        throttle_mode: 'fixed',
+        throttle_max_concurrency: 4,
+        throttle_min_delay: 0.25,
+        throttle_max_delay: 60,
+        shards: 1,
+        frontier: null,
+        frontier_namespace: null,
         file_types: ['documents'],
         download_scope: 'same-domain',
         path_restriction: 'base-path',
         save_page_text: true,
         save_html: true,
+        page_storage: 'files',
+        search_index: true,
+        shared_blobs: true,
+        near_duplicates: true,
+        near_duplicate_distance: 3,
         start_date: null,
-        end_date: null
+        end_date: null,
+        resumable: true,
+        http_cache: true,
+        warc_output: false,
+        warc_replay: null
     };
 
     console.log('Variables inicializadas');
@@ -335,13 +464,47 @@ document.addEventListener('DOMContentLoaded', () => {
     if (applyConfigBtn) {
         applyConfigBtn.addEventListener('click', () => {
             scraperConfig.max_depth = parseInt(document.getElementById('max-depth').value);
+            const maxPagesInput = document.getElementById('max-pages');
+            scraperConfig.max_pages = maxPagesInput ? (parseInt(maxPagesInput.value) || 0) : 0;
             scraperConfig.crawl_strategy = document.querySelector('input[name="crawl-strategy"]:checked').value;
+            const seedModeInput = document.querySelector('input[name="seed-mode"]:checked');
+            scraperConfig.seed_mode = seedModeInput ? seedModeInput.value : 'links';
+            const throttleModeInput = document.querySelector('input[name="throttle-mode"]:checked');
+            scraperConfig.throttle_mode = throttleModeInput ? throttleModeInput.value : 'fixed';
+            scraperConfig.throttle_max_concurrency = parseInt(document.getElementById('throttle-max-concurrency').value) || 4;
+            scraperConfig.throttle_min_delay = parseFloat(document.getElementById('throttle-min-delay').value) || 0;
+            scraperConfig.throttle_max_delay = parseFloat(document.getElementById('throttle-max-delay').value) || 60;
+            const shardsInput = document.getElementById('shards');
+            scraperConfig.shards = shardsInput ? Math.max(1, parseInt(shardsInput.value) || 1) : 1;
+            const frontierInput = document.getElementById('frontier');
+            scraperConfig.frontier = frontierInput && frontierInput.value.trim() ? frontierInput.value.trim() : null;
+            const frontierNamespaceInput = document.getElementById('frontier-namespace');
+            scraperConfig.frontier_namespace = frontierNamespaceInput && frontierNamespaceInput.value.trim() ? frontierNamespaceInput.value.trim() : null;
             scraperConfig.download_scope = document.querySelector('input[name="download-scope"]:checked').value;
             scraperConfig.path_restriction = document.querySelector('input[name="path-restriction"]:checked').value;
             scraperConfig.save_page_text = document.getElementById('save-page-text').checked;
             scraperConfig.save_html = document.getElementById('save-html').checked;
+            const pageStorageInput = document.querySelector('input[name="page-storage"]:checked');
+            scraperConfig.page_storage = pageStorageInput ? pageStorageInput.value : 'files';
+            const searchIndexInput = document.getElementById('search-index');
+            scraperConfig.search_index = searchIndexInput ? searchIndexInput.checked : true;
+            const sharedBlobsInput = document.getElementById('shared-blobs');
+            scraperConfig.shared_blobs = sharedBlobsInput ? sharedBlobsInput.checked : true;
+            const nearDuplicatesInput = document.getElementById('near-duplicates');
+            scraperConfig.near_duplicates = nearDuplicatesInput ? nearDuplicatesInput.checked : true;
+            const nearDuplicateDistanceInput = document.getElementById('near-duplicate-distance');
+            const nearDuplicateDistance = nearDuplicateDistanceInput ? parseInt(nearDuplicateDistanceInput.value) : 3;
+            scraperConfig.near_duplicate_distance = Number.isFinite(nearDuplicateDistance) ? nearDuplicateDistance : 3;
             scraperConfig.start_date = filterStartInput && filterStartInput.value ? filterStartInput.value : null;
             scraperConfig.end_date = filterEndInput && filterEndInput.value ? filterEndInput.value : null;
+            const resumableInput = document.getElementById('resumable');
+            scraperConfig.resumable = resumableInput ? resumableInput.checked : true;
+            const httpCacheInput = document.getElementById('http-cache');
+            scraperConfig.http_cache = httpCacheInput ? httpCacheInput.checked : true;
+            const warcOutputInput = document.getElementById('warc-output');
+            scraperConfig.warc_output = warcOutputInput ? warcOutputInput.checked : false;
+            const warcReplayInput = document.getElementById('warc-replay');
+            scraperConfig.warc_replay = warcReplayInput && warcReplayInput.value ? warcReplayInput.value : null;
 
             const selectedFileTypes = [];
             document.querySelectorAll('input[name="file-type"]:checked').forEach(checkbox => {
@@ -746,6 +909,50 @@ document.addEventListener('DOMContentLoaded', () => {
         });
     }
 
+    const REANALYZE_POLL_MS = 1000;
+
+    if (reanalyzeBtn) {
+        reanalyzeBtn.addEventListener('click', () => {
+            const originalText = reanalyzeBtn.textContent;
+            reanalyzeBtn.disabled = true;
+            reanalyzeBtn.textContent = 'Reanalizando...';
+            // El reanálisis corre en segundo plano: se consulta hasta que termina
+            const waitForReanalysis = (data) => {
+                if (data.state !== 'running') return data;
+                const query = data.execution ? `?execution=${encodeURIComponent(data.execution)}` : '';
+                return new Promise(resolve => setTimeout(resolve, REANALYZE_POLL_MS))
+                    .then(() => fetch(`/api/reanalyze${query}`))
+                    .then(response => response.json())
+                    .then(waitForReanalysis);
+            };
+            fetch('/api/reanalyze', {
+                method: 'POST',
+                headers: { 'Content-Type': 'application/json' },
+                body: JSON.stringify({ execution: currentExecutionId })
+            })
+                .then(response => response.json())
+                .then(waitForReanalysis)
+                .then(data => {
+                    if (data.error) {
+                        alert(data.error);
+                        return;
+                    }
+                    showingReanalysis = true;
+                    if (procesadosOutput) {
+                        procesadosOutput.innerHTML = marked.parse(data.content || '');
+                    }
+                })
+                .catch(error => {
+                    console.error('Error en el reanálisis:', error);
+                    alert('Error en el reanálisis');
+                })
+                .finally(() => {
+                    reanalyzeBtn.disabled = false;
+                    reanalyzeBtn.textContent = originalText;
+                });
+        });
+    }
+
     if (reloadFilesBtn) {
         reloadFilesBtn.addEventListener('click', () => {
             if (isHistoricalMode()) {
@@ -761,6 +968,7 @@ document.addEventListener('DOMContentLoaded', () => {
                     severity: 'info'
                 }];
                 lastLogRawContent = '';
+                logCursor = null;
                 updateLogDisplay(true);
                 refreshProcessedUrlsFromLogs();
             }
@@ -839,8 +1047,12 @@ document.addEventListener('DOMContentLoaded', () => {
     }
 
     const MAX_LOG_ENTRIES = 400;
+    // Líneas del log que se conservan al ir añadiendo lo nuevo
+    const MAX_LOG_RAW_LINES = 2000;
     const LOG_SEPARATOR = ' \u00B7 ';
     let lastLogRawContent = '';
+    // Offset del log ya recibido (`<ejecución>:<bytes>`); null = pedir la cola
+    let logCursor = null;
     let parsedLogEntries = [];
 
     const SOURCE_CLASS_MAP = {
@@ -1180,6 +1392,7 @@ document.addEventListener('DOMContentLoaded', () => {
         logClearBtn.addEventListener('click', () => {
             parsedLogEntries = [];
             lastLogRawContent = '';
+            logCursor = null;
             updateLogDisplay();
             refreshProcessedUrlsFromLogs();
             if (logLastUpdated) {
@@ -1191,11 +1404,112 @@ document.addEventListener('DOMContentLoaded', () => {
     if (logRefreshBtn) {
         logRefreshBtn.addEventListener('click', () => {
             lastLogRawContent = '';
+            logCursor = null;
             loadLogs();
         });
     }
 
     // --- Lógica de Scraping y Logs ---
+    // Avance por páginas (status.json → counters, ver progress.py)
+    const formatStatusCounters = (counters) => {
+        if (!counters) return '';
+        return [
+            `${counters.responses || 0}/${counters.requests || 0} respuestas`,
+            `${counters.queued || 0} en cola`,
+            `${counters.items || 0} items`
+        ].join(' · ');
+    };
+
+    // Resumen de la cola de ejecuciones (/api/scrape_status → jobs)
+    const formatJobCounts = (jobs) => {
+        if (!jobs || (jobs.running <= 1 && !jobs.queued)) return '';
+        const parts = [`${jobs.running}/${jobs.max_workers} ejecuciones en marcha`];
+        if (jobs.queued) parts.push(`${jobs.queued} esperando`);
+        return parts.join(' · ');
+    };
+
+    const applyScrapeStatus = (data) => {
+        let highlightTarget = null;
+        const isQueued = data.status === 'queued';
+        const isActive = data.status === 'running' || data.status === 'pausing';
+        if (pauseScrapeBtn) {
+            pauseScrapeBtn.style.display = isActive ? 'inline-block' : 'none';
+            pauseScrapeBtn.disabled = data.status !== 'running';
+            pauseScrapeBtn.textContent = data.status === 'pausing' ? 'Pausando...' : 'Pausar';
+        }
+        if (resumeScrapeBtn) {
+            const canResume = !isActive && !isQueued && (data.status === 'paused' || data.resumable === true);
+            resumeScrapeBtn.style.display = canResume ? 'inline-block' : 'none';
+            resumeScrapeBtn.dataset.execution = canResume && data.execution ? data.execution : '';
+        }
+
+        if (isActive || isQueued) {
+            // Otra ejecución no espera a ésta: se añade a la cola
+            if (startScrapeBtn) {
+                startScrapeBtn.disabled = false;
+                startScrapeBtn.textContent = 'Añadir a la cola';
+            }
+            if (cancelScrapeBtn) {
+                cancelScrapeBtn.disabled = false;
+                cancelScrapeBtn.textContent = 'Cancelar Scraping';
+            }
+            if (scrapeStatusSpan) {
+                const totalRaw = Number(data.total);
+                const currentRaw = Number(data.current);
+                const total = Number.isFinite(totalRaw) ? totalRaw : 0;
+                const current = Number.isFinite(currentRaw) ? currentRaw : 0;
+                const parts = [];
+                if (total) {
+                    parts.push(`Procesando ${current}/${total}`);
+                }
+                const descriptor = data.current_description || data.current_url;
+                if (descriptor) {
+                    parts.push(descriptor);
+                }
+                const runningMessage = data.message || (parts.length ? parts.join(' · ') : 'Scraping en progreso...');
+                const statusParts = [runningMessage, formatStatusCounters(data.counters), formatJobCounts(data.jobs)];
+                scrapeStatusSpan.textContent = statusParts.filter(Boolean).join(' · ');
+            }
+            highlightTarget = data.current_url || null;
+        } else if (data.status === 'error') {
+            if (startScrapeBtn) {
+                startScrapeBtn.disabled = false;
+                startScrapeBtn.textContent = 'Reintentar scraping';
+            }
+            if (cancelScrapeBtn) {
+                cancelScrapeBtn.disabled = true;
+                cancelScrapeBtn.textContent = 'Cancelar';
+            }
+            if (scrapeStatusSpan) {
+                scrapeStatusSpan.textContent = data.message || 'Scraping detenido con errores.';
+            }
+            highlightTarget = null;
+            if (scrapeStatusInterval) {
+                clearInterval(scrapeStatusInterval);
+                scrapeStatusInterval = null;
+            }
+        } else {
+            if (startScrapeBtn) {
+                startScrapeBtn.disabled = false;
+                startScrapeBtn.textContent = 'Iniciar Scraping';
+            }
+            if (cancelScrapeBtn) {
+                cancelScrapeBtn.disabled = true;
+                cancelScrapeBtn.textContent = 'Cancelar';
+            }
+            if (scrapeStatusSpan) {
+                scrapeStatusSpan.textContent = data.message || '';
+            }
+            highlightTarget = null;
+            if (scrapeStatusInterval) {
+                clearInterval(scrapeStatusInterval);
+                scrapeStatusInterval = null;
+            }
+        }
+
+        highlightSourceByUrl(highlightTarget);
+    };
+
     const updateScrapeStatus = () => {
         if (isHistoricalMode()) {
             if (scrapeStatusSpan) {
@@ -1211,73 +1525,7 @@ document.addEventListener('DOMContentLoaded', () => {
                 clearTimeout(timeoutId);
                 return response.json();
             })
-            .then(data => {
-                let highlightTarget = null;
-
-                if (data.status === 'running') {
-                    if (startScrapeBtn) {
-                        startScrapeBtn.disabled = true;
-                        startScrapeBtn.textContent = 'Scraping en progreso...';
-                    }
-                    if (cancelScrapeBtn) {
-                        cancelScrapeBtn.disabled = false;
-                        cancelScrapeBtn.textContent = 'Cancelar Scraping';
-                    }
-                    if (scrapeStatusSpan) {
-                        const totalRaw = Number(data.total);
-                        const currentRaw = Number(data.current);
-                        const total = Number.isFinite(totalRaw) ? totalRaw : 0;
-                        const current = Number.isFinite(currentRaw) ? currentRaw : 0;
-                        const parts = [];
-                        if (total) {
-                            parts.push(`Procesando ${current}/${total}`);
-                        }
-                        const descriptor = data.current_description || data.current_url;
-                        if (descriptor) {
-                            parts.push(descriptor);
-                        }
-                        const runningMessage = data.message || (parts.length ? parts.join(' · ') : 'Scraping en progreso...');
-                        scrapeStatusSpan.textContent = runningMessage;
-                    }
-                    highlightTarget = data.current_url || null;
-                } else if (data.status === 'error') {
-                    if (startScrapeBtn) {
-                        startScrapeBtn.disabled = false;
-                        startScrapeBtn.textContent = 'Reintentar scraping';
-                    }
-                    if (cancelScrapeBtn) {
-                        cancelScrapeBtn.disabled = true;
-                        cancelScrapeBtn.textContent = 'Cancelar';
-                    }
-                    if (scrapeStatusSpan) {
-                        scrapeStatusSpan.textContent = data.message || 'Scraping detenido con errores.';
-                    }
-                    highlightTarget = null;
-                    if (scrapeStatusInterval) {
-                        clearInterval(scrapeStatusInterval);
-                        scrapeStatusInterval = null;
-                    }
-                } else {
-                    if (startScrapeBtn) {
-                        startScrapeBtn.disabled = false;
-                        startScrapeBtn.textContent = 'Iniciar Scraping';
-                    }
-                    if (cancelScrapeBtn) {
-                        cancelScrapeBtn.disabled = true;
-                        cancelScrapeBtn.textContent = 'Cancelar';
-                    }
-                    if (scrapeStatusSpan) {
-                        scrapeStatusSpan.textContent = data.message || '';
-                    }
-                    highlightTarget = null;
-                    if (scrapeStatusInterval) {
-                        clearInterval(scrapeStatusInterval);
-                        scrapeStatusInterval = null;
-                    }
-                }
-
-                highlightSourceByUrl(highlightTarget);
-            })
+            .then(applyScrapeStatus)
             .catch(error => {
                 clearTimeout(timeoutId);
                 console.error('Error fetching scrape status:', error);
@@ -1298,6 +1546,7 @@ document.addEventListener('DOMContentLoaded', () => {
                     severity: 'info'
                 }];
                 lastLogRawContent = '';
+                logCursor = null;
                 updateLogDisplay(true);
             }
             startScrapeBtn.disabled = true;
@@ -1309,7 +1558,7 @@ document.addEventListener('DOMContentLoaded', () => {
             if (scrapeStatusSpan) scrapeStatusSpan.textContent = 'Inicializando...';
             highlightSourceByUrl(null);
 
-            if (!scrapeStatusInterval) {
+            if (!scrapeStatusInterval && !liveEventSource) {
                 scrapeStatusInterval = setInterval(updateScrapeStatus, 1000);
             }
 
@@ -1401,6 +1650,86 @@ document.addEventListener('DOMContentLoaded', () => {
         });
     }
 
+    if (pauseScrapeBtn) {
+        pauseScrapeBtn.addEventListener('click', () => {
+            if (isHistoricalMode()) {
+                return;
+            }
+            pauseScrapeBtn.disabled = true;
+            fetch('/api/scrape/pause', { method: 'POST' })
+                .then(response => response.json())
+                .then(data => {
+                    if (data.error) {
+                        alert(data.error);
+                        pauseScrapeBtn.disabled = false;
+                        return;
+                    }
+                    pauseScrapeBtn.textContent = 'Pausando...';
+                    if (scrapeStatusSpan) scrapeStatusSpan.textContent = 'Pausando: esperando peticiones en curso...';
+                    if (!scrapeStatusInterval && !liveEventSource) {
+                        scrapeStatusInterval = setInterval(updateScrapeStatus, 1000);
+                    }
+                })
+                .catch(error => {
+                    console.error('Error pausing scrape:', error);
+                    alert('Error al pausar el scraping: ' + error.message);
+                    pauseScrapeBtn.disabled = false;
+                });
+        });
+    }
+
+    if (resumeScrapeBtn) {
+        resumeScrapeBtn.addEventListener('click', () => {
+            const executionId = isHistoricalMode() ? currentExecutionId : (resumeScrapeBtn.dataset.execution || null);
+            resumeScrapeBtn.disabled = true;
+            fetch('/api/scrape/resume', {
+                method: 'POST',
+                headers: { 'Content-Type': 'application/json' },
+                body: JSON.stringify({ execution: executionId })
+            })
+                .then(response => response.json())
+                .then(data => {
+                    resumeScrapeBtn.disabled = false;
+                    if (data.error) {
+                        alert(data.error);
+                        return;
+                    }
+                    resumeScrapeBtn.style.display = 'none';
+                    if (isHistoricalMode()) {
+                        switchToLiveMode();
+                    }
+                    if (scrapeStatusSpan) scrapeStatusSpan.textContent = data.message || 'Reanudando...';
+                    if (!scrapeStatusInterval && !liveEventSource) {
+                        scrapeStatusInterval = setInterval(updateScrapeStatus, 1000);
+                    }
+                })
+                .catch(error => {
+                    console.error('Error resuming scrape:', error);
+                    alert('Error al reanudar el scraping: ' + error.message);
+                    resumeScrapeBtn.disabled = false;
+                });
+        });
+    }
+
+    const applyProcesados = (data) => {
+        if (showingReanalysis) {
+            return;
+        }
+        if (procesadosOutput) {
+            if (data.content) {
+                procesadosOutput.innerHTML = marked.parse(data.content);
+                refreshProcessedUrlsFromMarkdown(data.content);
+            } else {
+                procesadosOutput.innerHTML = '';
+                refreshProcessedUrlsFromMarkdown('');
+            }
+        } else if (data.content) {
+            refreshProcessedUrlsFromMarkdown(data.content);
+        } else {
+            refreshProcessedUrlsFromMarkdown('');
+        }
+    };
+
     const loadProcesados = () => {
         const controller = new AbortController();
         const timeoutId = setTimeout(() => controller.abort(), 5000);
@@ -1411,19 +1740,7 @@ document.addEventListener('DOMContentLoaded', () => {
                 return response.json();
             })
             .then(data => {
-                if (procesadosOutput) {
-                    if (data.content) {
-                        procesadosOutput.innerHTML = marked.parse(data.content);
-                        refreshProcessedUrlsFromMarkdown(data.content);
-                    } else {
-                        procesadosOutput.innerHTML = '';
-                        refreshProcessedUrlsFromMarkdown('');
-                    }
-                } else if (data.content) {
-                    refreshProcessedUrlsFromMarkdown(data.content);
-                } else {
-                    refreshProcessedUrlsFromMarkdown('');
-                }
+                applyProcesados(data);
                 if (!isHistoricalMode()) {
                     fetchExecutionsList();
                 }
@@ -1434,40 +1751,58 @@ document.addEventListener('DOMContentLoaded', () => {
             });
     };
 
+    const applyLogData = (data) => {
+        if (data.error) {
+            throw new Error(data.error);
+        }
+        const appending = Boolean(logCursor) && data.reset === false;
+        logCursor = data.cursor || null;
+        if (appending) {
+            if (!data.content) {
+                return;
+            }
+            const lines = (lastLogRawContent + data.content).split('\n');
+            data.content = lines.length > MAX_LOG_RAW_LINES + 1
+                ? lines.slice(lines.length - MAX_LOG_RAW_LINES - 1).join('\n')
+                : lines.join('\n');
+        }
+        if (typeof data.content === 'string' && logOutput) {
+            if (data.content !== lastLogRawContent) {
+                lastLogRawContent = data.content;
+                parsedLogEntries = parseLogContent(data.content);
+                refreshProcessedUrlsFromLogs();
+                if (logLastUpdated) {
+                    const now = new Date();
+                    logLastUpdated.textContent = `Actualizado: ${now.toLocaleTimeString()}`;
+                }
+                updateLogDisplay(true);
+            }
+        } else if (!data.content && logOutput) {
+            parsedLogEntries = [];
+            lastLogRawContent = '';
+            logCursor = null;
+            logOutput.innerHTML = '';
+            refreshProcessedUrlsFromLogs();
+            if (logEntryCount) {
+                logEntryCount.textContent = 'Entradas: 0';
+            }
+            if (logLastUpdated) {
+                logLastUpdated.textContent = 'Actualizado: --';
+            }
+        }
+    };
+
     const loadLogs = () => {
         const controller = new AbortController();
         const timeoutId = setTimeout(() => controller.abort(), 5000);
 
-        fetch(buildApiUrl('/api/logs'), { signal: controller.signal })
+        const cursorParam = logCursor ? `?cursor=${encodeURIComponent(logCursor)}` : '';
+        fetch(buildApiUrl(`/api/logs${cursorParam}`), { signal: controller.signal })
             .then(response => {
                 clearTimeout(timeoutId);
                 return response.json();
             })
-            .then(data => {
-                if (typeof data.content === 'string' && logOutput) {
-                    if (data.content !== lastLogRawContent) {
-                        lastLogRawContent = data.content;
-                        parsedLogEntries = parseLogContent(data.content);
-                        refreshProcessedUrlsFromLogs();
-                        if (logLastUpdated) {
-                            const now = new Date();
-                            logLastUpdated.textContent = `Actualizado: ${now.toLocaleTimeString()}`;
-                        }
-                        updateLogDisplay(true);
-                    }
-                } else if (!data.content && logOutput) {
-                    parsedLogEntries = [];
-                    lastLogRawContent = '';
-                    logOutput.innerHTML = '';
-                    refreshProcessedUrlsFromLogs();
-                    if (logEntryCount) {
-                        logEntryCount.textContent = 'Entradas: 0';
-                    }
-                    if (logLastUpdated) {
-                        logLastUpdated.textContent = 'Actualizado: --';
-                    }
-                }
-            })
+            .then(applyLogData)
             .catch(error => {
                 clearTimeout(timeoutId);
                 console.error('Error loading logs:', error);